@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
 from app.agents.base_agent import BaseAgent, AgentResponse
+from app.agents.keyword_matcher import KeywordHits
 
 class AlexAgent(BaseAgent):
     def __init__(self):
@@ -24,20 +25,18 @@ class AlexAgent(BaseAgent):
         
         # Lower threshold as general agent
         self.min_confidence_threshold = 0.2
+        
+        # Rule-based responses can be served from the response cache
+        self.cacheable = True
     
-    async def calculate_relevance(self, message: str) -> float:
+    def score_relevance(self, hits: KeywordHits) -> float:
         """Calculate relevance for general queries."""
-        message = message.lower()
-        
         # Always maintain a base relevance as the general agent
         base_relevance = 0.2
         
-        # Check keyword matches
-        keyword_matches = sum(1 for keyword in self.keywords if keyword in message)
-        keyword_score = min(1.0, keyword_matches / 2)
-        
-        # Check capability matches
-        capability_score = await self._check_capability_match(message)
+        # Score keyword and capability matches
+        keyword_score = min(1.0, hits.keywords / 2)
+        capability_score = self._capability_score(hits)
         
         # Combine scores with weights, including base relevance
         final_score = (
@@ -47,6 +46,10 @@ class AlexAgent(BaseAgent):
         )
         return min(1.0, final_score)
     
+    def context_fingerprint(self, context: Optional[List[Dict]] = None) -> str:
+        """Responses only depend on whether there is any context."""
+        return "context" if context else ""
+    
     async def process_message(self, message: str, context: Optional[List[Dict]] = None) -> AgentResponse:
         """Process general queries and coordinate with other agents."""
         message = message.lower()
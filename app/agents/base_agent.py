@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
+import hashlib
 from pydantic import BaseModel
+from app.agents.keyword_matcher import KeywordMatcher, KeywordHits, NO_HITS
+from app.core.executor import INLINE, AgentExecutor
+from app.core.response_cache import ResponseCache
 
 class AgentResponse(BaseModel):
     content: str
@@ -12,7 +16,31 @@ class BaseAgent(ABC):
         self.name = "base_agent"
         self.description = "Base agent class"
         self.capabilities = []
+        self.keywords = []
         self.min_confidence_threshold = 0.3
+        
+        # Shared matcher assigned at registration; agents used on their
+        # own fall back to a private one built on first use
+        self.keyword_matcher: Optional[KeywordMatcher] = None
+        self._own_matcher: Optional[KeywordMatcher] = None
+        
+        # Agents whose responses depend only on the message and the context
+        # fingerprint can opt in to the shared response cache
+        self.cacheable = False
+        self.response_cache: Optional[ResponseCache] = None
+        
+        # CPU-bound agents run in a thread or process pool instead of on the
+        # event loop; the executor is assigned at registration
+        self.execution_mode = INLINE
+        self.executor: Optional[AgentExecutor] = None
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # Matchers, caches and pools belong to the process that registered
+        # the agent; a copy in a pool worker builds its own matcher
+        state = self.__dict__.copy()
+        for key in ("keyword_matcher", "_own_matcher", "response_cache", "executor"):
+            state[key] = None
+        return state
     
     @abstractmethod
     async def process_message(self, message: str, context: Optional[List[Dict]] = None) -> AgentResponse:
@@ -29,18 +57,113 @@ class BaseAgent(ABC):
         """
         pass
     
-    @abstractmethod
     async def calculate_relevance(self, message: str) -> float:
         """
         Calculate how relevant this agent is for handling the given message.
         
+        Keyword-based agents implement ``score_relevance`` instead, which lets
+        the orchestrator score them in bulk from a single matcher scan.
+        Override this method for any other kind of scoring.
+        
         Args:
             message: The message to evaluate
             
         Returns:
             Float between 0 and 1 indicating relevance/confidence
         """
-        pass
+        return self.score_relevance(self._keyword_hits(message))
+    
+    def score_relevance(self, hits: KeywordHits) -> float:
+        """
+        Turn keyword and capability hits into a relevance score.
+        
+        Args:
+            hits: The agent's hits from the keyword matcher
+            
+        Returns:
+            Float between 0 and 1 indicating relevance/confidence
+        """
+        return self._capability_score(hits)
+    
+    @property
+    def scores_by_keywords(self) -> bool:
+        """Whether relevance comes from keyword hits alone."""
+        return type(self).calculate_relevance is BaseAgent.calculate_relevance
+    
+    async def respond(self, message: str, context: Optional[List[Dict]] = None) -> AgentResponse:
+        """
+        Process a message, reusing a cached response when the agent allows it.
+        
+        Args:
+            message: The user's message to process
+            context: Optional list of previous messages for context
+            
+        Returns:
+            AgentResponse from the cache or from process_message
+        """
+        if not self.cacheable or self.response_cache is None:
+            return await self._execute(message, context)
+        
+        key = self.response_cache.make_key(self.name, message, self.context_fingerprint(context))
+        cached = await self.response_cache.get(key, AgentResponse)
+        if cached is not None:
+            return cached
+        
+        response = await self._execute(message, context)
+        await self.response_cache.set(key, response)
+        return response
+    
+    async def _execute(self, message: str, context: Optional[List[Dict]] = None) -> AgentResponse:
+        """Run process_message on the event loop, or in the pool of the agent's execution mode."""
+        if self.execution_mode == INLINE or self.executor is None:
+            return await self.process_message(message, context)
+        return await self.executor.run(self, message, context)
+    
+    async def stream_message(self, message: str, context: Optional[List[Dict]] = None) -> AsyncIterator[str]:
+        """
+        Process a message and yield the response as it is produced.
+        
+        Agents backed by a streaming model should override this to yield
+        tokens as they arrive. The default yields the complete response of
+        ``respond`` as a single chunk.
+        
+        Args:
+            message: The user's message to process
+            context: Optional list of previous messages for context
+            
+        Yields:
+            Consecutive pieces of the response content
+        """
+        response = await self.respond(message, context)
+        yield response.content
+    
+    @property
+    def streams_natively(self) -> bool:
+        """Whether the agent overrides stream_message with real streaming."""
+        return type(self).stream_message is not BaseAgent.stream_message
+    
+    def context_fingerprint(self, context: Optional[List[Dict]] = None) -> str:
+        """
+        Summarise the parts of the context that affect this agent's response.
+        
+        The default covers the content of every context message. Agents
+        that only look at part of the context should override this so
+        equivalent contexts share cache entries.
+        
+        Args:
+            context: Optional list of previous messages for context
+            
+        Returns:
+            String that is equal for contexts yielding the same response
+        """
+        if not context:
+            return ""
+        digest = hashlib.sha1()
+        for msg in context:
+            content = msg.get("content", msg.get("message", "")) if isinstance(msg, dict) else msg.content
+            digest.update(content.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
     
     async def get_metadata(self) -> Dict[str, Any]:
         """Get agent metadata."""
@@ -61,12 +184,31 @@ class BaseAgent(ABC):
         Returns:
             Float between 0 and 1 indicating match strength
         """
-        message = message.lower()
-        matched_capabilities = sum(
-            1 for cap in self.capabilities
-            if any(word in message for word in cap.lower().split())
-        )
-        return min(1.0, matched_capabilities / len(self.capabilities))
+        return self._capability_score(self._keyword_hits(message))
+    
+    def _keyword_hits(self, message: str) -> KeywordHits:
+        """
+        Get this agent's keyword and capability hits for a message.
+        
+        Args:
+            message: The message to check
+            
+        Returns:
+            KeywordHits with the matched keyword and capability counts
+        """
+        matcher = self.keyword_matcher
+        if matcher is None or self.name not in matcher:
+            if self._own_matcher is None:
+                self._own_matcher = KeywordMatcher()
+                self._own_matcher.register(self)
+            matcher = self._own_matcher
+        return matcher.scan(message).get(self.name, NO_HITS)
+    
+    def _capability_score(self, hits: KeywordHits) -> float:
+        """Turn capability hits into a match strength between 0 and 1."""
+        if not self.capabilities:
+            return 0.0
+        return min(1.0, hits.capabilities / len(self.capabilities))
     
     async def _should_reroute(self, confidence: float) -> bool:
         """
@@ -0,0 +1,143 @@
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from app.agents.base_agent import BaseAgent
+
+class KeywordHits(NamedTuple):
+    keywords: int  # Number of the agent's keywords found in the message
+    capabilities: int  # Number of the agent's capabilities with a word found in the message
+
+NO_HITS = KeywordHits(0, 0)
+
+class _Index(NamedTuple):
+    """Compiled terms of every registered agent, replaced as a whole on change."""
+    pattern: Optional[re.Pattern]
+    prefixes: Dict[str, Tuple[str, ...]]
+    keyword_postings: Dict[str, List[str]]
+    capability_postings: Dict[str, List[Tuple[str, int]]]
+
+EMPTY_INDEX = _Index(None, {}, {}, {})
+
+class KeywordMatcher:
+    """
+    Matches the keywords and capability words of many agents in one scan.
+    
+    Every term of every registered agent is compiled into a single regex of
+    lookaheads, so a message is scanned once no matter how many agents are
+    registered. Hits are mapped back to agents through posting lists and
+    follow the same substring semantics as ``keyword in message.lower()``.
+    
+    Scans may run on agent pool threads while the event loop scans or
+    registers agents: the compiled index is swapped in one assignment and
+    the scan cache is guarded by a lock.
+    """
+    
+    def __init__(self, cache_size: int = 64):
+        self.cache_size = cache_size
+        self._keywords: Dict[str, List[str]] = {}
+        self._capabilities: Dict[str, List[List[str]]] = {}
+        self._index = EMPTY_INDEX
+        self._cache: "OrderedDict[str, Dict[str, KeywordHits]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def __contains__(self, agent_name: str) -> bool:
+        return agent_name in self._keywords
+    
+    def register(self, agent: 'BaseAgent'):
+        """Add an agent's keywords and capabilities and recompile the matcher."""
+        self._keywords[agent.name] = [keyword.lower() for keyword in agent.keywords]
+        self._capabilities[agent.name] = [cap.lower().split() for cap in agent.capabilities]
+        self._compile()
+    
+    def unregister(self, agent_name: str):
+        """Remove an agent and recompile the matcher."""
+        if agent_name in self._keywords:
+            del self._keywords[agent_name]
+            del self._capabilities[agent_name]
+            self._compile()
+    
+    def scan(self, message: str) -> Dict[str, KeywordHits]:
+        """
+        Count keyword and capability hits for every agent in one pass.
+        
+        Args:
+            message: The message to scan
+        
+        Returns:
+            Hits keyed by agent name; agents without any hit are omitted
+        """
+        message = message.lower()
+        with self._cache_lock:
+            hits = self._cache.get(message)
+            if hits is not None:
+                self._cache.move_to_end(message)
+                return hits
+        
+        index = self._index
+        keyword_counts: Dict[str, int] = defaultdict(int)
+        capability_matches: Dict[str, Set[int]] = defaultdict(set)
+        for term in self._find_terms(message, index):
+            for agent_name in index.keyword_postings.get(term, ()):
+                keyword_counts[agent_name] += 1
+            for agent_name, position in index.capability_postings.get(term, ()):
+                capability_matches[agent_name].add(position)
+        
+        hits = {
+            agent_name: KeywordHits(
+                keyword_counts.get(agent_name, 0),
+                len(capability_matches.get(agent_name, ()))
+            )
+            for agent_name in keyword_counts.keys() | capability_matches.keys()
+        }
+        
+        with self._cache_lock:
+            # Hits from an index replaced meanwhile would outlive its cache clear
+            if self._index is index:
+                self._cache[message] = hits
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return hits
+    
+    def find_terms(self, message: str) -> Set[str]:
+        """Get every registered term that occurs in an already lowercased message."""
+        return self._find_terms(message, self._index)
+    
+    @staticmethod
+    def _find_terms(message: str, index: _Index) -> Set[str]:
+        if index.pattern is None:
+            return set()
+        
+        found = set()
+        for match in index.pattern.finditer(message):
+            # The regex reports the longest term starting at each position;
+            # shorter terms that are its prefixes match there as well
+            found.update(index.prefixes[match.group(1)])
+        return found
+    
+    def _compile(self):
+        """Rebuild the combined regex and the posting lists."""
+        keyword_postings: Dict[str, List[str]] = defaultdict(list)
+        capability_postings: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        
+        for agent_name, keywords in self._keywords.items():
+            # Duplicate keywords count twice, as they do in a per-keyword scan
+            for keyword in keywords:
+                keyword_postings[keyword].append(agent_name)
+            for index, words in enumerate(self._capabilities[agent_name]):
+                for word in set(words):
+                    capability_postings[word].append((agent_name, index))
+        
+        terms = keyword_postings.keys() | capability_postings.keys()
+        prefixes = {
+            term: tuple(term[:end] for end in range(1, len(term) + 1) if term[:end] in terms)
+            for term in terms
+        }
+        pattern = re.compile(
+            "(?=(" + "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)) + "))"
+        ) if terms else None
+        self._index = _Index(pattern, prefixes, dict(keyword_postings), dict(capability_postings))
+        with self._cache_lock:
+            self._cache.clear()
@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
 from app.agents.base_agent import BaseAgent, AgentResponse
+from app.agents.keyword_matcher import KeywordHits
 
 class MarketingAgent(BaseAgent):
     def __init__(self):
@@ -27,22 +28,24 @@ class MarketingAgent(BaseAgent):
         ]
         
         self.min_confidence_threshold = 0.35
+        
+        # Rule-based responses can be served from the response cache
+        self.cacheable = True
     
-    async def calculate_relevance(self, message: str) -> float:
+    def score_relevance(self, hits: KeywordHits) -> float:
         """Calculate relevance for marketing queries."""
-        message = message.lower()
-        
-        # Check keyword matches
-        keyword_matches = sum(1 for keyword in self.keywords if keyword in message)
-        keyword_score = min(1.0, keyword_matches / 2)
-        
-        # Check capability matches
-        capability_score = await self._check_capability_match(message)
+        # Score keyword and capability matches
+        keyword_score = min(1.0, hits.keywords / 2)
+        capability_score = self._capability_score(hits)
         
         # Combine scores with weights
         final_score = (keyword_score * 0.6) + (capability_score * 0.4)
         return final_score
     
+    def context_fingerprint(self, context: Optional[List[Dict]] = None) -> str:
+        """Responses don't depend on the context."""
+        return ""
+    
     async def process_message(self, message: str, context: Optional[List[Dict]] = None) -> AgentResponse:
         """Process marketing-related queries."""
         message = message.lower()
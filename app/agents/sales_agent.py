@@ -1,4 +1,5 @@
 from app.agents.base_agent import BaseAgent
+from app.agents.keyword_matcher import KeywordHits
 
 class SalesAgent(BaseAgent):
     def __init__(self):
@@ -20,15 +21,13 @@ class SalesAgent(BaseAgent):
             "subscription", "payment", "quote"
         ]
     
-    async def calculate_relevance(self, message: str) -> float:
+    def score_relevance(self, hits: KeywordHits) -> float:
         """
         Calculate relevance score based on presence of sales-related keywords.
         Returns a score between 0 and 1.
         """
-        message = message.lower()
-        keyword_matches = sum(1 for keyword in self.keywords if keyword in message)
         # Normalize score between 0 and 1
-        return min(1.0, keyword_matches / 3)
+        return min(1.0, hits.keywords / 3)
     
     async def process_message(self, message: str) -> str:
         """Process sales-related queries and return appropriate responses."""
@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
 from app.agents.base_agent import BaseAgent, AgentResponse
+from app.agents.keyword_matcher import KeywordHits
 
 class StrategicAgent(BaseAgent):
     def __init__(self):
@@ -21,17 +22,15 @@ class StrategicAgent(BaseAgent):
         ]
         
         self.min_confidence_threshold = 0.4
+        
+        # Rule-based responses can be served from the response cache
+        self.cacheable = True
     
-    async def calculate_relevance(self, message: str) -> float:
+    def score_relevance(self, hits: KeywordHits) -> float:
         """Calculate relevance score for strategic queries."""
-        message = message.lower()
-        
-        # Check keyword matches
-        keyword_matches = sum(1 for keyword in self.keywords if keyword in message)
-        keyword_score = min(1.0, keyword_matches / 3)
-        
-        # Check capability matches
-        capability_score = await self._check_capability_match(message)
+        # Score keyword and capability matches
+        keyword_score = min(1.0, hits.keywords / 3)
+        capability_score = self._capability_score(hits)
         
         # Combine scores with weights
         final_score = (keyword_score * 0.7) + (capability_score * 0.3)
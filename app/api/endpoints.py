@@ -1,9 +1,17 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
-from typing import Dict, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional, Union
+from pydantic import BaseModel, ValidationError
+import asyncio
 import uuid
+from functools import partial
+
+from app.config import get_settings
+from app.core import codec, metrics
 
 from app.orchestrator import orchestrator, Message
+from app.core.redis_pool import close_redis, get_pool_stats
+from app.core.request_pipeline import RequestPipeline
 from app.agents.alex_agent import AlexAgent
 from app.agents.marketing_agent import MarketingAgent
 from app.agents.sales_agent import SalesAgent
@@ -13,11 +21,15 @@ from app.agents.strategic_agent import StrategicAgent
 
 router = APIRouter()
 
+metrics.REGISTRY.register_stats("chat_redis_pool", "Shared Redis connection pool usage.", get_pool_stats)
+orchestrator.register_metrics()
+
 class MessageRequest(BaseModel):
     content: str
     sender_id: str
     mention: Optional[str] = None
     context_id: Optional[str] = None
+    debug: bool = False  # Include a timing breakdown in the response
 
 @router.post("/message")
 async def handle_message(request: MessageRequest):
@@ -26,7 +38,8 @@ async def handle_message(request: MessageRequest):
         content=request.content,
         sender_id=request.sender_id,
         mention=request.mention,
-        context_id=request.context_id or str(uuid.uuid4())
+        context_id=request.context_id or str(uuid.uuid4()),
+        debug=request.debug
     )
     
     try:
@@ -35,31 +48,158 @@ async def handle_message(request: MessageRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/messages/batch")
+async def handle_message_batch(request: Request):
+    """
+    Route many messages in one request.
+    
+    The body is either a JSON array of messages or, with an
+    ``application/x-ndjson`` content type, one message per line. Messages
+    are routed concurrently up to BATCH_MAX_CONCURRENCY; messages sharing a
+    ``context_id`` are routed one after another in input order so their
+    context writes don't interleave.
+    
+    Results are streamed back as NDJSON in completion order, one line per
+    message: ``{"index", "context_id", "response"}`` or ``{"index", "error"}``.
+    """
+    # The body is read up front: the streaming response listens for client
+    # disconnects on the same channel the request body arrives on
+    body = await request.body()
+    if "ndjson" in request.headers.get("content-type", ""):
+        items = [_parse_batch_line(line) for line in body.splitlines() if line.strip()]
+    else:
+        try:
+            messages = codec.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(messages, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        items = [_parse_batch_item(message) for message in messages]
+    
+    return StreamingResponse(_route_batch(items), media_type="application/x-ndjson")
+
+def _parse_batch_line(line: bytes) -> Union[MessageRequest, str]:
+    try:
+        return _parse_batch_item(codec.loads(line))
+    except ValueError as e:
+        return f"Invalid JSON: {e}"
+
+def _parse_batch_item(item) -> Union[MessageRequest, str]:
+    """Validate one batch message, returning the error text if it is invalid."""
+    try:
+        return MessageRequest.model_validate(item)
+    except ValidationError as e:
+        return str(e)
+
+async def _route_batch(items: List[Union[MessageRequest, str]]) -> AsyncIterator[str]:
+    """Route batch items through the orchestrator and yield NDJSON result lines as they finish."""
+    pipeline = RequestPipeline(get_settings().BATCH_MAX_CONCURRENCY)
+    results: asyncio.Queue = asyncio.Queue()
+    
+    async def process(index: int, request: MessageRequest, context_id: str):
+        try:
+            response = await orchestrator.route_message(Message(
+                content=request.content,
+                sender_id=request.sender_id,
+                mention=request.mention,
+                context_id=context_id,
+                debug=request.debug
+            ))
+            results.put_nowait({"index": index, "context_id": context_id, "response": response})
+        except Exception as e:
+            results.put_nowait({"index": index, "context_id": context_id, "error": str(e)})
+    
+    async def feed():
+        try:
+            for index, request in enumerate(items):
+                if isinstance(request, str):
+                    results.put_nowait({"index": index, "error": request})
+                    continue
+                
+                context_id = request.context_id or str(uuid.uuid4())
+                await pipeline.submit(
+                    partial(process, index, request, context_id),
+                    session_id=request.context_id
+                )
+            await pipeline.drain()
+        except Exception as e:
+            results.put_nowait({"error": f"Batch aborted: {e}"})
+        finally:
+            results.put_nowait(None)
+    
+    feeder = asyncio.ensure_future(feed())
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            yield codec.dumps(result) + "\n"
+    finally:
+        # Stop routing if the client went away before the batch finished
+        feeder.cancel()
+        await pipeline.cancel()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Expose latency histograms, counters and gauges in the Prometheus text format."""
+    if not metrics.REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @router.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    """Handle WebSocket connections for real-time chat."""
+    """
+    Handle WebSocket connections for real-time chat.
+    
+    Each message is processed as its own task, so a client can have several
+    requests in flight. Replies echo the message's ``request_id`` (one is
+    generated if missing) and are sent as soon as they are ready; messages
+    sharing a ``context_id`` are answered in the order they were sent.
+    """
     await orchestrator.register_connection(websocket, client_id)
+    pipeline = RequestPipeline()
+    send_lock = asyncio.Lock()
     
-    try:
-        while True:
-            data = await websocket.receive_json()
+    async def send(payload: dict):
+        async with send_lock:
+            await websocket.send_text(codec.dumps(payload))
+    
+    async def process(data: dict, request_id: str, context_id: str):
+        try:
             message = Message(
                 content=data["content"],
                 sender_id=client_id,
                 mention=data.get("mention"),
-                context_id=data.get("context_id", str(uuid.uuid4()))
+                context_id=context_id,
+                debug=bool(data.get("debug", False))
             )
-            
             response = await orchestrator.route_message(message)
-            await websocket.send_json(response)
+        except Exception as e:
+            await send({"request_id": request_id, "error": str(e)})
+            return
+        
+        await send({**response, "request_id": request_id})
+        
+        # Broadcast message to other clients if needed
+        if data.get("broadcast", False):
+            await orchestrator.broadcast_message(response, exclude_client=client_id)
+    
+    try:
+        while True:
+            data = await websocket.receive_json()
+            request_id = str(data.get("request_id") or uuid.uuid4())
+            context_id = data.get("context_id")
             
-            # Broadcast message to other clients if needed
-            if data.get("broadcast", False):
-                await orchestrator.broadcast_message(response, exclude_client=client_id)
+            await pipeline.submit(
+                partial(process, data, request_id, context_id or str(uuid.uuid4())),
+                session_id=context_id
+            )
                 
     except WebSocketDisconnect:
+        await pipeline.cancel()
         await orchestrator.unregister_connection(client_id)
     except Exception as e:
+        await pipeline.cancel()
         await websocket.close(code=1001, reason=str(e))
 
 @router.on_event("startup")
@@ -73,3 +213,9 @@ async def startup_event():
     await orchestrator.register_agent(BrandAgent())
     
     print("Multi-agent chat system initialized with all agents successfully")
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    """Release shared resources when the application stops."""
+    await orchestrator.close()
+    await close_redis()
@@ -1,19 +1,51 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import Optional
-import json
 import uuid
 from datetime import datetime
+from functools import partial
 
+from app.config import get_settings
+from app.core import metrics
+from app.core.redis_pool import get_redis
+from app.core.request_pipeline import RequestPipeline
+from app.core.room_broker import RedisRoomBroker
 from app.core.websocket_manager import WebSocketManager
 from app.orchestrator import orchestrator, Message
 
+def create_ws_manager() -> WebSocketManager:
+    """Create the WebSocket manager, sharing rooms through Redis if enabled."""
+    settings = get_settings()
+    broker = None
+    if settings.WS_DISTRIBUTED_ROOMS:
+        broker = RedisRoomBroker(get_redis())
+    manager = WebSocketManager(broker=broker)
+    metrics.REGISTRY.register_stats(
+        "chat_websocket", "WebSocket connections, rooms and send queue counters.", manager.stats
+    )
+    if broker:
+        metrics.REGISTRY.register_stats(
+            "chat_room_broker", "Shared room subscriptions and swept members.", broker.stats
+        )
+    return manager
+
 router = APIRouter()
-ws_manager = WebSocketManager()
+ws_manager = create_ws_manager()
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    """Disconnect clients, leaving their rooms, and stop the room broker."""
+    try:
+        for client_id in list(ws_manager.active_connections):
+            await ws_manager.disconnect(client_id)
+    finally:
+        if ws_manager.broker:
+            await ws_manager.broker.close()
 
 @router.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     """Handle WebSocket connections and messages."""
     await ws_manager.connect(websocket, client_id)
+    pipeline = RequestPipeline()
     
     try:
         while True:
@@ -21,9 +53,10 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             data = await websocket.receive_json()
             
             # Process message based on event type
-            await handle_websocket_message(client_id, data)
+            await handle_websocket_message(client_id, data, pipeline)
             
     except WebSocketDisconnect:
+        await pipeline.cancel()
         await ws_manager.disconnect(client_id)
         
         # Notify other clients
@@ -36,13 +69,24 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             exclude=client_id
         )
 
-async def handle_websocket_message(client_id: str, data: dict):
-    """Handle different types of WebSocket messages."""
+async def handle_websocket_message(client_id: str, data: dict, pipeline: Optional[RequestPipeline] = None):
+    """
+    Handle different types of WebSocket messages.
+    
+    With a pipeline, chat messages are processed in the background so the
+    connection can keep reading; other events are handled right away.
+    """
     event = data.get("event")
     message_data = data.get("data", {})
     
     if event == "chat_message":
-        await handle_chat_message(client_id, message_data)
+        if pipeline:
+            await pipeline.submit(
+                partial(handle_chat_message, client_id, message_data),
+                session_id=message_data.get("session_id")
+            )
+        else:
+            await handle_chat_message(client_id, message_data)
     
     elif event == "join_room":
         room = message_data.get("room")
@@ -63,8 +107,9 @@ async def handle_chat_message(client_id: str, message_data: dict):
     if not content:
         return
     
-    # Generate or use provided session ID
+    # Generate or use provided session and request IDs
     session_id = message_data.get("session_id", str(uuid.uuid4()))
+    request_id = str(message_data.get("request_id") or uuid.uuid4())
     
     # Create message for orchestrator
     message = Message(
@@ -72,33 +117,47 @@ async def handle_chat_message(client_id: str, message_data: dict):
         sender_id=client_id,
         mention=message_data.get("mention"),
         context_id=session_id,
-        confidence_threshold=message_data.get("confidence_threshold", 0.3)
+        confidence_threshold=message_data.get("confidence_threshold", 0.3),
+        debug=bool(message_data.get("debug", False))
     )
     
-    # Route message through orchestrator
-    response = await orchestrator.route_message(message)
-    
-    # Broadcast response to appropriate room/client
-    if message_data.get("room"):
-        await ws_manager.broadcast_to_room(
-            room=message_data["room"],
-            event="chat_response",
-            data={
-                "response": response,
-                "session_id": session_id,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
-    else:
+    # Route message through orchestrator, streaming agent output if asked to
+    try:
+        if message_data.get("stream"):
+            response = await ws_manager.forward_stream(
+                orchestrator.stream_message(message),
+                session_id=session_id,
+                client_id=client_id,
+                room=message_data.get("room"),
+                request_id=request_id
+            )
+        else:
+            response = await orchestrator.route_message(message)
+    except Exception as e:
         await ws_manager.send_personal_message(
-            event="chat_response",
+            event="error",
             data={
-                "response": response,
+                "message": str(e),
+                "request_id": request_id,
                 "session_id": session_id,
                 "timestamp": datetime.utcnow().isoformat()
             },
             client_id=client_id
         )
+        return
+    
+    # Send the aggregated response to the appropriate room/client
+    await ws_manager.send_event(
+        event="chat_response",
+        data={
+            "response": response,
+            "session_id": session_id,
+            "request_id": request_id,
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        client_id=client_id,
+        room=message_data.get("room")
+    )
 
 async def handle_typing_status(client_id: str, data: dict):
     """Handle typing status updates."""
@@ -15,13 +15,62 @@ class Settings(BaseSettings):
     # Redis settings
     REDIS_URL: str = "redis://localhost:6379"
     REDIS_DB: int = 0
+    REDIS_VALUE_FORMAT: str = "json"  # "json" or "msgpack" (needs the msgpack package)
+    REDIS_MAX_CONNECTIONS: int = 50  # Shared pool size per worker
+    REDIS_POOL_TIMEOUT: float = 5.0  # Seconds to wait for a free connection
+    REDIS_SOCKET_TIMEOUT: float = 5.0  # seconds
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5.0  # seconds
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # seconds, 0 disables health checks
     
     # Context settings
     CONTEXT_TTL: int = 3600  # 1 hour in seconds
     MAX_CONTEXT_MESSAGES: int = 10
     
+    # Session retention settings
+    SESSION_MAX_MESSAGES: int = 200  # 0 disables the message count limit
+    SESSION_MAX_BYTES: int = 256 * 1024  # Encoded message bytes, 0 disables the limit
+    SESSION_SUMMARY_ENABLED: bool = False  # Keep a short summary of evicted messages
+    SESSION_SUMMARY_MAX_LINES: int = 20
+    
+    # Session cache settings (per worker)
+    SESSION_CACHE_SIZE: int = 1024  # Decoded sessions cached per worker, 0 disables the cache
+    SESSION_CACHE_MAX_AGE: float = 30.0  # Seconds an entry is trusted without a version check
+    SESSION_CACHE_INVALIDATION: bool = False  # Push invalidations between workers through Redis pub/sub
+    
+    # Session history settings (MongoDB)
+    HISTORY_MAX_MESSAGES: int = 100  # Messages kept per session
+    HISTORY_BATCH_SIZE: int = 100  # Queued messages that trigger a flush
+    HISTORY_FLUSH_INTERVAL: float = 1.0  # Max seconds a message waits before it is written
+    HISTORY_MAX_PENDING: int = 10000  # Queued messages kept while MongoDB is unavailable, more are dropped
+    
+    # Orchestrator settings
+    AGENT_CONCURRENT_DISPATCH: bool = True  # Run selected agents at the same time
+    AGENT_TIMEOUT: float = 10.0  # Per-agent timeout in seconds
+    MAX_REROUTE_HOPS: int = 3  # Times a message is passed on to another agent before the last reply is kept
+    AGENT_THREAD_WORKERS: int = 4  # Pool size for agents with execution_mode "thread"
+    AGENT_PROCESS_WORKERS: Optional[int] = None  # Pool size for "process" agents, None uses the CPU count
+    ROUTING_CACHE_SIZE: int = 1024  # Cached routing decisions, 0 disables the cache
+    ROUTING_CACHE_TTL: float = 300.0  # seconds
+    RESPONSE_CACHE_ENABLED: bool = True  # Shared cache for agents that declare themselves cacheable
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    RESPONSE_CACHE_TTL: int = 3600  # seconds
+    BATCH_MAX_CONCURRENCY: int = 16  # Messages routed at once by POST /messages/batch
+    
     # WebSocket settings
     WS_HEARTBEAT_INTERVAL: int = 30  # seconds
+    WS_SEND_QUEUE_SIZE: int = 256  # Outbound messages buffered per connection
+    WS_OVERFLOW_POLICY: str = "disconnect"  # "disconnect" or "drop" when a client's queue is full
+    WS_DISTRIBUTED_ROOMS: bool = False  # Share rooms across workers through Redis pub/sub
+    WS_ROOM_WORKER_TTL: float = 30.0  # Seconds a worker's room members outlive its last heartbeat
+    WS_MAX_IN_FLIGHT: int = 8  # Requests processed concurrently per connection
+    
+    # Metrics settings
+    METRICS_ENABLED: bool = True  # Record latencies and counters and serve them on /metrics
+    
+    # Tracing settings
+    TRACING_ENABLED: bool = False  # Record spans of every routed message and export them
+    TRACING_EXPORTER: str = "console"  # "console" or "file", both write OTLP JSON lines
+    TRACING_FILE: str = "traces.jsonl"  # Where the file exporter appends traces
     
     # Agent settings
     DEFAULT_AGENTS: List[str] = [
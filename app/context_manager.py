@@ -1,11 +1,14 @@
 from typing import Dict, List, Optional
-import json
 from datetime import datetime
 import redis.asyncio as redis
+from app.core.codec import Codec, get_codec
+from app.core.redis_pool import get_redis
 
 class ContextManager:
-    def __init__(self):
-        self.redis_client = redis.from_url("redis://localhost:6379", decode_responses=True)
+    def __init__(self, codec: Optional[Codec] = None, redis_client: Optional[redis.Redis] = None):
+        self.codec = codec or get_codec()
+        # Shared application pool, built from Settings.REDIS_URL
+        self.redis_client = redis_client or get_redis()
         self.context_ttl = 3600  # 1 hour in seconds
     
     async def get_context(self, context_id: str) -> List[Dict]:
@@ -17,7 +20,7 @@ class ContextManager:
         if not context_data:
             return []
         
-        return json.loads(context_data)
+        return self.codec.decode(context_data)
     
     async def update_context(self, context_id: str, message: str):
         """Update conversation context with a new message."""
@@ -39,7 +42,7 @@ class ContextManager:
         # Store updated context
         await self.redis_client.set(
             f"context:{context_id}",
-            json.dumps(context_data),
+            self.codec.encode(context_data),
             ex=self.context_ttl
         )
     
@@ -1,5 +1,8 @@
 from typing import Dict, Optional
 from app.agents.base_agent import BaseAgent
+from app.agents.keyword_matcher import KeywordMatcher
+from app.core.routing_cache import RoutingCache
+from app.config import get_settings
 from app.agents.sales_agent import SalesAgent
 from app.agents.strategic_agent import StrategicAgent
 from app.agents.support_agent import SupportAgent
@@ -14,12 +17,53 @@ class AgentManager:
             "technical_agent": TechnicalAgent(),
         }
         
+        # Share one keyword scan per message across all agents
+        self.keyword_matcher = KeywordMatcher()
+        for agent in self.agents.values():
+            self.keyword_matcher.register(agent)
+            agent.keyword_matcher = self.keyword_matcher
+        
+        settings = get_settings()
+        self.registry_version = 0
+        self.routing_cache = RoutingCache(
+            max_size=settings.ROUTING_CACHE_SIZE,
+            ttl=settings.ROUTING_CACHE_TTL
+        )
+    
+    async def register_agent(self, agent: BaseAgent):
+        """Add or replace an agent."""
+        self.agents[agent.name.lower()] = agent
+        self.keyword_matcher.register(agent)
+        agent.keyword_matcher = self.keyword_matcher
+        self._on_registry_change()
+    
+    async def unregister_agent(self, agent_name: str):
+        """Remove an agent by name."""
+        agent = self.agents.pop(agent_name.lower(), None)
+        if agent:
+            self.keyword_matcher.unregister(agent.name)
+            agent.keyword_matcher = None
+            self._on_registry_change()
+    
+    def _on_registry_change(self):
+        """Invalidate cached routing decisions after the agents changed."""
+        self.registry_version += 1
+        self.routing_cache.clear()
+        
     async def get_agent(self, agent_name: str) -> Optional[BaseAgent]:
         """Get an agent by name."""
         return self.agents.get(agent_name.lower())
     
     async def get_best_agent(self, message: str) -> BaseAgent:
         """Determine the most suitable agent based on message content."""
+        # Only keyword scores are deterministic enough to cache
+        cacheable = all(agent.scores_by_keywords for agent in self.agents.values())
+        cache_key = (RoutingCache.normalize(message), self.registry_version, None)
+        if cacheable:
+            best_agent = self.routing_cache.get(cache_key)
+            if best_agent is not None:
+                return self.agents[best_agent]
+        
         # Implement agent selection logic based on message content
         # This could use NLP, keyword matching, or more sophisticated routing
         scores = {
@@ -27,6 +71,8 @@ class AgentManager:
             for agent_name, agent in self.agents.items()
         }
         best_agent = max(scores.items(), key=lambda x: x[1])[0]
+        if cacheable:
+            self.routing_cache.put(cache_key, best_agent)
         return self.agents[best_agent]
     
     async def process_message(self, message: str, agent_name: Optional[str] = None) -> dict:
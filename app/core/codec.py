@@ -0,0 +1,119 @@
+from typing import Any, List, Optional, Type, TypeVar, Union
+from functools import lru_cache
+import json
+from pydantic import BaseModel, TypeAdapter
+from app.config import get_settings
+
+try:
+    import orjson
+except ImportError:  # Optional speedup, stdlib json is used without it
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Only needed for the "msgpack" storage format
+    msgpack = None
+
+# Prefix of msgpack-encoded values. JSON never starts with a NUL byte, so
+# tagged values can be told apart from the JSON written by older versions;
+# the digit leaves room for future binary layouts.
+MSGPACK_TAG = b"\x00M1"
+
+Model = TypeVar("Model", bound=BaseModel)
+
+def dumps(value: Any) -> str:
+    """Encode a value as JSON text."""
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, separators=(",", ":"))
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode JSON text or a tagged msgpack value."""
+    if isinstance(data, bytes) and data.startswith(MSGPACK_TAG):
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read msgpack-encoded values")
+        return msgpack.unpackb(data[len(MSGPACK_TAG):], raw=False)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps_model(model: BaseModel) -> str:
+    """Encode a model as JSON text, e.g. for a WebSocket frame."""
+    # pydantic's own serializer is compiled and needs no intermediate dict
+    return model.model_dump_json()
+
+class Codec:
+    """
+    Encodes values stored in Redis.
+    
+    The "json" format writes text; "msgpack" writes tagged binary values,
+    which need a Redis client created with ``decode_responses=False``
+    (see ``decode_responses``). Both formats read either encoding, so
+    switching formats doesn't invalidate stored sessions.
+    """
+    
+    def __init__(self, format: Optional[str] = None):
+        format = format or get_settings().REDIS_VALUE_FORMAT
+        if format == "msgpack" and msgpack is None:
+            print("msgpack is not installed, storing Redis values as JSON")
+            format = "json"
+        self.format = format
+        self.binary = format == "msgpack"
+    
+    @property
+    def decode_responses(self) -> bool:
+        """Whether Redis clients used with this codec may decode replies to str."""
+        return not self.binary
+    
+    def encode(self, value: Any) -> Union[str, bytes]:
+        """Encode a JSON-compatible value for storage."""
+        if self.binary:
+            return MSGPACK_TAG + msgpack.packb(value, use_bin_type=True)
+        return dumps(value)
+    
+    def decode(self, data: Union[str, bytes]) -> Any:
+        """Decode a stored value written in either format."""
+        return loads(data)
+    
+    def encode_model(self, model: BaseModel) -> Union[str, bytes]:
+        """Encode a model for storage."""
+        if self.binary:
+            return self.encode(model.model_dump(mode="json"))
+        return model.model_dump_json()
+    
+    def decode_model(self, data: Union[str, bytes], model: Type[Model]) -> Model:
+        """Decode and validate a stored model written in either format."""
+        if isinstance(data, bytes) and data.startswith(MSGPACK_TAG):
+            return model.model_validate(loads(data))
+        return model.model_validate_json(data)
+    
+    def decode_models(self, encoded: List[Union[str, bytes]], model: Type[Model]) -> List[Model]:
+        """
+        Decode a list of stored models in one validator call.
+        
+        JSON values are joined into a single array and parsed by pydantic's
+        compiled validator in one go, which is faster than validating them
+        one by one and much faster than ``model_construct`` on decoded dicts.
+        """
+        if not encoded:
+            return []
+        
+        adapter = _list_adapter(model)
+        if isinstance(encoded[0], bytes):
+            if any(raw.startswith(MSGPACK_TAG) for raw in encoded):
+                return adapter.validate_python([loads(raw) for raw in encoded])
+            return adapter.validate_json(b"[" + b",".join(encoded) + b"]")
+        return adapter.validate_json("[" + ",".join(encoded) + "]")
+
+@lru_cache()
+def _list_adapter(model: Type[Model]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+@lru_cache()
+def get_codec() -> Codec:
+    """Get the codec configured by REDIS_VALUE_FORMAT."""
+    return Codec()
+
+def text(value: Union[str, bytes]) -> str:
+    """Get a Redis reply as text, whether or not the client decodes replies."""
+    return value.decode("utf-8") if isinstance(value, bytes) else value
@@ -0,0 +1,149 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import multiprocessing
+import pickle
+import threading
+from pydantic import BaseModel
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.agents.base_agent import AgentResponse, BaseAgent
+
+# Where an agent's process_message runs
+INLINE = "inline"  # On the event loop, for agents that mostly await I/O
+THREAD = "thread"  # In a thread pool, for blocking calls that release the GIL
+PROCESS = "process"  # In a process pool, for CPU-bound work
+EXECUTION_MODES = (INLINE, THREAD, PROCESS)
+
+class AgentExecutor:
+    """
+    Runs agents off the event loop according to their ``execution_mode``.
+    
+    Pools are created on first use and shared by every agent of a mode.
+    Pool workers drive ``process_message`` on an event loop of their own,
+    so agents are written the same way whatever mode they run in, but they
+    must not use the caller's loop or its connections.
+    
+    Thread agents are called on the registered instance from several
+    threads at once and must be thread-safe. Process agents are pickled
+    with every call, along with the message and their context as plain
+    dicts; state they change in a worker is not sent back. An agent that
+    times out keeps its worker busy until it finishes, since running pool
+    work can't be interrupted.
+    """
+    
+    def __init__(self, thread_workers: Optional[int] = None, process_workers: Optional[int] = None):
+        settings = get_settings()
+        self.thread_workers = settings.AGENT_THREAD_WORKERS if thread_workers is None else thread_workers
+        self.process_workers = process_workers or settings.AGENT_PROCESS_WORKERS or multiprocessing.cpu_count()
+        self.completed = 0
+        self.failed = 0
+        self._in_flight = {THREAD: 0, PROCESS: 0}
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+    
+    def check(self, agent: "BaseAgent"):
+        """
+        Check that an agent can run in its execution mode.
+        
+        Raises:
+            ValueError: If the mode is unknown, or a process agent can't be pickled
+        """
+        if agent.execution_mode not in EXECUTION_MODES:
+            raise ValueError(
+                f"Agent {agent.name} has unknown execution mode {agent.execution_mode!r}, "
+                f"expected one of {', '.join(EXECUTION_MODES)}"
+            )
+        if agent.execution_mode == PROCESS:
+            try:
+                pickle.dumps(agent)
+            except Exception as e:
+                raise ValueError(f"Agent {agent.name} runs in a process pool but can't be pickled: {e}") from e
+    
+    async def run(
+        self,
+        agent: "BaseAgent",
+        message: str,
+        context: Optional[List[Any]] = None
+    ) -> "AgentResponse":
+        """
+        Run an agent's process_message in the pool of its execution mode.
+        
+        Args:
+            agent: Agent with a thread or process execution mode
+            message: The user's message to process
+            context: Optional list of previous messages for context
+        
+        Returns:
+            The agent's response
+        """
+        mode = agent.execution_mode
+        if mode == PROCESS:
+            pool = self._process_pool()
+            context = context_payload(context)
+        elif mode == THREAD:
+            pool = self._thread_pool()
+        else:
+            raise ValueError(f"Agent {agent.name} runs inline, not in a pool")
+        
+        self._in_flight[mode] += 1
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(
+                pool, _run_agent, agent, message, context
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._in_flight[mode] -= 1
+        self.completed += 1
+        return response
+    
+    def stats(self) -> Dict[str, int]:
+        """Pool sizes and counters, for monitoring."""
+        return {
+            "thread_workers": self.thread_workers,
+            "process_workers": self.process_workers,
+            "thread_in_flight": self._in_flight[THREAD],
+            "process_in_flight": self._in_flight[PROCESS],
+            "completed": self.completed,
+            "failed": self.failed
+        }
+    
+    def shutdown(self):
+        """Stop the pools, dropping queued work; call on shutdown."""
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+    
+    def _thread_pool(self) -> Executor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.thread_workers, thread_name_prefix="agent")
+        return self._threads
+    
+    def _process_pool(self) -> Executor:
+        if self._processes is None:
+            # Forking a process that runs an event loop and threads can
+            # deadlock the child, so workers start from a fresh interpreter
+            self._processes = ProcessPoolExecutor(
+                self.process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._processes
+
+def context_payload(context: Optional[List[Any]]) -> Optional[List[Any]]:
+    """Convert context messages to plain dicts, which pickle small and fast."""
+    if not context:
+        return context
+    return [message.model_dump() if isinstance(message, BaseModel) else message for message in context]
+
+_worker = threading.local()
+
+def _run_agent(agent: "BaseAgent", message: str, context: Optional[List[Any]]) -> "AgentResponse":
+    """Run process_message to completion on the pool worker's own event loop."""
+    loop = getattr(_worker, "loop", None)
+    if loop is None:
+        loop = _worker.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(agent.process_message(message, context))
@@ -0,0 +1,163 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+from pymongo import UpdateOne
+from app.config import get_settings
+
+class HistoryWriter:
+    """
+    Write-behind buffer for session history stored in MongoDB.
+    
+    Appends are collected per session and written as one ``bulk_write``
+    once ``batch_size`` messages are waiting or ``flush_interval`` seconds
+    have passed, whichever comes first. Each session becomes a single
+    ``$push``/``$slice`` update per batch, so the request path never waits
+    for Mongo. ``close`` flushes whatever is left, so call it on shutdown.
+    
+    While Mongo is unavailable failed batches are kept and retried, up to
+    ``max_pending`` queued messages; appends beyond that are dropped and
+    counted, since the session's recent messages are still in Redis.
+    """
+    
+    def __init__(
+        self,
+        collection,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_history: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        settings = get_settings()
+        self.collection = collection
+        self.batch_size = batch_size or settings.HISTORY_BATCH_SIZE
+        self.flush_interval = settings.HISTORY_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.max_history = max_history or settings.HISTORY_MAX_MESSAGES
+        self.max_pending = max_pending or settings.HISTORY_MAX_PENDING
+        self._pending: Dict[str, List[Any]] = {}
+        self._writing: Dict[str, List[Any]] = {}  # Batch of the flush in progress
+        self._depth = 0
+        self._flush_needed = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+        self.flushed_batches = 0
+        self.flushed_messages = 0
+        self.failed_flushes = 0
+        self.dropped_messages = 0
+        self.peak_depth = 0
+    
+    def append(self, session_id: str, message: Any):
+        """Queue a message for a session's history, unless the queue is full."""
+        if self._depth >= self.max_pending:
+            self.dropped_messages += 1
+            return
+        
+        self._pending.setdefault(session_id, []).append(message)
+        self._depth += 1
+        self.peak_depth = max(self.peak_depth, self._depth)
+        
+        if self._flusher is None and not self._closed:
+            self._flusher = asyncio.ensure_future(self._flush_loop())
+        if self._depth >= self.batch_size:
+            self._flush_needed.set()
+    
+    def pending(self, session_id: str) -> List[Any]:
+        """Messages queued for a session that haven't been written yet."""
+        return self._writing.get(session_id, []) + self._pending.get(session_id, [])
+    
+    async def discard(self, session_id: str):
+        """
+        Drop a session's queued messages, e.g. when its history is cleared.
+        
+        Also waits for a flush in progress, so the caller can delete the
+        stored history without a late batch recreating it.
+        """
+        self._depth -= len(self._pending.pop(session_id, ()))
+        async with self._flush_lock:
+            # A failed flush may have put the session back
+            self._depth -= len(self._pending.pop(session_id, ()))
+    
+    async def flush(self):
+        """Write every queued message now."""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            
+            batch, self._pending = self._pending, {}
+            count = sum(len(messages) for messages in batch.values())
+            self._depth -= count
+            operations = [
+                UpdateOne(
+                    {"session_id": session_id},
+                    {"$push": {"context": {"$each": messages, "$slice": -self.max_history}}},
+                    upsert=True
+                )
+                for session_id, messages in batch.items()
+            ]
+            
+            self._writing = batch
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except asyncio.CancelledError:
+                # The write may still land, but keeping the batch risks a
+                # duplicate rather than losing it
+                self._requeue(batch, count)
+                raise
+            except Exception as e:
+                print(f"History flush of {count} messages failed: {e}")
+                self.failed_flushes += 1
+                self._requeue(batch, count)
+                raise
+            finally:
+                self._writing = {}
+            
+            self.flushed_batches += 1
+            self.flushed_messages += count
+    
+    async def close(self):
+        """Stop the background flusher, letting a flush in progress finish, and write what is left."""
+        self._closed = True
+        if self._flusher:
+            self._stopping.set()
+            self._flush_needed.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get queue depth and flush counters."""
+        return {
+            "queue_depth": self._depth,
+            "pending_sessions": len(self._pending),
+            "peak_depth": self.peak_depth,
+            "flushed_batches": self.flushed_batches,
+            "flushed_messages": self.flushed_messages,
+            "failed_flushes": self.failed_flushes,
+            "dropped_messages": self.dropped_messages
+        }
+    
+    def _requeue(self, batch: Dict[str, List[Any]], count: int):
+        """Put a batch that wasn't written back in front of anything queued meanwhile."""
+        for session_id, messages in batch.items():
+            self._pending[session_id] = messages + self._pending.get(session_id, [])
+        self._depth += count
+    
+    async def _flush_loop(self):
+        """Flush on the size trigger or every flush_interval seconds, until close."""
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            if self._stopping.is_set():
+                break  # close writes what is left
+            
+            try:
+                await self.flush()
+            except Exception:
+                # Already reported; the batch is retried after a pause, cut short by close
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
@@ -0,0 +1,283 @@
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from bisect import bisect_left
+import functools
+import time
+from app.config import get_settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from cache hits up to slow agent replies
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+# (labels, value) pairs of one metric, rendered at scrape time
+Samples = Iterable[Tuple[Mapping[str, str], float]]
+
+class Registry:
+    """
+    Metrics of this process, rendered in the Prometheus text format.
+    
+    Counters and histograms are updated on the request path, so recording
+    is a few attribute updates and no locking (everything runs on the
+    event loop). Values other components already count, like cache stats,
+    are read only when ``/metrics`` is scraped, through ``register_stats``
+    and ``register_gauge``.
+    """
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._collectors: Dict[str, Tuple[str, str, Callable[[], Samples]]] = {}
+    
+    def register(self, metric: "_Metric") -> "_Metric":
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def register_gauge(self, name: str, help: str, collect: Callable[[], Samples]):
+        """
+        Expose values read at scrape time as a gauge, replacing any earlier one.
+        
+        Args:
+            name: Metric name
+            help: Metric description
+            collect: Returns the (labels, value) pairs to expose
+        """
+        self._collectors[name] = ("gauge", help, collect)
+    
+    def register_stats(
+        self,
+        name: str,
+        help: str,
+        get_stats: Callable[[], Optional[Mapping[str, float]]],
+        **labels: str
+    ):
+        """
+        Expose a component's ``stats()`` dict as a gauge with a ``stat`` label.
+        
+        Args:
+            name: Metric name
+            help: Metric description
+            get_stats: Returns the stats dict, or None when there is nothing to report
+            **labels: Labels added to every sample
+        """
+        def collect() -> Samples:
+            stats = get_stats() or {}
+            return [
+                ({**labels, "stat": stat}, value)
+                for stat, value in stats.items()
+                if isinstance(value, (int, float))
+            ]
+        self.register_gauge(name, help, collect)
+    
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        for name, (kind, help, collect) in self._collectors.items():
+            try:
+                samples = list(collect())
+            except Exception as e:
+                print(f"Metrics collector {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_sample(name, labels, value) for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+class _Metric:
+    type = ""
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Optional[Registry] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self.registry.register(self)
+        if not self.labelnames:
+            self.labels()  # Exposed as 0 before the first update
+    
+    def labels(self, *values: str):
+        """Get the child metric for a set of label values, in ``labelnames`` order."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._child()
+        return child
+    
+    def _child(self):
+        raise NotImplementedError
+    
+    def _labels(self, values: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+class _CounterChild:
+    __slots__ = ("registry", "value")
+    
+    def __init__(self, registry: Registry):
+        self.registry = registry
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        if self.registry.enabled:
+            self.value += amount
+
+class Counter(_Metric):
+    """A monotonically increasing count, e.g. reroutes."""
+    type = "counter"
+    
+    def inc(self, amount: float = 1.0):
+        """Increment the unlabelled counter."""
+        self.labels().inc(amount)
+    
+    def _child(self) -> _CounterChild:
+        return _CounterChild(self.registry)
+    
+    def render(self) -> List[str]:
+        return [
+            _sample(self.name, self._labels(values), child.value)
+            for values, child in self._children.items()
+        ]
+
+class _HistogramChild:
+    __slots__ = ("registry", "buckets", "counts", "sum", "count")
+    
+    def __init__(self, registry: Registry, buckets: Tuple[float, ...]):
+        self.registry = registry
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        if self.registry.enabled:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+    
+    def time(self) -> "_Timer":
+        """Time a block (``with``) or every call of an async function (decorator)."""
+        return _Timer(self)
+
+class Histogram(_Metric):
+    """Distribution of observed values, e.g. latencies in seconds."""
+    type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = None
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+    
+    def observe(self, value: float):
+        """Record a value in the unlabelled histogram."""
+        self.labels().observe(value)
+    
+    def time(self) -> "_Timer":
+        """Time into the unlabelled histogram."""
+        return self.labels().time()
+    
+    def _child(self) -> _HistogramChild:
+        return _HistogramChild(self.registry, self.buckets)
+    
+    def render(self) -> List[str]:
+        lines = []
+        for values, child in self._children.items():
+            labels = self._labels(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                lines.append(_sample(f"{self.name}_bucket", {**labels, "le": _format(bound)}, cumulative))
+            lines.append(_sample(f"{self.name}_sum", labels, child.sum))
+            lines.append(_sample(f"{self.name}_count", labels, child.count))
+        return lines
+
+class _Timer:
+    """Records elapsed wall time into a histogram child."""
+    __slots__ = ("child", "start")
+    
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+        self.start = 0.0
+    
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.child.observe(time.perf_counter() - self.start)
+    
+    def __call__(self, function):
+        child = self.child
+        
+        @functools.wraps(function)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return timed
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _sample(name: str, labels: Mapping[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        return f"{name}{{{rendered}}} {_format(value)}"
+    return f"{name} {_format(value)}"
+
+REGISTRY = Registry(enabled=get_settings().METRICS_ENABLED)
+
+# Request path instrumentation
+STAGE_LATENCY = Histogram(
+    "chat_stage_latency_seconds",
+    "Time spent in each stage of routing a message.",
+    ["stage"]
+)
+AGENT_LATENCY = Histogram(
+    "chat_agent_latency_seconds",
+    "Time an agent took to produce a reply.",
+    ["agent"]
+)
+CONTEXT_LATENCY = Histogram(
+    "chat_context_operation_seconds",
+    "Latency of session context reads and writes.",
+    ["operation"]
+)
+WS_SEND_LATENCY = Histogram(
+    "chat_ws_send_seconds",
+    "Time to write one frame to a WebSocket."
+)
+MESSAGES_ROUTED = Counter("chat_messages_routed_total", "Messages routed to agents.")
+REROUTES = Counter("chat_reroutes_total", "Replies an agent asked to have rerouted.", ["agent"])
+REROUTE_LIMITS = Counter(
+    "chat_reroute_limit_total",
+    "Reroutes refused because the hop limit was reached or every candidate was tried."
+)
+AGENT_TIMEOUTS = Counter("chat_agent_timeouts_total", "Agent replies abandoned after the agent timeout.", ["agent"])
+NO_AGENT_RESULTS = Counter("chat_no_agent_results_total", "Messages no agent was relevant for.")
+WS_MESSAGES_SENT = Counter("chat_ws_messages_sent_total", "Frames written to WebSockets.")
+
+def render() -> str:
+    """Render the application's metrics for a ``/metrics`` response."""
+    return REGISTRY.render()
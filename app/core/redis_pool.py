@@ -0,0 +1,102 @@
+from typing import Dict, Optional
+import time
+import redis.asyncio as redis
+from app.config import get_settings
+from app.core.codec import get_codec
+
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    """
+    Blocking Redis connection pool that records how it is used.
+    
+    When all ``max_connections`` are busy, callers wait up to ``timeout``
+    seconds for one to be released instead of failing right away. The
+    counters show how close the pool runs to its limit, which is what
+    connection sizing per worker needs.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquisitions = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.peak_in_use = 0
+    
+    async def get_connection(self, command_name, *keys, **options):
+        self.acquisitions += 1
+        if self.can_get_connection():
+            connection = await super().get_connection(command_name, *keys, **options)
+        else:
+            self.waits += 1
+            start = time.monotonic()
+            try:
+                connection = await super().get_connection(command_name, *keys, **options)
+            except redis.ConnectionError:
+                self.timeouts += 1
+                raise
+            finally:
+                self.wait_seconds += time.monotonic() - start
+        
+        self.peak_in_use = max(self.peak_in_use, len(self._in_use_connections))
+        return connection
+    
+    def stats(self) -> Dict[str, float]:
+        """Get the pool's current utilisation and usage counters."""
+        in_use = len(self._in_use_connections)
+        return {
+            "max_connections": self.max_connections,
+            "in_use": in_use,
+            "idle": len(self._available_connections),
+            "utilisation": in_use / self.max_connections,
+            "peak_in_use": self.peak_in_use,
+            "acquisitions": self.acquisitions,
+            "waits": self.waits,
+            "wait_seconds": self.wait_seconds,
+            "timeouts": self.timeouts
+        }
+
+_client: Optional[redis.Redis] = None
+
+def create_pool(url: Optional[str] = None, **overrides) -> MeteredConnectionPool:
+    """
+    Build a connection pool from settings.
+    
+    Args:
+        url: Redis URL, REDIS_URL by default
+        **overrides: Pool or connection options replacing the configured ones
+    
+    Returns:
+        The new connection pool
+    """
+    settings = get_settings()
+    options = {
+        "db": settings.REDIS_DB,
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "timeout": settings.REDIS_POOL_TIMEOUT,
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        "decode_responses": get_codec().decode_responses
+    }
+    options.update(overrides)
+    return MeteredConnectionPool.from_url(url or settings.REDIS_URL, **options)
+
+def get_redis() -> redis.Redis:
+    """Get the application's Redis client, backed by the shared pool."""
+    global _client
+    if _client is None:
+        _client = redis.Redis(connection_pool=create_pool())
+    return _client
+
+def get_pool_stats() -> Optional[Dict[str, float]]:
+    """Get the shared pool's metrics, or None if it hasn't been created yet."""
+    if _client is None:
+        return None
+    return _client.connection_pool.stats()
+
+async def close_redis():
+    """Close the shared client and its connections, e.g. on shutdown."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.connection_pool.disconnect()
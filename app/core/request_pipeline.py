@@ -0,0 +1,85 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+import asyncio
+from app.config import get_settings
+
+class RequestPipeline:
+    """
+    Runs a connection's requests as concurrent tasks.
+    
+    At most ``max_in_flight`` requests run at once; ``submit`` waits for a
+    free slot, so a connection that floods requests stops being read until
+    earlier ones finish. Requests sharing a session id run in the order they
+    were submitted, while requests of different sessions overlap freely.
+    """
+    
+    def __init__(self, max_in_flight: Optional[int] = None):
+        settings = get_settings()
+        self.max_in_flight = max_in_flight or settings.WS_MAX_IN_FLIGHT
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._session_tails: Dict[str, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of submitted requests that haven't finished yet."""
+        return len(self._tasks)
+    
+    async def submit(
+        self,
+        handler: Callable[[], Awaitable[Any]],
+        session_id: Optional[str] = None
+    ) -> asyncio.Task:
+        """
+        Start a request once a slot is free.
+        
+        Args:
+            handler: Coroutine function processing the request; it should
+                report its own errors to the client
+            session_id: Requests with the same session id run one at a time
+                in submission order; None means no ordering constraint
+        
+        Returns:
+            The task running the request
+        """
+        await self._slots.acquire()
+        
+        previous = self._session_tails.get(session_id) if session_id else None
+        task = asyncio.ensure_future(self._run(handler, previous))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # Released on completion rather than in _run, which never starts
+        # for a task cancelled before its first step
+        task.add_done_callback(lambda done: self._slots.release())
+        
+        if session_id:
+            self._session_tails[session_id] = task
+            task.add_done_callback(lambda done: self._release_tail(session_id, done))
+        return task
+    
+    async def drain(self):
+        """Wait for every submitted request to finish."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def cancel(self):
+        """Cancel every unfinished request, e.g. when the client disconnects."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _run(self, handler: Callable[[], Awaitable[Any]], previous: Optional[asyncio.Task]) -> Any:
+        try:
+            if previous is not None:
+                # Wait for the session's previous request, whatever its outcome
+                await asyncio.wait([previous])
+            return await handler()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error processing pipelined request: {e}")
+    
+    def _release_tail(self, session_id: str, task: asyncio.Task):
+        if self._session_tails.get(session_id) is task:
+            del self._session_tails[session_id]
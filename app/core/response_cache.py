@@ -0,0 +1,72 @@
+from typing import Optional
+import hashlib
+import time
+import redis.asyncio as redis
+from pydantic import BaseModel
+
+from app.core.codec import Codec, get_codec
+from app.core.routing_cache import RoutingCache
+
+class ResponseCache:
+    """
+    Redis-backed cache of agent responses, shared by all workers.
+    
+    Each response is stored under its own key with a TTL. A sorted set
+    scored by last access time indexes the keys, so the cache keeps at most
+    ``max_entries`` responses and evicts the least recently used ones.
+    """
+    
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        max_entries: int = 10000,
+        ttl: int = 3600,
+        prefix: str = "response:",
+        codec: Optional[Codec] = None
+    ):
+        self.redis = redis_client
+        self.codec = codec or get_codec()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = prefix
+        self.index_key = f"{prefix}index"
+        self.hits = 0
+        self.misses = 0
+    
+    def make_key(self, agent_name: str, message: str, fingerprint: str) -> str:
+        """Build the cache key of an agent's response to a message in a given context."""
+        digest = hashlib.sha1(
+            f"{RoutingCache.normalize(message)}\x00{fingerprint}".encode("utf-8")
+        ).hexdigest()
+        return f"{self.prefix}{agent_name}:{digest}"
+    
+    async def get(self, key: str, model: type) -> Optional[BaseModel]:
+        """Get a cached response and mark it as recently used."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.zadd(self.index_key, {key: time.time()}, xx=True)
+            cached, _ = await pipe.execute()
+        
+        if cached is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return self.codec.decode_model(cached, model)
+    
+    async def set(self, key: str, response: BaseModel):
+        """Cache a response, evicting the least recently used ones when full."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, self.codec.encode_model(response), ex=self.ttl)
+            pipe.zadd(self.index_key, {key: time.time()})
+            pipe.zcard(self.index_key)
+            _, _, size = await pipe.execute()
+        
+        if size > self.max_entries:
+            evicted = await self.redis.zpopmin(self.index_key, size - self.max_entries)
+            if evicted:
+                await self.redis.delete(*[member for member, _ in evicted])
+    
+    def stats(self) -> dict:
+        """Get hit/miss counters for this process."""
+        return {"hits": self.hits, "misses": self.misses}
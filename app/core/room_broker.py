@@ -0,0 +1,233 @@
+from typing import Awaitable, Callable, Dict, Optional, Set
+import asyncio
+import uuid
+import redis.asyncio as redis
+from app.config import get_settings
+from app.core import codec
+
+# Called with (room, payload, exclude) for every event published to a room
+RoomDelivery = Callable[[str, str, Optional[str]], Awaitable[None]]
+
+class RedisRoomBroker:
+    """
+    Room membership and room fan-out shared by all workers through Redis.
+    
+    Membership lives in Redis, so every worker sees the same rooms.
+    Room events are published on a per-room channel; each worker subscribes
+    only to rooms that have members connected to it and delivers received
+    events to those local sockets.
+    
+    Members are stored with the worker they are connected to, and every
+    worker with members refreshes a heartbeat key that expires after
+    ``worker_ttl`` seconds. Members of a worker whose heartbeat expired,
+    e.g. because it crashed, are left out of member lists and swept from
+    Redis when their room is read.
+        
+        room:{room}:members     hash     client id -> worker id
+        room:client:{id}        set      rooms a client is in
+        room:worker:{id}        string   worker heartbeat, with a TTL
+        room:{room}:events      channel  serialised room events
+    """
+    
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        worker_id: Optional[str] = None,
+        prefix: str = "room:",
+        worker_ttl: Optional[float] = None
+    ):
+        self.redis = redis_client
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self.prefix = prefix
+        self.worker_ttl = get_settings().WS_ROOM_WORKER_TTL if worker_ttl is None else worker_ttl
+        self.swept_members = 0
+        self._deliver: Optional[RoomDelivery] = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._listening = False
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._beating = False
+        self._subscribed: Set[str] = set()
+    
+    def set_delivery(self, deliver: RoomDelivery):
+        """Set the callback delivering room events to local sockets."""
+        self._deliver = deliver
+    
+    async def join(self, room: str, client_id: str):
+        """Record a client as a member of a room."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._members_key(room), client_id, self.worker_id)
+            pipe.sadd(self._client_key(client_id), room)
+            pipe.set(self._worker_key(self.worker_id), 1, px=self._ttl_ms())
+            await pipe.execute()
+        
+        if self._heartbeat is None or self._heartbeat.done():
+            self._beating = True
+            self._heartbeat = asyncio.ensure_future(self._beat())
+    
+    async def leave(self, room: str, client_id: str):
+        """Remove a client from a room."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(self._members_key(room), client_id)
+            pipe.srem(self._client_key(client_id), room)
+            await pipe.execute()
+    
+    async def get_room_members(self, room: str) -> Set[str]:
+        """Get the members of a room across all live workers."""
+        members = {
+            codec.text(client_id): codec.text(worker_id)
+            for client_id, worker_id in (await self.redis.hgetall(self._members_key(room))).items()
+        }
+        workers = sorted(set(members.values()) - {self.worker_id})
+        if not workers:
+            return set(members)
+        
+        beats = await self.redis.mget([self._worker_key(worker_id) for worker_id in workers])
+        dead = {worker_id for worker_id, beat in zip(workers, beats) if beat is None}
+        if not dead:
+            return set(members)
+        
+        stale = {client_id: worker_id for client_id, worker_id in members.items() if worker_id in dead}
+        await self._sweep(room, stale)
+        return set(members) - set(stale)
+    
+    async def get_client_rooms(self, client_id: str) -> Set[str]:
+        """Get all rooms a client is in."""
+        return {codec.text(room) for room in await self.redis.smembers(self._client_key(client_id))}
+    
+    async def publish(self, room: str, payload: str, exclude: Optional[str] = None):
+        """Publish a serialised event to every worker with members in the room."""
+        await self.redis.publish(
+            self._channel(room),
+            codec.dumps({"payload": payload, "exclude": exclude, "origin": self.worker_id})
+        )
+    
+    async def subscribe(self, room: str):
+        """Start receiving a room's events on this worker."""
+        if room in self._subscribed:
+            return
+        if self._pubsub is None:
+            self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self._channel(room))
+        self._subscribed.add(room)
+        
+        if self._listener is None or self._listener.done():
+            self._listening = True
+            self._listener = asyncio.ensure_future(self._listen())
+    
+    async def unsubscribe(self, room: str):
+        """Stop receiving a room's events once no local member is left."""
+        if room in self._subscribed:
+            self._subscribed.discard(room)
+            await self._pubsub.unsubscribe(self._channel(room))
+    
+    async def close(self):
+        """
+        Stop listening and heartbeating, and release the pub/sub connection.
+        
+        The heartbeat key is deleted, so other workers drop this worker's
+        remaining members right away instead of after ``worker_ttl``.
+        """
+        if self._heartbeat:
+            self._beating = False
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+            try:
+                await self.redis.delete(self._worker_key(self.worker_id))
+            except Exception as e:
+                print(f"Room broker failed to remove its heartbeat: {e}")
+        if self._listener:
+            # The flag also ends the loop if a read swallows the cancellation
+            self._listening = False
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscribed.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """Subscription and sweep counters, for monitoring."""
+        return {"subscribed_rooms": len(self._subscribed), "swept_members": self.swept_members}
+    
+    async def _beat(self):
+        """Refresh this worker's heartbeat well within its TTL."""
+        while self._beating:
+            try:
+                await self.redis.set(self._worker_key(self.worker_id), 1, px=self._ttl_ms())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Room broker heartbeat error: {e}")
+            await asyncio.sleep(self.worker_ttl / 3)
+    
+    async def _sweep(self, room: str, stale: Dict[str, str]):
+        """
+        Remove members of dead workers from a room.
+        
+        Members are only removed if they are still recorded with the dead
+        worker, so a client that meanwhile rejoined through a live worker
+        stays in the room.
+        """
+        members_key = self._members_key(room)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(members_key)
+                current = await pipe.hmget(members_key, list(stale))
+                gone = [
+                    client_id
+                    for client_id, worker_id in zip(stale, current)
+                    if worker_id is not None and codec.text(worker_id) == stale[client_id]
+                ]
+                if not gone:
+                    return
+                pipe.multi()
+                pipe.hdel(members_key, *gone)
+                for client_id in gone:
+                    pipe.srem(self._client_key(client_id), room)
+                await pipe.execute()
+            except redis.WatchError:
+                # The room changed meanwhile; the next read sweeps again
+                return
+        self.swept_members += len(gone)
+    
+    async def _listen(self):
+        """Deliver published room events to local sockets."""
+        while self._listening:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None or message["type"] != "message" or self._deliver is None:
+                    continue
+                
+                channel = codec.text(message["channel"])
+                room = channel[len(self.prefix):-len(":events")]
+                event = codec.loads(message["data"])
+                await self._deliver(room, event["payload"], event["exclude"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Room broker listener error: {e}")
+                await asyncio.sleep(1.0)
+    
+    def _members_key(self, room: str) -> str:
+        return f"{self.prefix}{room}:members"
+    
+    def _client_key(self, client_id: str) -> str:
+        return f"{self.prefix}client:{client_id}"
+    
+    def _worker_key(self, worker_id: str) -> str:
+        return f"{self.prefix}worker:{worker_id}"
+    
+    def _ttl_ms(self) -> int:
+        return max(1, int(self.worker_ttl * 1000))
+    
+    def _channel(self, room: str) -> str:
+        return f"{self.prefix}{room}:events"
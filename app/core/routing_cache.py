@@ -0,0 +1,70 @@
+from typing import Any, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import time
+
+class RoutingCache:
+    """
+    In-process LRU cache of routing decisions with a time-to-live.
+    
+    Keys are built from the normalised message text plus whatever else the
+    decision depends on (registry version, threshold), so changing the set
+    of agents makes old entries unreachable; owners still call ``clear`` to
+    release them.
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+    
+    @staticmethod
+    def normalize(content: str) -> str:
+        """
+        Normalise message text for use in a cache key.
+        
+        Only case and surrounding whitespace are dropped: relevance scoring
+        lowercases messages and no keyword starts or ends with whitespace,
+        so messages with the same normalised text always score the same.
+        """
+        return content.lower().strip()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached decision, or None on a miss or expired entry."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        
+        self.misses += 1
+        return None
+    
+    def put(self, key: Hashable, value: Any):
+        """Cache a decision, evicting the least recently used one if full."""
+        if self.max_size <= 0:
+            return
+        
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def clear(self):
+        """Drop every cached decision."""
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries)
+        }
@@ -0,0 +1,240 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from collections import OrderedDict
+import asyncio
+import time
+import redis.asyncio as redis
+from app.core import codec
+
+class CachedSession(NamedTuple):
+    version: int
+    messages: List  # Decoded MessageContext entries
+    summary: List[str]
+    checked_at: float  # When the entry was last known to match Redis
+
+class SessionCache:
+    """
+    Per-worker LRU cache of decoded session messages and summaries.
+    
+    Every write to a session's messages bumps a version stamp stored with
+    the session, so an entry can be checked with one small ``HGET`` instead
+    of reading and decoding the whole message list again.
+    
+    With ``listen`` running, writers also publish the session id on an
+    invalidation channel and every other worker drops its copy when the
+    message arrives. Entries are then served without any I/O until
+    ``max_age`` seconds after they were last checked, which bounds how long
+    a lost invalidation can go unnoticed.
+    """
+    
+    def __init__(self, max_size: int = 1024, max_age: float = 30.0):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, CachedSession]" = OrderedDict()
+        self._invalidated: "OrderedDict[str, float]" = OrderedDict()  # Recent invalidation times
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._listening = False
+        self._listening_since: Optional[float] = None  # Set while invalidations are received
+        self._origin: Optional[str] = None
+    
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+    
+    @property
+    def listening(self) -> bool:
+        """Whether invalidations from other workers are being received."""
+        return self._listening_since is not None
+    
+    def get(self, session_id: str) -> Optional[CachedSession]:
+        """Get an entry that can be used without checking its version."""
+        entry = self._entries.get(session_id)
+        if entry is None or not self._trusted(entry):
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return entry
+    
+    def validate(self, session_id: str, version: int) -> Optional[CachedSession]:
+        """Get an entry if it has the version stored in Redis, dropping it otherwise."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if entry.version != version:
+            del self._entries[session_id]
+            self.stale += 1
+            return None
+        
+        entry = entry._replace(checked_at=time.monotonic())
+        self._entries[session_id] = entry
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return entry
+    
+    def put(
+        self,
+        session_id: str,
+        version: int,
+        messages: List,
+        summary: List[str],
+        read_at: Optional[float] = None
+    ):
+        """
+        Cache a session read from Redis.
+        
+        Args:
+            session_id: The session that was read
+            version: Version stamp read together with the messages
+            messages: Decoded messages
+            summary: Summary lines
+            read_at: ``time.monotonic()`` taken before the read; the entry is
+                not stored if the session was invalidated since then
+        """
+        self.misses += 1
+        if self.max_size <= 0:
+            return
+        invalidated_at = self._invalidated.get(session_id)
+        if invalidated_at is not None and read_at is not None and invalidated_at >= read_at:
+            return
+        
+        self._store(session_id, CachedSession(version, messages, summary, time.monotonic()))
+    
+    def advance(
+        self,
+        session_id: str,
+        version: int,
+        append: Sequence = (),
+        drop: int = 0,
+        summary: Sequence[str] = (),
+        summary_max_lines: int = 0
+    ):
+        """
+        Apply a write this worker made to its cached copy of the session.
+        
+        The copy is updated in place only if the write moved the session
+        from the cached version to ``version``, i.e. nobody else wrote in
+        between; otherwise it is dropped and read again on next use.
+        
+        Args:
+            session_id: The session that was written
+            version: Version stamp returned by the write
+            append: Messages appended by the write
+            drop: Number of messages evicted from the front
+            summary: Summary lines appended by the write
+            summary_max_lines: Summary lines kept, 0 for all
+        """
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+        if entry.version != version - 1:
+            del self._entries[session_id]
+            return
+        
+        messages = entry.messages[drop:] + list(append)
+        lines = entry.summary + list(summary)
+        if summary_max_lines:
+            lines = lines[-summary_max_lines:]
+        self._entries[session_id] = entry._replace(version=version, messages=messages, summary=lines)
+    
+    def discard(self, session_id: str):
+        """Drop a session's entry, e.g. after replacing the session."""
+        self._entries.pop(session_id, None)
+    
+    def invalidate(self, session_id: str):
+        """Drop a session's entry because another worker changed it."""
+        self.invalidations += 1
+        self._entries.pop(session_id, None)
+        self._invalidated[session_id] = time.monotonic()
+        self._invalidated.move_to_end(session_id)
+        while len(self._invalidated) > max(self.max_size, 1):
+            self._invalidated.popitem(last=False)
+    
+    def clear(self):
+        """Drop every entry."""
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries)
+        }
+    
+    async def listen(self, redis_client: redis.Redis, channel: str, origin: str):
+        """
+        Start receiving invalidations published on ``channel``.
+        
+        Args:
+            redis_client: Client to subscribe with
+            channel: Channel writers publish invalidations on
+            origin: This worker's id; its own invalidations are ignored
+        """
+        if self._pubsub is not None:
+            return
+        self._origin = origin
+        self._pubsub = redis_client.pubsub()
+        await self._pubsub.subscribe(channel)
+        self._listening = True
+        self._listening_since = time.monotonic()
+        self._listener = asyncio.ensure_future(self._listen())
+    
+    async def close(self):
+        """Stop listening and release the pub/sub connection."""
+        self._listening_since = None
+        if self._listener:
+            # The flag also ends the loop if a read swallows the cancellation
+            self._listening = False
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+    
+    def _trusted(self, entry: CachedSession) -> bool:
+        """Whether an entry is covered by invalidations and recent enough."""
+        return (
+            self._listening_since is not None
+            and entry.checked_at >= self._listening_since
+            and time.monotonic() - entry.checked_at < self.max_age
+        )
+    
+    def _store(self, session_id: str, entry: CachedSession):
+        self._entries[session_id] = entry
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    async def _listen(self):
+        """Drop entries other workers have invalidated."""
+        while self._listening:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if self._listening_since is None:
+                    # Reconnected after an error; entries cached before it are checked again
+                    self._listening_since = time.monotonic()
+                if message is None or message["type"] != "message":
+                    continue
+                
+                event = codec.loads(message["data"])
+                if event["origin"] != self._origin:
+                    self.invalidate(event["session_id"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Invalidations may have been lost, so stop trusting entries
+                print(f"Session cache listener error: {e}")
+                self._listening_since = None
+                await asyncio.sleep(1.0)
@@ -1,62 +1,156 @@
-import json
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import redis.asyncio as redis
 from app.core.config import settings
+from app.core.codec import Codec, get_codec
+from app.core.history_writer import HistoryWriter
+from app.core.redis_pool import get_redis
 
 class SessionManager:
-    def __init__(self):
-        self.mongo_client = AsyncIOMotorClient(settings.MONGODB_URL)
-        self.db = self.mongo_client[settings.DATABASE_NAME]
-        self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-        
-    async def get_context(self, session_id: str) -> Dict:
-        """Retrieve session context from Redis (recent) and MongoDB (historical)."""
-        # Get recent context from Redis
-        recent_context = await self.redis_client.get(f"context:{session_id}")
-        recent_context = json.loads(recent_context) if recent_context else []
+    """
+    Session context in two tiers.
+    
+    Redis (hot) keeps the last ``recent_limit`` messages of active sessions;
+    MongoDB (cold) keeps the longer history. Reads are served from Redis
+    when it holds enough, and sessions read back from MongoDB are promoted
+    into Redis so their next reads stay hot.
+    """
+    
+    def __init__(
+        self,
+        codec: Optional[Codec] = None,
+        redis_client: Optional[redis.Redis] = None,
+        db=None
+    ):
+        self.codec = codec or get_codec()
+        if db is None:
+            self.mongo_client = AsyncIOMotorClient(settings.MONGODB_URL)
+            db = self.mongo_client[settings.DATABASE_NAME]
+        self.db = db
+        self.redis_client = redis_client or get_redis()
+        self.recent_limit = 10
+        self.recent_ttl = 3600  # 1 hour
+        # Mongo history is written behind the request path, in batches
+        self.history = HistoryWriter(self.db.contexts)
+        self.tier_stats = {"hot_reads": 0, "cold_reads": 0, "promotions": 0}
+    
+    async def get_context(self, session_id: str, history_limit: Optional[int] = None) -> Dict:
+        """
+        Retrieve session context from Redis (recent) and MongoDB (historical).
+        
+        Both tiers are read concurrently, and MongoDB returns only the last
+        ``history_limit`` messages. A session missing from Redis is promoted
+        from its history.
+        
+        Args:
+            session_id: The session to read
+            history_limit: Historical messages to return, all kept ones by default
+        """
+        limit = history_limit or self.history.max_history
+        recent_context, historical_context = await asyncio.gather(
+            self._read_recent(session_id),
+            self._read_history(session_id, limit)
+        )
+        self.tier_stats["cold_reads"] += 1
         
-        # Get historical context from MongoDB
-        historical_context = await self.db.contexts.find_one({"session_id": session_id})
-        historical_context = historical_context["context"] if historical_context else []
+        if recent_context is None:
+            recent_context = historical_context[-self.recent_limit:]
+            await self._promote(session_id, recent_context)
         
         return {
             "recent": recent_context,
             "historical": historical_context
         }
     
+    async def get_recent_messages(self, session_id: str, limit: int = 10) -> List:
+        """
+        Get the last ``limit`` messages of a session, touching MongoDB only if needed.
+        
+        Redis answers when it holds at least ``limit`` messages. Otherwise,
+        or when more than Redis ever keeps is asked for, the messages come
+        from MongoDB and the session is promoted back into Redis.
+        """
+        if limit <= self.recent_limit:
+            recent_context = await self._read_recent(session_id)
+            if recent_context is not None and len(recent_context) >= limit:
+                self.tier_stats["hot_reads"] += 1
+                return recent_context[-limit:]
+        else:
+            recent_context = None
+        
+        historical_context = await self._read_history(session_id, max(limit, self.recent_limit))
+        self.tier_stats["cold_reads"] += 1
+        if recent_context is None:
+            await self._promote(session_id, historical_context[-self.recent_limit:])
+        return historical_context[-limit:]
+    
     async def update_context(self, session_id: str, message: str):
         """Update session context in both Redis and MongoDB."""
         # Update recent context in Redis
-        recent_context = await self.redis_client.get(f"context:{session_id}")
-        recent_context = json.loads(recent_context) if recent_context else []
+        recent_context = await self._read_recent(session_id) or []
         recent_context.append(message)
         
-        # Keep only last 10 messages in recent context
-        if len(recent_context) > 10:
-            recent_context = recent_context[-10:]
+        # Keep only the last messages in recent context
+        if len(recent_context) > self.recent_limit:
+            recent_context = recent_context[-self.recent_limit:]
         
         await self.redis_client.set(
             f"context:{session_id}",
-            json.dumps(recent_context),
-            ex=3600  # Expire after 1 hour
+            self.codec.encode(recent_context),
+            ex=self.recent_ttl
         )
         
-        # Update historical context in MongoDB
-        await self.db.contexts.update_one(
-            {"session_id": session_id},
-            {
-                "$push": {
-                    "context": {
-                        "$each": [message],
-                        "$slice": -100  # Keep last 100 messages
-                    }
-                }
-            },
-            upsert=True
-        )
+        # Queue the historical context update for the next MongoDB batch
+        self.history.append(session_id, message)
     
     async def clear_context(self, session_id: str):
         """Clear session context from both Redis and MongoDB."""
         await self.redis_client.delete(f"context:{session_id}")
+        await self.history.discard(session_id)
         await self.db.contexts.delete_one({"session_id": session_id})
+    
+    def get_history_stats(self) -> Dict[str, int]:
+        """Get the write-behind queue depth and flush counters."""
+        return self.history.stats()
+    
+    def get_tier_stats(self) -> Dict[str, int]:
+        """Get how many reads were served hot, went to MongoDB, or promoted a session."""
+        return dict(self.tier_stats)
+    
+    async def close(self):
+        """Flush queued history writes; call on shutdown."""
+        await self.history.close()
+    
+    async def _read_recent(self, session_id: str) -> Optional[List]:
+        """Read the hot tier; None if the session isn't in Redis."""
+        recent_context = await self.redis_client.get(f"context:{session_id}")
+        return self.codec.decode(recent_context) if recent_context else None
+    
+    async def _read_history(self, session_id: str, limit: int) -> List:
+        """Read the last ``limit`` messages of the cold tier, including unflushed appends."""
+        document = await self.db.contexts.find_one(
+            {"session_id": session_id},
+            {"_id": 0, "context": {"$slice": -limit}}
+        )
+        historical_context = document["context"] if document else []
+        
+        # Include appends that haven't been flushed yet
+        pending = self.history.pending(session_id)
+        if pending:
+            historical_context = (historical_context + pending)[-limit:]
+        return historical_context
+    
+    async def _promote(self, session_id: str, recent_context: List):
+        """Copy a cold session's latest messages back into Redis."""
+        if not recent_context:
+            return
+        # NX: don't overwrite messages written since the history was read
+        promoted = await self.redis_client.set(
+            f"context:{session_id}",
+            self.codec.encode(recent_context),
+            ex=self.recent_ttl,
+            nx=True
+        )
+        if promoted:
+            self.tier_stats["promotions"] += 1
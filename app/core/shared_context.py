@@ -1,8 +1,15 @@
-from typing import Dict, List, Optional, Set
-import json
+from typing import Dict, List, Optional, Set, Tuple, Union
 from datetime import datetime, timedelta
+import time
+import uuid
 import redis.asyncio as redis
 from pydantic import BaseModel
+from app.config import get_settings
+from app.core.codec import Codec, dumps, get_codec, text
+from app.core import tracing
+from app.core.metrics import CONTEXT_LATENCY
+from app.core.redis_pool import get_redis
+from app.core.session_cache import SessionCache
 
 class MessageContext(BaseModel):
     content: str
@@ -18,14 +25,92 @@ class SessionContext(BaseModel):
     active_agents: Set[str]
     messages: List[MessageContext]
     metadata: Dict = {}
+    summary: List[str] = []  # One line per evicted message, oldest first
 
 class SharedContextManager:
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
-        self.redis = redis.from_url(redis_url, decode_responses=True)
+    """
+    Session context stored in Redis.
+    
+    Each session is spread over several keys so every write is a single
+    append or set operation instead of a read-modify-write of the whole
+    session:
+    
+        session:{id}:header     hash  created_at / last_updated / version
+        session:{id}:messages   list  encoded MessageContext entries
+        session:{id}:agents     set   active agent ids
+        session:{id}:metadata   hash  encoded metadata values
+        session:{id}:summary    list  summary lines of evicted messages
+    
+    Sessions used to be a single JSON string at ``session:{id}``, which is
+    why the header has a key of its own; such a string is left alone and
+    expires with its old TTL, and ``create_session`` deletes it.
+    
+    The message list is bounded by a retention policy: once a session holds
+    more than ``max_messages`` messages or ``max_bytes`` of encoded messages,
+    the oldest ones are evicted and, if enabled, folded into the summary.
+    
+    Values are encoded by ``codec`` (JSON or tagged msgpack, see
+    app.core.codec); either encoding is read back.
+    
+    Decoded messages and summaries are kept in a per-worker LRU cache (see
+    app.core.session_cache). Every write to them bumps the session's
+    ``version``, so a cached copy is checked with one ``HGET``; with
+    ``cache_invalidation`` on, writes are also announced on
+    ``session:invalidate`` and cached copies are used without any I/O.
+    
+    By default the manager uses the application's shared Redis pool; pass
+    ``redis_client`` to inject another client or ``redis_url`` to give it
+    a pool of its own. A custom codec needs a client whose
+    ``decode_responses`` matches ``codec.decode_responses``.
+    """
+    
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        summarize_evicted: Optional[bool] = None,
+        codec: Optional[Codec] = None,
+        redis_client: Optional[redis.Redis] = None,
+        cache_size: Optional[int] = None,
+        cache_invalidation: Optional[bool] = None
+    ):
+        settings = get_settings()
+        self.codec = codec or get_codec()
+        if redis_client is not None:
+            self.redis = redis_client
+        elif redis_url:
+            self.redis = redis.from_url(redis_url, decode_responses=self.codec.decode_responses)
+        else:
+            self.redis = get_redis()
         self.session_ttl = 3600  # 1 hour
         self.context_prefix = "context:"
         self.session_prefix = "session:"
         self.agent_prefix = "agent:"
+        
+        # Retention policy
+        self.max_messages = settings.SESSION_MAX_MESSAGES if max_messages is None else max_messages
+        self.max_bytes = settings.SESSION_MAX_BYTES if max_bytes is None else max_bytes
+        self.summarize_evicted = (
+            settings.SESSION_SUMMARY_ENABLED
+            if summarize_evicted is None else summarize_evicted
+        )
+        self.summary_max_lines = settings.SESSION_SUMMARY_MAX_LINES
+        self.retention_stats = {
+            "trimmed_sessions": 0,
+            "evicted_messages": 0,
+            "evicted_bytes": 0
+        }
+        
+        # Per-worker cache of decoded messages, see app.core.session_cache
+        cache_size = settings.SESSION_CACHE_SIZE if cache_size is None else cache_size
+        self.cache = SessionCache(cache_size, settings.SESSION_CACHE_MAX_AGE) if cache_size > 0 else None
+        self.cache_invalidation = (
+            settings.SESSION_CACHE_INVALIDATION
+            if cache_invalidation is None else cache_invalidation
+        )
+        self.worker_id = uuid.uuid4().hex
+        self.invalidation_channel = f"{self.session_prefix}invalidate"
     
     async def create_session(self, session_id: str) -> SessionContext:
         """Create a new session context."""
@@ -42,6 +127,7 @@ class SharedContextManager:
         await self._save_session(session)
         return session
     
+    @CONTEXT_LATENCY.labels("add_message").time()
     async def add_message(
         self,
         session_id: str,
@@ -50,64 +136,146 @@ class SharedContextManager:
         agent_id: Optional[str] = None,
         confidence: Optional[float] = None
     ) -> bool:
-        """Add a message to the session context."""
-        session = await self.get_session(session_id)
-        if not session:
-            session = await self.create_session(session_id)
-        
+        """Add a message to the session context, creating the session if needed."""
+        now = datetime.utcnow().isoformat()
         message = MessageContext(
             content=content,
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=now,
             sender_id=sender_id,
             agent_id=agent_id,
             confidence=confidence
         )
         
-        session.messages.append(message)
-        session.last_updated = datetime.utcnow().isoformat()
+        encoded = self.codec.encode_model(message)
         
-        if agent_id:
-            session.active_agents.add(agent_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(self._session_key(session_id), "created_at", now)
+            pipe.hset(self._session_key(session_id), "last_updated", now)
+            pipe.rpush(self._messages_key(session_id), encoded)
+            pipe.hincrby(self._session_key(session_id), "size", _byte_length(encoded))
+            version_index = self._queue_version_bump(pipe, session_id)
+            if agent_id:
+                pipe.sadd(self._agents_key(session_id), agent_id)
+            self._queue_expire(pipe, session_id)
+            results = await pipe.execute()
         
-        await self._save_session(session)
+        if self.cache is not None:
+            self.cache.advance(session_id, results[version_index], append=[message])
+        await self._enforce_retention(session_id, length=results[2], size=results[3])
         return True
     
+    @CONTEXT_LATENCY.labels("get_session").time()
     async def get_session(self, session_id: str) -> Optional[SessionContext]:
-        """Retrieve a session context."""
-        session_data = await self.redis.get(f"{self.session_prefix}{session_id}")
-        if not session_data:
+        """
+        Retrieve a session context.
+        
+        Only the stored messages go through validation, batched into one
+        call; the session itself is assembled from values this manager
+        wrote, so it is built with ``model_construct`` instead of being
+        validated a second time. The decoded messages also refresh the
+        session cache.
+        """
+        read_at = time.monotonic()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self._session_key(session_id))
+            pipe.lrange(self._messages_key(session_id), 0, -1)
+            pipe.smembers(self._agents_key(session_id))
+            pipe.hgetall(self._metadata_key(session_id))
+            pipe.lrange(self._summary_key(session_id), 0, -1)
+            header, messages, agents, metadata, summary = await pipe.execute()
+        
+        if not header:
             return None
         
-        session_dict = json.loads(session_data)
-        return SessionContext(**session_dict)
+        header = {text(key): text(value) for key, value in header.items()}
+        messages = self._decode_messages(messages)
+        summary = [text(line) for line in summary]
+        if self.cache is not None:
+            self.cache.put(session_id, int(header.get("version", 0)), list(messages), list(summary), read_at)
+        return SessionContext.model_construct(
+            session_id=session_id,
+            created_at=header.get("created_at", header.get("last_updated", "")),
+            last_updated=header.get("last_updated", ""),
+            active_agents={text(agent) for agent in agents},
+            messages=messages,
+            metadata={text(key): self.codec.decode(value) for key, value in metadata.items()},
+            summary=summary
+        )
     
+    @CONTEXT_LATENCY.labels("get_recent_messages").time()
     async def get_recent_messages(
         self,
         session_id: str,
         limit: int = 10
     ) -> List[MessageContext]:
         """Get recent messages from a session."""
-        session = await self.get_session(session_id)
-        if not session:
-            return []
+        if self.cache is None:
+            messages = await self.redis.lrange(self._messages_key(session_id), -limit, -1)
+            return self._decode_messages(messages)
         
-        return session.messages[-limit:]
+        messages, _, _, _ = await self._read_messages(session_id)
+        return messages[-limit:]
     
+    @CONTEXT_LATENCY.labels("get_agent_context").time()
     async def get_agent_context(
         self,
         session_id: str,
         agent_id: str
     ) -> List[MessageContext]:
-        """Get context specific to an agent."""
-        session = await self.get_session(session_id)
-        if not session:
-            return []
+        """
+        Get context specific to an agent.
         
-        # Filter messages relevant to the agent
-        return [
-            msg for msg in session.messages
-            if msg.agent_id == agent_id or not msg.agent_id
-        ]
+        When evicted messages are summarised, the summary is prepended as a
+        single system message so agents keep sight of the older conversation.
+        """
+        if self.cache is None and not self.summarize_evicted:
+            messages = await self.redis.lrange(self._messages_key(session_id), 0, -1)
+            return self._build_agent_context(self._decode_messages(messages), [], agent_id)
+        
+        messages, summary, _, _ = await self._read_messages(session_id)
+        return self._build_agent_context(
+            messages,
+            summary if self.summarize_evicted else [],
+            agent_id
+        )
+    
+    def turn(self, session_id: str) -> "ContextTurn":
+        """
+        Start a batched context transaction for one routed message.
+        
+        Use as ``async with manager.turn(session_id) as turn:``. The session
+        is read once on enter and every queued write is flushed in a single
+        pipeline on exit, so a turn costs two round trips however many
+        agents take part.
+        """
+        return ContextTurn(self, session_id)
+    
+    async def get_session_usage(self, session_id: str) -> Dict[str, int]:
+        """Get the stored size of a session and how much it has evicted so far."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.llen(self._messages_key(session_id))
+            pipe.hmget(self._session_key(session_id), "size", "evicted_messages", "evicted_bytes")
+            length, (size, evicted_messages, evicted_bytes) = await pipe.execute()
+        
+        return {
+            "messages": length,
+            "bytes": int(size or 0),
+            "evicted_messages": int(evicted_messages or 0),
+            "evicted_bytes": int(evicted_bytes or 0)
+        }
+    
+    def get_retention_stats(self) -> Dict[str, int]:
+        """Get eviction totals for this process, across all sessions."""
+        return dict(self.retention_stats)
+    
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Get the session cache's counters, empty if the cache is disabled."""
+        return self.cache.stats() if self.cache is not None else {}
+    
+    async def close(self):
+        """Stop receiving cache invalidations; call on shutdown."""
+        if self.cache is not None:
+            await self.cache.close()
     
     async def update_metadata(
         self,
@@ -115,14 +283,18 @@ class SharedContextManager:
         metadata: Dict
     ) -> bool:
         """Update session metadata."""
-        session = await self.get_session(session_id)
-        if not session:
+        if not await self.redis.exists(self._session_key(session_id)):
             return False
         
-        session.metadata.update(metadata)
-        session.last_updated = datetime.utcnow().isoformat()
-        
-        await self._save_session(session)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if metadata:
+                pipe.hset(
+                    self._metadata_key(session_id),
+                    mapping={key: self.codec.encode(value) for key, value in metadata.items()}
+                )
+            pipe.hset(self._session_key(session_id), "last_updated", datetime.utcnow().isoformat())
+            self._queue_expire(pipe, session_id)
+            await pipe.execute()
         return True
     
     async def add_active_agent(
@@ -131,36 +303,389 @@ class SharedContextManager:
         agent_id: str
     ) -> bool:
         """Add an agent to the active agents list."""
-        session = await self.get_session(session_id)
-        if not session:
+        if not await self.redis.exists(self._session_key(session_id)):
             return False
         
-        session.active_agents.add(agent_id)
-        session.last_updated = datetime.utcnow().isoformat()
-        
-        await self._save_session(session)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.sadd(self._agents_key(session_id), agent_id)
+            pipe.hset(self._session_key(session_id), "last_updated", datetime.utcnow().isoformat())
+            self._queue_expire(pipe, session_id)
+            await pipe.execute()
         return True
     
     async def get_active_agents(self, session_id: str) -> Set[str]:
         """Get list of active agents in the session."""
-        session = await self.get_session(session_id)
-        if not session:
-            return set()
-        
-        return session.active_agents
+        return {text(agent) for agent in await self.redis.smembers(self._agents_key(session_id))}
     
     async def _save_session(self, session: SessionContext):
-        """Save session data to Redis."""
-        session_data = session.model_dump_json()
-        await self.redis.set(
-            f"{self.session_prefix}{session.session_id}",
-            session_data,
-            ex=self.session_ttl
-        )
+        """Save a complete session to Redis, replacing any existing data."""
+        session_id = session.session_id
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*self._session_keys(session_id), self._legacy_key(session_id))
+            encoded = [self.codec.encode_model(message) for message in session.messages]
+            pipe.hset(
+                self._session_key(session_id),
+                mapping={
+                    "created_at": session.created_at,
+                    "last_updated": session.last_updated,
+                    "size": sum(_byte_length(raw) for raw in encoded)
+                }
+            )
+            if encoded:
+                pipe.rpush(self._messages_key(session_id), *encoded)
+            if session.summary:
+                pipe.rpush(self._summary_key(session_id), *session.summary)
+            if session.active_agents:
+                pipe.sadd(self._agents_key(session_id), *session.active_agents)
+            if session.metadata:
+                pipe.hset(
+                    self._metadata_key(session_id),
+                    mapping={key: self.codec.encode(value) for key, value in session.metadata.items()}
+                )
+            self._queue_version_bump(pipe, session_id)
+            self._queue_expire(pipe, session_id)
+            await pipe.execute()
+        
+        if self.cache is not None:
+            self.cache.discard(session_id)
     
     async def extend_session(self, session_id: str):
         """Extend the TTL of a session."""
-        await self.redis.expire(
-            f"{self.session_prefix}{session_id}",
-            self.session_ttl
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._queue_expire(pipe, session_id)
+            await pipe.execute()
+    
+    @staticmethod
+    def _build_agent_context(
+        messages: List[MessageContext],
+        summary: List[str],
+        agent_id: str
+    ) -> List[MessageContext]:
+        """Filter messages relevant to an agent, prefixed by any summary."""
+        context = [
+            msg for msg in messages
+            if msg.agent_id == agent_id or not msg.agent_id
+        ]
+        if summary:
+            context.insert(0, MessageContext(
+                content="Earlier in this conversation:\n" + "\n".join(summary),
+                timestamp=context[0].timestamp if context else datetime.utcnow().isoformat(),
+                sender_id="system"
+            ))
+        return context
+    
+    async def _enforce_retention(self, session_id: str, length: int, size: int):
+        """
+        Evict the oldest messages of a session that is over its limits.
+        
+        The counts reported by the append only tell whether eviction may be
+        needed. The surplus is then read again and trimmed under WATCH, so
+        writers appending to the same session at once evict it exactly once
+        between them rather than each evicting the overflow it saw.
+        
+        Args:
+            session_id: The session that was just appended to
+            length: Message count reported by the append
+            size: Encoded message bytes reported by the append
+        """
+        if not self._over_limits(length, size):
+            return
+        
+        messages_key = self._messages_key(session_id)
+        session_key = self._session_key(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Every append changes the list, so watching it covers the size too
+                    await pipe.watch(messages_key)
+                    length = await pipe.llen(messages_key)
+                    size = int(await pipe.hget(session_key, "size") or 0)
+                    if not self._over_limits(length, size):
+                        return
+                    
+                    overflow = length - self.max_messages if self.max_messages else 0
+                    evicted = await pipe.lrange(messages_key, 0, overflow - 1) if overflow > 0 else []
+                    size -= sum(_byte_length(raw) for raw in evicted)
+                    
+                    # Byte overflow is rare (one oversized message), so read one at a time
+                    while self.max_bytes and size > self.max_bytes:
+                        raw = await pipe.lindex(messages_key, len(evicted))
+                        if raw is None:
+                            break
+                        evicted.append(raw)
+                        size -= _byte_length(raw)
+                    
+                    evicted_bytes = sum(_byte_length(raw) for raw in evicted)
+                    summary = []
+                    if self.summarize_evicted:
+                        summary = [self._summarize(message) for message in self._decode_messages(evicted)]
+                    
+                    pipe.multi()
+                    pipe.ltrim(messages_key, len(evicted), -1)
+                    pipe.hincrby(session_key, "size", -evicted_bytes)
+                    pipe.hincrby(session_key, "evicted_messages", len(evicted))
+                    pipe.hincrby(session_key, "evicted_bytes", evicted_bytes)
+                    version_index = self._queue_version_bump(pipe, session_id)
+                    if summary:
+                        pipe.rpush(self._summary_key(session_id), *summary)
+                        pipe.ltrim(self._summary_key(session_id), -self.summary_max_lines, -1)
+                        pipe.expire(self._summary_key(session_id), self.session_ttl)
+                    results = await pipe.execute()
+                    break
+                except redis.WatchError:
+                    # Another writer appended or trimmed meanwhile; look again
+                    continue
+        
+        if self.cache is not None:
+            self.cache.advance(
+                session_id,
+                results[version_index],
+                drop=len(evicted),
+                summary=summary,
+                summary_max_lines=self.summary_max_lines
+            )
+        
+        self.retention_stats["trimmed_sessions"] += 1
+        self.retention_stats["evicted_messages"] += len(evicted)
+        self.retention_stats["evicted_bytes"] += evicted_bytes
+    
+    def _over_limits(self, length: int, size: int) -> bool:
+        """Whether a session with this many messages and bytes must be trimmed."""
+        return bool(
+            (self.max_messages and length > self.max_messages)
+            or (self.max_bytes and size > self.max_bytes)
         )
+    
+    def _decode_messages(self, encoded: List[Union[str, bytes]]) -> List[MessageContext]:
+        """Decode stored messages."""
+        return self.codec.decode_models(encoded, MessageContext)
+    
+    async def _read_messages(
+        self,
+        session_id: str
+    ) -> Tuple[List[MessageContext], List[str], int, int]:
+        """
+        Read a session's messages and summary lines, through the cache.
+        
+        A cached copy is used as is while invalidations cover it, after a
+        version check otherwise. A miss reads the messages, summary and
+        version in one MULTI so the cached copy matches its version.
+        
+        Returns:
+            Messages, summary lines, round trips and Redis operations used
+        """
+        cache = self.cache
+        if cache is None:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.lrange(self._messages_key(session_id), 0, -1)
+                pipe.lrange(self._summary_key(session_id), 0, -1)
+                messages, summary = await pipe.execute()
+            return self._decode_messages(messages), [text(line) for line in summary], 1, 2
+        
+        if self.cache_invalidation:
+            await cache.listen(self.redis, self.invalidation_channel, self.worker_id)
+        
+        round_trips = operations = 0
+        entry = cache.get(session_id)
+        if entry is None and session_id in cache:
+            version = await self.redis.hget(self._session_key(session_id), "version")
+            round_trips, operations = 1, 1
+            entry = cache.validate(session_id, int(version or 0))
+        if entry is not None:
+            return list(entry.messages), list(entry.summary), round_trips, operations
+        
+        read_at = time.monotonic()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hget(self._session_key(session_id), "version")
+            pipe.lrange(self._messages_key(session_id), 0, -1)
+            pipe.lrange(self._summary_key(session_id), 0, -1)
+            version, messages, summary = await pipe.execute()
+        
+        messages = self._decode_messages(messages)
+        summary = [text(line) for line in summary]
+        cache.put(session_id, int(version or 0), messages, summary, read_at)
+        return list(messages), list(summary), round_trips + 1, operations + 3
+    
+    def _queue_version_bump(self, pipe, session_id: str) -> int:
+        """
+        Queue a version bump for a change to a session's messages or summary.
+        
+        A new session's version starts from the current time in microseconds,
+        so a session recreated after it expired never repeats a version that
+        a worker may still have cached.
+        
+        Returns:
+            Index of the new version in the pipeline's results
+        """
+        session_key = self._session_key(session_id)
+        pipe.hsetnx(session_key, "version", time.time_ns() // 1000)
+        pipe.hincrby(session_key, "version", 1)
+        index = len(pipe) - 1
+        if self.cache_invalidation:
+            pipe.publish(
+                self.invalidation_channel,
+                dumps({"origin": self.worker_id, "session_id": session_id})
+            )
+        return index
+    
+    @staticmethod
+    def _summarize(message: MessageContext, max_length: int = 100) -> str:
+        """Condense an evicted message into one summary line."""
+        content = " ".join(message.content.split())
+        if len(content) > max_length:
+            content = content[:max_length - 3] + "..."
+        return f"{message.sender_id}: {content}"
+    
+    def _queue_expire(self, pipe, session_id: str):
+        """Queue a TTL refresh for every key of a session."""
+        for key in self._session_keys(session_id):
+            pipe.expire(key, self.session_ttl)
+    
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.session_prefix}{session_id}:header"
+    
+    def _legacy_key(self, session_id: str) -> str:
+        """Where sessions were stored as one JSON string before the split layout."""
+        return f"{self.session_prefix}{session_id}"
+    
+    def _messages_key(self, session_id: str) -> str:
+        return f"{self.session_prefix}{session_id}:messages"
+    
+    def _agents_key(self, session_id: str) -> str:
+        return f"{self.session_prefix}{session_id}:agents"
+    
+    def _metadata_key(self, session_id: str) -> str:
+        return f"{self.session_prefix}{session_id}:metadata"
+    
+    def _summary_key(self, session_id: str) -> str:
+        return f"{self.session_prefix}{session_id}:summary"
+    
+    def _session_keys(self, session_id: str) -> List[str]:
+        return [
+            self._session_key(session_id),
+            self._messages_key(session_id),
+            self._agents_key(session_id),
+            self._metadata_key(session_id),
+            self._summary_key(session_id)
+        ]
+
+def _byte_length(value: Union[str, bytes]) -> int:
+    """Size of a stored value in bytes."""
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+
+class ContextTurn:
+    """
+    Reads and writes of one routed message, batched into two round trips.
+    
+    On enter the session's messages (and summary) are read in one pipeline.
+    Agent context is then served from that snapshot plus the messages queued
+    during the turn, and all queued writes go out in one MULTI pipeline on
+    exit, together with the TTL refresh.
+    """
+    
+    def __init__(self, manager: SharedContextManager, session_id: str):
+        self.manager = manager
+        self.session_id = session_id
+        self.round_trips = 0
+        self.operations = 0
+        self._messages: List[MessageContext] = []
+        self._summary: List[str] = []
+        self._pending_messages: List[MessageContext] = []
+        self._pending_agents: Set[str] = set()
+    
+    async def __aenter__(self) -> "ContextTurn":
+        await self.load()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        # Flush even when the turn failed so the user's message is kept
+        await self.commit()
+    
+    @CONTEXT_LATENCY.labels("turn_load").time()
+    @tracing.traced("context.load")
+    async def load(self):
+        """Read the current session state in one round trip, or none if it is cached."""
+        manager = self.manager
+        messages, summary, round_trips, operations = await manager._read_messages(self.session_id)
+        
+        self._messages = messages
+        self._summary = summary if manager.summarize_evicted else []
+        self.round_trips += round_trips
+        self.operations += operations
+        tracing.current_span().set_attribute("redis_operations", operations)
+    
+    def add_message(
+        self,
+        content: str,
+        sender_id: str,
+        agent_id: Optional[str] = None,
+        confidence: Optional[float] = None
+    ):
+        """Queue a message; it is visible to agent context right away."""
+        self._pending_messages.append(MessageContext(
+            content=content,
+            timestamp=datetime.utcnow().isoformat(),
+            sender_id=sender_id,
+            agent_id=agent_id,
+            confidence=confidence
+        ))
+        if agent_id:
+            self._pending_agents.add(agent_id)
+    
+    def add_active_agent(self, agent_id: str):
+        """Queue an agent for the active agents set."""
+        self._pending_agents.add(agent_id)
+    
+    def get_agent_context(self, agent_id: str) -> List[MessageContext]:
+        """Get context specific to an agent without touching Redis."""
+        return self.manager._build_agent_context(
+            self._messages + self._pending_messages,
+            self._summary,
+            agent_id
+        )
+    
+    def get_recent_messages(self, limit: int = 10) -> List[MessageContext]:
+        """Get recent messages, including those queued in this turn."""
+        return (self._messages + self._pending_messages)[-limit:]
+    
+    @CONTEXT_LATENCY.labels("turn_commit").time()
+    @tracing.traced("context.commit")
+    async def commit(self) -> int:
+        """
+        Flush queued writes in a single pipeline.
+        
+        Returns:
+            Number of Redis operations performed by the turn so far
+        """
+        manager = self.manager
+        session_key = manager._session_key(self.session_id)
+        messages = self._pending_messages
+        agents = self._pending_agents
+        self._pending_messages, self._pending_agents = [], set()
+        
+        encoded = [manager.codec.encode_model(message) for message in messages]
+        now = datetime.utcnow().isoformat()
+        
+        async with manager.redis.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(session_key, "created_at", now)
+            pipe.hset(session_key, "last_updated", now)
+            if encoded:
+                pipe.rpush(manager._messages_key(self.session_id), *encoded)
+                pipe.hincrby(session_key, "size", sum(_byte_length(raw) for raw in encoded))
+                version_index = manager._queue_version_bump(pipe, self.session_id)
+            if agents:
+                pipe.sadd(manager._agents_key(self.session_id), *agents)
+            manager._queue_expire(pipe, self.session_id)
+            queued = len(pipe)
+            results = await pipe.execute()
+        
+        self._messages.extend(messages)
+        self.round_trips += 1
+        self.operations += queued
+        tracing.current_span().set_attribute("redis_operations", queued)
+        
+        if encoded:
+            if manager.cache is not None:
+                manager.cache.advance(self.session_id, results[version_index], append=messages)
+            await manager._enforce_retention(self.session_id, length=results[2], size=results[3])
+        return self.operations
@@ -0,0 +1,301 @@
+from typing import Any, Dict, List, Optional
+from contextvars import ContextVar
+import functools
+import json
+import os
+import time
+from app.config import get_settings
+
+# Innermost span of the running task; tasks inherit it when they are created
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    """
+    A timed stage of handling a message, with OpenTelemetry span fields.
+    
+    Spans of one trace share the root's ``spans`` list, in start order,
+    which is exported (and summarised) once the root span ends.
+    """
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent", "attributes", "status",
+        "status_message", "start_ns", "end_ns", "spans", "_started", "_token", "_tracer"
+    )
+    
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        tracer: Optional["Tracer"] = None
+    ):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = attributes or {}
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = 0
+        self.end_ns = 0
+        self.spans: List[Span] = parent.spans if parent else []
+        self._started = 0
+        self._token = None
+        self._tracer = tracer
+    
+    @property
+    def ended(self) -> bool:
+        return self.end_ns != 0
+    
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+    
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+    
+    def __enter__(self) -> "Span":
+        # Wall clock start for exporters, monotonic clock for the duration
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self.spans.append(self)
+        self._token = _current.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = self.start_ns + max(1, time.perf_counter_ns() - self._started)
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.status = STATUS_ERROR
+            self.status_message = exc_type.__name__
+        elif self.status == STATUS_UNSET:
+            self.status = STATUS_OK
+        if self._tracer is not None:
+            self._tracer.export(self)
+    
+    def summary(self) -> dict:
+        """
+        Compact timing of this trace, for a debug response.
+        
+        Returns:
+            Total milliseconds and one entry per finished span in start
+            order, with its nesting depth and attributes
+        """
+        depths = {self.span_id: 0}
+        stages = []
+        for span in self.spans:
+            if span.parent is not None:
+                depths[span.span_id] = depths.get(span.parent.span_id, 0) + 1
+            if span is self or not span.ended:
+                continue
+            stage = {"span": span.name, "ms": round(span.duration_ms, 3), "depth": depths[span.span_id]}
+            stage.update(span.attributes)
+            if span.status == STATUS_ERROR:
+                stage["error"] = span.status_message
+            stages.append(stage)
+        return {"trace_id": self.trace_id, "total_ms": round(self.duration_ms, 3), "spans": stages}
+
+class _NoopSpan:
+    """Stands in for a span when nothing is being traced."""
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def __enter__(self) -> "_NoopSpan":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class ConsoleExporter:
+    """Prints each finished trace as one OTLP JSON line."""
+    
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+    
+    def export(self, spans: List[Span]):
+        print(json.dumps(to_otlp(spans, self.service_name), separators=(",", ":")))
+
+class FileExporter:
+    """
+    Appends each finished trace as one OTLP JSON line to a file.
+    
+    The format is what the OpenTelemetry Collector's ``otlpjsonfile``
+    receiver reads, so traces can be forwarded to any tracing backend.
+    """
+    
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._file = None
+    
+    def export(self, spans: List[Span]):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(to_otlp(spans, self.service_name), separators=(",", ":")) + "\n")
+        self._file.flush()
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class InMemoryExporter:
+    """Keeps finished traces in a list, for tests."""
+    
+    def __init__(self):
+        self.traces: List[List[Span]] = []
+    
+    def export(self, spans: List[Span]):
+        self.traces.append(spans)
+
+def create_exporter(kind: str, path: Optional[str] = None, service_name: Optional[str] = None):
+    """
+    Create a span exporter by name.
+    
+    Args:
+        kind: "console" or "file"
+        path: File to append traces to, for the file exporter
+        service_name: ``service.name`` resource attribute of exported spans
+    
+    Returns:
+        The exporter
+    """
+    settings = get_settings()
+    service_name = service_name or settings.APP_NAME
+    if kind == "console":
+        return ConsoleExporter(service_name)
+    if kind == "file":
+        return FileExporter(path or settings.TRACING_FILE, service_name)
+    raise ValueError(f"Unknown trace exporter {kind!r}, expected 'console' or 'file'")
+
+class Tracer:
+    """
+    Starts traces and hands finished ones to an exporter.
+    
+    Tracing is opt-in: unless it is enabled, or a trace is forced for a
+    debug request, no span is created and instrumented code only pays for
+    a context variable lookup.
+    """
+    
+    def __init__(self, enabled: bool = False, exporter=None):
+        self.enabled = enabled
+        self.exporter = exporter
+    
+    def trace(self, name: str, force: bool = False, **attributes):
+        """
+        Start a trace, or a child span if one is already in progress.
+        
+        Args:
+            name: Name of the root span
+            force: Record this trace even when tracing is disabled; it is
+                then only available through ``Span.summary``
+            **attributes: Attributes of the root span
+        
+        Returns:
+            A context manager yielding the span, or a no-op span
+        """
+        parent = _current.get()
+        if parent is not None:
+            return Span(name, parent, attributes)
+        if not (self.enabled or force):
+            return NOOP_SPAN
+        return Span(name, attributes=attributes, tracer=self)
+    
+    def export(self, root: Span):
+        if not self.enabled or self.exporter is None:
+            return
+        try:
+            self.exporter.export([span for span in root.spans if span.ended])
+        except Exception as e:
+            print(f"Error exporting trace {root.trace_id}: {e}")
+
+def span(name: str, **attributes):
+    """Time a block as a child of the current span; a no-op outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent, attributes)
+
+def traced(name: str):
+    """Decorate an async function to run every call in a child span."""
+    def decorate(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            parent = _current.get()
+            if parent is None:
+                return await function(*args, **kwargs)
+            with Span(name, parent):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def current_span():
+    """The innermost span of the running task, or a no-op span."""
+    return _current.get() or NOOP_SPAN
+
+def trace(name: str, force: bool = False, **attributes):
+    """Start a trace with the application's tracer; see ``Tracer.trace``."""
+    return TRACER.trace(name, force, **attributes)
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}  # OTLP JSON encodes 64-bit ints as strings
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    elif isinstance(value, (list, tuple)):
+        typed = {"arrayValue": {"values": [_attribute("", item)["value"] for item in value]}}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+def to_otlp(spans: List[Span], service_name: str) -> dict:
+    """
+    Encode spans of one trace as an OTLP/JSON ``ExportTraceServiceRequest``.
+    
+    Args:
+        spans: Finished spans
+        service_name: ``service.name`` resource attribute
+    
+    Returns:
+        The request body, as sent to an OTLP/HTTP collector
+    """
+    encoded = []
+    for span in spans:
+        item = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [_attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": span.status}
+        }
+        if span.parent is not None:
+            item["parentSpanId"] = span.parent.span_id
+        if span.status_message:
+            item["status"]["message"] = span.status_message
+        encoded.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": encoded}]
+        }]
+    }
+
+def _create_tracer() -> Tracer:
+    settings = get_settings()
+    if not settings.TRACING_ENABLED:
+        return Tracer()
+    return Tracer(enabled=True, exporter=create_exporter(settings.TRACING_EXPORTER))
+
+TRACER = _create_tracer()
@@ -1,24 +1,107 @@
-from typing import Dict, Set, Optional
+from typing import AsyncGenerator, Callable, Dict, Set, Optional
 from fastapi import WebSocket, WebSocketDisconnect
-import json
+import asyncio
 from datetime import datetime
 from pydantic import BaseModel
+from app.config import get_settings
+from app.core import codec
+from app.core.metrics import WS_MESSAGES_SENT, WS_SEND_LATENCY
+from app.core.room_broker import RedisRoomBroker
 
 class WebSocketMessage(BaseModel):
     event: str
     data: dict
     room: Optional[str] = None
 
+class ClientConnection:
+    """
+    A connected client with its own bounded outbound queue.
+    
+    A dedicated writer task drains the queue, so a slow client only delays
+    its own messages. Payloads are pre-serialised text frames, which lets a
+    broadcast enqueue the same string for every recipient.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        max_queue: int,
+        on_failure: Callable[[str], None]
+    ):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._on_failure = on_failure
+        self._writer = asyncio.ensure_future(self._write_loop())
+    
+    def enqueue(self, payload: str) -> bool:
+        """Queue a payload for sending; returns False if the queue is full."""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            return False
+    
+    async def close(self, code: Optional[int] = None):
+        """Stop the writer and optionally close the socket."""
+        self._writer.cancel()
+        if code is not None:
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass  # Already closed by the client
+    
+    async def _write_loop(self):
+        """Send queued payloads one at a time until cancelled."""
+        try:
+            while True:
+                payload = await self.queue.get()
+                with WS_SEND_LATENCY.time():
+                    await self.websocket.send_text(payload)
+                WS_MESSAGES_SENT.inc()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Send to client {self.client_id} failed: {e}")
+            self._on_failure(self.client_id)
+
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+    """
+    Tracks this worker's sockets and rooms.
+    
+    With a ``broker``, room membership is also kept in Redis and room
+    broadcasts are published there, so members connected to other workers
+    receive them too. Each worker only delivers to its own sockets.
+    """
+    
+    def __init__(
+        self,
+        send_queue_size: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        broker: Optional[RedisRoomBroker] = None
+    ):
+        settings = get_settings()
+        self.active_connections: Dict[str, ClientConnection] = {}
         self.client_rooms: Dict[str, Set[str]] = {}
         self.room_clients: Dict[str, Set[str]] = {}
+        self.send_queue_size = settings.WS_SEND_QUEUE_SIZE if send_queue_size is None else send_queue_size
+        self.overflow_policy = overflow_policy or settings.WS_OVERFLOW_POLICY
+        self.dropped_messages = 0
+        self.overflow_disconnects = 0
+        self.broker = broker
+        if broker:
+            broker.set_delivery(self._deliver_local)
     
     async def connect(self, websocket: WebSocket, client_id: str):
         """Connect a new client."""
         await websocket.accept()
-        self.active_connections[client_id] = websocket
+        self.active_connections[client_id] = ClientConnection(
+            websocket,
+            client_id,
+            max_queue=self.send_queue_size,
+            on_failure=self._on_send_failure
+        )
         
         # Send welcome message
         await self.send_personal_message(
@@ -33,17 +116,24 @@ class WebSocketManager:
     
     async def disconnect(self, client_id: str):
         """Disconnect a client and clean up their room memberships."""
-        # Remove from all rooms
-        if client_id in self.client_rooms:
-            for room in self.client_rooms[client_id]:
-                self.room_clients[room].remove(client_id)
-                if not self.room_clients[room]:
+        # Remove from all rooms before awaiting anything, so a second
+        # disconnect of the same client finds nothing left to clean up
+        rooms = self.client_rooms.pop(client_id, set())
+        for room in rooms:
+            members = self.room_clients.get(room)
+            if members is not None:
+                members.discard(client_id)
+                if not members:
                     del self.room_clients[room]
-            del self.client_rooms[client_id]
         
         # Remove connection
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+        connection = self.active_connections.pop(client_id, None)
+        if connection:
+            await connection.close()
+        
+        if self.broker:
+            for room in rooms:
+                await self._leave_shared_room(client_id, room)
     
     async def join_room(self, client_id: str, room: str):
         """Add a client to a room."""
@@ -59,6 +149,10 @@ class WebSocketManager:
         self.room_clients[room].add(client_id)
         self.client_rooms[client_id].add(room)
         
+        if self.broker:
+            await self.broker.join(room, client_id)
+            await self.broker.subscribe(room)
+        
         # Notify room members
         await self.broadcast_to_room(
             room=room,
@@ -80,6 +174,9 @@ class WebSocketManager:
             if not self.room_clients[room]:
                 del self.room_clients[room]
             
+            if self.broker:
+                await self._leave_shared_room(client_id, room)
+            
             # Notify remaining room members
             await self.broadcast_to_room(
                 room=room,
@@ -95,29 +192,141 @@ class WebSocketManager:
         """Send a message to a specific client."""
         if client_id in self.active_connections:
             message = WebSocketMessage(event=event, data=data)
-            await self.active_connections[client_id].send_json(message.model_dump())
+            await self._enqueue(client_id, codec.dumps_model(message))
     
     async def broadcast(self, event: str, data: dict, exclude: Optional[str] = None):
         """Broadcast a message to all connected clients except excluded one."""
-        message = WebSocketMessage(event=event, data=data)
-        for client_id, connection in self.active_connections.items():
+        # Serialise once and share the payload between all recipients
+        payload = codec.dumps_model(WebSocketMessage(event=event, data=data))
+        for client_id in list(self.active_connections):
             if client_id != exclude:
-                await connection.send_json(message.model_dump())
+                await self._enqueue(client_id, payload)
     
     async def broadcast_to_room(self, room: str, event: str, data: dict, exclude: Optional[str] = None):
         """Broadcast a message to all clients in a room except excluded one."""
+        if self.broker:
+            # Every worker with members in the room, this one included,
+            # receives the event and delivers it to its own sockets
+            payload = codec.dumps_model(WebSocketMessage(event=event, data=data, room=room))
+            await self.broker.publish(room, payload, exclude)
+            return
+        
         if room not in self.room_clients:
             return
         
-        message = WebSocketMessage(event=event, data=data, room=room)
-        for client_id in self.room_clients[room]:
+        payload = codec.dumps_model(WebSocketMessage(event=event, data=data, room=room))
+        await self._deliver_local(room, payload, exclude)
+    
+    async def _deliver_local(self, room: str, payload: str, exclude: Optional[str] = None):
+        """Queue a serialised room event for this worker's members of the room."""
+        for client_id in list(self.room_clients.get(room, ())):
             if client_id != exclude and client_id in self.active_connections:
-                await self.active_connections[client_id].send_json(message.model_dump())
+                await self._enqueue(client_id, payload)
+    
+    async def _leave_shared_room(self, client_id: str, room: str):
+        """Drop a client from the shared room and stop listening once no local member is left."""
+        await self.broker.leave(room, client_id)
+        if room not in self.room_clients:
+            await self.broker.unsubscribe(room)
+    
+    async def _enqueue(self, client_id: str, payload: str):
+        """Queue a payload for a client, applying the overflow policy if it is full."""
+        connection = self.active_connections.get(client_id)
+        if connection is None or connection.enqueue(payload):
+            return
+        
+        if self.overflow_policy == "drop":
+            self.dropped_messages += 1
+            return
+        
+        # The client can't keep up; close it (1013: try again later)
+        self.overflow_disconnects += 1
+        print(f"Client {client_id} send queue full, disconnecting")
+        self.active_connections.pop(client_id, None)
+        await connection.close(code=1013)
+        await self.disconnect(client_id)
+    
+    def _on_send_failure(self, client_id: str):
+        """Drop a client whose socket failed while sending."""
+        connection = self.active_connections.pop(client_id, None)
+        if connection:
+            asyncio.ensure_future(self._close_failed(connection))
+    
+    async def _close_failed(self, connection: ClientConnection):
+        await connection.close(code=1011)
+        await self.disconnect(connection.client_id)
+    
+    async def send_event(self, event: str, data: dict, client_id: str, room: Optional[str] = None):
+        """Send an event to a room if given, otherwise to a single client."""
+        if room:
+            await self.broadcast_to_room(room=room, event=event, data=data)
+        else:
+            await self.send_personal_message(event=event, data=data, client_id=client_id)
+    
+    async def forward_stream(
+        self,
+        events: AsyncGenerator[dict, None],
+        session_id: str,
+        client_id: str,
+        room: Optional[str] = None,
+        request_id: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Forward streamed agent output as ``chat_chunk`` events.
+        
+        Args:
+            events: Events from Orchestrator.stream_message
+            session_id: Session the output belongs to
+            client_id: Client to send to when no room is given
+            room: Optional room to broadcast the chunks to
+            request_id: Optional ID of the request, echoed in every chunk
+            
+        Returns:
+            The final aggregated response, or None if the stream ended early
+        """
+        response = None
+        try:
+            async for event in events:
+                if event["type"] == "chunk":
+                    await self.send_event(
+                        event="chat_chunk",
+                        data={
+                            "agent": event["agent"],
+                            "content": event["content"],
+                            "session_id": session_id,
+                            "request_id": request_id,
+                            "timestamp": datetime.utcnow().isoformat()
+                        },
+                        client_id=client_id,
+                        room=room
+                    )
+                elif event["type"] == "response":
+                    response = event["response"]
+        finally:
+            # Stop the agents right away if sending failed
+            await events.aclose()
+        return response
     
     def get_room_members(self, room: str) -> Set[str]:
-        """Get all client IDs in a room."""
+        """Get all client IDs in a room connected to this worker."""
         return self.room_clients.get(room, set())
     
+    async def fetch_room_members(self, room: str) -> Set[str]:
+        """Get all client IDs in a room across every worker."""
+        if self.broker:
+            return await self.broker.get_room_members(room)
+        return set(self.get_room_members(room))
+    
     def get_client_rooms(self, client_id: str) -> Set[str]:
         """Get all rooms a client is in."""
         return self.client_rooms.get(client_id, set())
+    
+    def stats(self) -> Dict[str, int]:
+        """Get this worker's connection and room counts and send queue counters."""
+        return {
+            "connections": len(self.active_connections),
+            "rooms": len(self.room_clients),
+            "queued_messages": sum(connection.queue.qsize() for connection in self.active_connections.values()),
+            "dropped_messages": self.dropped_messages,
+            "overflow_disconnects": self.overflow_disconnects
+        }
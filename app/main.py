@@ -1,12 +1,18 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Dict, List
-import json
+from functools import partial
+import asyncio
+import uuid
 
+from app.core import codec, metrics
 from app.core.config import settings
 from app.core.agent_manager import AgentManager
 from app.core.session_manager import SessionManager
 from app.core.message_router import MessageRouter
+from app.core.redis_pool import close_redis, get_pool_stats
+from app.core.request_pipeline import RequestPipeline
 
 app = FastAPI(title="Multi-Agent Chat System")
 
@@ -42,31 +48,65 @@ class ConnectionManager:
 
 ws_manager = ConnectionManager()
 
+metrics.REGISTRY.register_stats("chat_redis_pool", "Shared Redis connection pool usage.", get_pool_stats)
+metrics.REGISTRY.register_stats("chat_session_history", "MongoDB history write-behind queue.", session_manager.get_history_stats)
+metrics.REGISTRY.register_stats("chat_session_tiers", "Session reads by tier.", session_manager.get_tier_stats)
+metrics.REGISTRY.register_gauge(
+    "chat_websocket_connections",
+    "Open WebSocket connections.",
+    lambda: [({}, len(ws_manager.active_connections))]
+)
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await ws_manager.connect(websocket, client_id)
-    try:
-        while True:
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-            
+    # Messages are processed concurrently; those of one session stay in order
+    pipeline = RequestPipeline()
+    send_lock = asyncio.Lock()
+    
+    async def process(message_data: dict, request_id: str, session_id: str):
+        try:
             # Process the message through the router
             response = await message_router.route_message(
                 message_data["content"],
                 message_data.get("mention"),
-                client_id
+                session_id
             )
             
             # Update session context
-            await session_manager.update_context(client_id, message_data["content"])
+            await session_manager.update_context(session_id, message_data["content"])
+            reply = {**response, "request_id": request_id}
+        except Exception as e:
+            reply = {"request_id": request_id, "error": str(e)}
+        
+        # Send response back to the client
+        async with send_lock:
+            await websocket.send_text(codec.dumps(reply))
+    
+    try:
+        while True:
+            data = await websocket.receive_text()
+            message_data = codec.loads(data)
+            request_id = str(message_data.get("request_id") or uuid.uuid4())
+            session_id = message_data.get("session_id", client_id)
             
-            # Send response back to the client
-            await websocket.send_text(json.dumps(response))
+            await pipeline.submit(
+                partial(process, message_data, request_id, session_id),
+                session_id=session_id
+            )
             
     except WebSocketDisconnect:
+        await pipeline.cancel()
         ws_manager.disconnect(client_id)
         await ws_manager.broadcast(f"Client #{client_id} left the chat")
 
+@app.get("/metrics")
+async def get_metrics():
+    """Expose metrics in the Prometheus text format."""
+    if not metrics.REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize system components on startup."""
@@ -78,8 +118,15 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown."""
-    # Clean up WebSocket connections
-    for client_id in list(ws_manager.active_connections.keys()):
-        await ws_manager.disconnect(client_id)
+    try:
+        # Clean up WebSocket connections
+        for client_id in list(ws_manager.active_connections.keys()):
+            ws_manager.disconnect(client_id)
+    finally:
+        # Write queued session history, then close the shared Redis pool
+        try:
+            await session_manager.close()
+        finally:
+            await close_redis()
     
     print("Multi-agent chat system shut down successfully")
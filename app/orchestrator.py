@@ -1,8 +1,16 @@
-from typing import Dict, Optional, List, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, List, Tuple
 import asyncio
+import contextlib
 from fastapi import WebSocket
 from pydantic import BaseModel
-from app.core.shared_context import SharedContextManager, MessageContext
+from app.core.shared_context import SharedContextManager, MessageContext, ContextTurn
+from app.config import get_settings
+from app.core.executor import AgentExecutor
+from app.core.routing_cache import RoutingCache
+from app.core.response_cache import ResponseCache
+from app.core import metrics, tracing
+from app.core.metrics import AGENT_LATENCY, STAGE_LATENCY
+from app.agents.keyword_matcher import KeywordMatcher, NO_HITS
 
 class Message(BaseModel):
     content: str
@@ -10,6 +18,7 @@ class Message(BaseModel):
     mention: Optional[str] = None
     context_id: Optional[str] = None
     confidence_threshold: float = 0.3  # Minimum confidence for agent to handle message
+    debug: bool = False  # Attach a timing breakdown of the turn to the response
 
 class Response(BaseModel):
     content: str
@@ -18,11 +27,66 @@ class Response(BaseModel):
     needs_rerouting: bool = False
 
 class Orchestrator:
-    def __init__(self):
+    def __init__(
+        self,
+        concurrent_dispatch: Optional[bool] = None,
+        agent_timeout: Optional[float] = None,
+        max_reroute_hops: Optional[int] = None
+    ):
+        settings = get_settings()
         self._agents: Dict[str, 'BaseAgent'] = {}
         self._active_connections: Dict[str, WebSocket] = {}
         self._context_manager = SharedContextManager()
         self._mention_pattern = r'@(\w+)'
+        self._keyword_matcher = KeywordMatcher()
+        self._baseline_scores: Dict[str, float] = {}  # Score of keyword agents without any hit
+        self._baseline_ranking: List[Tuple[float, str]] = []
+        self._custom_scored: Dict[str, 'BaseAgent'] = {}  # Agents with their own calculate_relevance
+        self._registration_order: Dict[str, int] = {}
+        self._registry_version = 0
+        self._routing_cache = RoutingCache(
+            max_size=settings.ROUTING_CACHE_SIZE,
+            ttl=settings.ROUTING_CACHE_TTL
+        )
+        self._response_cache = ResponseCache(
+            self._context_manager.redis,
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            ttl=settings.RESPONSE_CACHE_TTL,
+            codec=self._context_manager.codec
+        ) if settings.RESPONSE_CACHE_ENABLED else None
+        self.concurrent_dispatch = (
+            settings.AGENT_CONCURRENT_DISPATCH
+            if concurrent_dispatch is None else concurrent_dispatch
+        )
+        self.agent_timeout = settings.AGENT_TIMEOUT if agent_timeout is None else agent_timeout
+        self.max_reroute_hops = settings.MAX_REROUTE_HOPS if max_reroute_hops is None else max_reroute_hops
+        self._executor = AgentExecutor()
+    
+    def register_metrics(self, registry: Optional[metrics.Registry] = None):
+        """
+        Expose this orchestrator's cache and executor counters on /metrics.
+        
+        The metric names are fixed, so call this for the application's
+        orchestrator only; registering another one replaces its collectors.
+        
+        Args:
+            registry: Registry to add the collectors to, the global one by default
+        """
+        registry = registry or metrics.REGISTRY
+        registry.register_stats(
+            "chat_routing_cache", "Routing decision cache counters.", self.routing_cache_stats
+        )
+        registry.register_stats(
+            "chat_session_cache", "Session context cache counters.", self.session_cache_stats
+        )
+        registry.register_stats(
+            "chat_response_cache",
+            "Shared agent response cache counters.",
+            self._response_cache.stats if self._response_cache else dict
+        )
+        registry.register_stats(
+            "chat_agent_executor", "Thread and process pools of off-loop agents.", self._executor.stats
+        )
     
     async def parse_mentions(self, message: str) -> List[str]:
         """Extract @mentions from message."""
@@ -32,58 +96,189 @@ class Orchestrator:
     
     async def register_agent(self, agent: 'BaseAgent'):
         """Register a new agent with the orchestrator."""
+        self._executor.check(agent)
         self._agents[agent.name] = agent
+        agent.executor = self._executor
+        
+        # Share one keyword scan per message across all agents
+        self._keyword_matcher.register(agent)
+        agent.keyword_matcher = self._keyword_matcher
+        if agent.cacheable:
+            agent.response_cache = self._response_cache
+        if agent.scores_by_keywords:
+            self._baseline_scores[agent.name] = agent.score_relevance(NO_HITS)
+            self._custom_scored.pop(agent.name, None)
+        else:
+            self._baseline_scores.pop(agent.name, None)
+            self._custom_scored[agent.name] = agent
+        self._registration_order.setdefault(agent.name, len(self._registration_order))
+        self._on_registry_change()
         print(f"Agent {agent.name} registered successfully")
     
     async def unregister_agent(self, agent_name: str):
         """Remove an agent from the orchestrator."""
         if agent_name in self._agents:
-            del self._agents[agent_name]
+            agent = self._agents.pop(agent_name)
+            self._keyword_matcher.unregister(agent_name)
+            self._baseline_scores.pop(agent_name, None)
+            self._custom_scored.pop(agent_name, None)
+            self._on_registry_change()
+            agent.keyword_matcher = None
+            agent.response_cache = None
+            agent.executor = None
             print(f"Agent {agent_name} unregistered successfully")
     
+    def _on_registry_change(self):
+        """Refresh derived routing state after an agent was added or removed."""
+        self._update_baseline_ranking()
+        
+        # Cached routing decisions refer to the old registry
+        self._registry_version += 1
+        self._routing_cache.clear()
+    
+    def _update_baseline_ranking(self):
+        """Sort keyword agents by the score they get without any hit."""
+        self._baseline_ranking = sorted(
+            ((score, name) for name, score in self._baseline_scores.items()),
+            reverse=True
+        )
+    
+    def routing_cache_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters of the routing decision cache."""
+        return self._routing_cache.stats()
+    
+    def session_cache_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters of the session context cache."""
+        return self._context_manager.get_cache_stats()
+    
+    async def close(self):
+        """Release the agent pools and the context manager's background resources; call on shutdown."""
+        self._executor.shutdown()
+        await self._context_manager.close()
+    
+    @STAGE_LATENCY.labels("route").time()
     async def route_message(self, message: Message) -> dict:
-        """Route a message to appropriate agent(s) and aggregate responses."""
-        # Create or update session context
-        await self._context_manager.add_message(
-            session_id=message.context_id,
-            content=message.content,
+        """
+        Route a message to appropriate agent(s) and aggregate responses.
+        
+        When tracing is enabled, or the message asks for debug output, every
+        stage of the turn is recorded as a span; debug responses carry the
+        resulting breakdown under ``timing``.
+        """
+        with tracing.trace(
+            "route_message",
+            force=message.debug,
+            context_id=message.context_id,
             sender_id=message.sender_id
-        )
+        ) as trace:
+            # All context reads and writes of this message share one transaction,
+            # which also extends the session TTL when it is committed
+            async with self._context_manager.turn(message.context_id) as turn:
+                turn.add_message(
+                    content=message.content,
+                    sender_id=message.sender_id
+                )
+                response = await self._route_turn(_RoutingTurn(self, message, turn))
+        
+        if message.debug:
+            response = {**response, "timing": trace.summary()}
+        return response
+    
+    async def stream_message(self, message: Message) -> AsyncIterator[dict]:
+        """
+        Route a message and yield agent output as soon as it is produced.
+        
+        Yields ``{"type": "chunk", "agent": ..., "content": ...}`` events,
+        interleaved across agents, followed by one
+        ``{"type": "response", "response": ...}`` event carrying the same
+        aggregated response route_message would return. Agents that stream
+        natively emit their chunks while they run; other agents emit their
+        whole reply as one chunk as soon as it is ready.
         
+        A debug message's final response carries a ``timing`` breakdown as
+        in route_message, covering the dispatch stages; the context is read
+        before and written after the traced part of a streamed turn.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def on_chunk(agent_name: str, chunk: str):
+            queue.put_nowait({"type": "chunk", "agent": agent_name, "content": chunk})
+        
+        async with self._context_manager.turn(message.context_id) as turn:
+            turn.add_message(
+                content=message.content,
+                sender_id=message.sender_id
+            )
+            
+            async def route() -> dict:
+                try:
+                    # Spans can't stay open across the generator's yields,
+                    # so the streamed trace starts inside the routing task
+                    with tracing.trace(
+                        "stream_message",
+                        force=message.debug,
+                        context_id=message.context_id,
+                        sender_id=message.sender_id
+                    ) as trace:
+                        response = await self._route_turn(_RoutingTurn(self, message, turn, on_chunk))
+                    if message.debug:
+                        response = {**response, "timing": trace.summary()}
+                    return response
+                finally:
+                    queue.put_nowait(None)
+            
+            task = asyncio.ensure_future(route())
+            try:
+                while (event := await queue.get()) is not None:
+                    yield event
+                yield {"type": "response", "response": await task}
+            finally:
+                # The consumer may stop early, e.g. when the client disconnects.
+                # Wait for routing to stop before the turn commits, so none of
+                # its writes land in a turn that was already flushed
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+    
+    @STAGE_LATENCY.labels("dispatch").time()
+    @tracing.traced("dispatch")
+    async def _route_turn(self, routing: '_RoutingTurn') -> dict:
+        """Route a message within an open context transaction."""
+        metrics.MESSAGES_ROUTED.inc()
+        message = routing.message
         # Extract mentions
         mentions = await self.parse_mentions(message.content)
         responses = []
         
         if mentions:
             # Handle explicit mentions
+            agents = [self._agents[mention] for mention in mentions if mention in self._agents]
+            results = iter(await self._run_agents(agents, routing))
+            
             for mention in mentions:
-                if mention in self._agents:
-                    agent = self._agents[mention]
-                    response = await self._process_agent_response(agent, message)
-                    responses.append(response)
-                    
-                    # Update context with agent's response
-                    await self._context_manager.add_message(
-                        session_id=message.context_id,
-                        content=response["content"],
-                        sender_id=agent.name,
-                        agent_id=agent.name,
-                        confidence=response["confidence"]
-                    )
-                else:
+                if mention not in self._agents:
                     responses.append({
                         "agent": "system",
                         "content": f"Agent @{mention} not found",
                         "confidence": 0.0
                     })
+                    continue
+                
+                response = next(results)
+                if response is None:
+                    responses.append({
+                        "agent": "system",
+                        "content": f"Agent @{mention} did not respond in time",
+                        "confidence": 0.0
+                    })
+                else:
+                    responses.append(response)
         else:
             # Find relevant agents based on content
-            relevant_agents = await self._find_relevant_agents(
-                message.content,
-                threshold=message.confidence_threshold
-            )
+            relevant_agents = await routing.ranking()
             
             if not relevant_agents:
+                metrics.NO_AGENT_RESULTS.inc()
                 return {
                     "agent": "system",
                     "content": "No agent found suitable to handle this message",
@@ -91,77 +286,277 @@ class Orchestrator:
                 }
             
             # Process message with relevant agents
-            for agent, confidence in relevant_agents:
-                response = await self._process_agent_response(agent, message)
-                if response["confidence"] >= message.confidence_threshold:
-                    responses.append(response)
-                    
-                    # Update context with agent's response
-                    await self._context_manager.add_message(
-                        session_id=message.context_id,
-                        content=response["content"],
-                        sender_id=agent.name,
-                        agent_id=agent.name,
-                        confidence=response["confidence"]
-                    )
-        
-        # Extend session TTL
-        await self._context_manager.extend_session(message.context_id)
+            results = await self._run_agents(
+                [agent for agent, _ in relevant_agents],
+                routing,
+                min_confidence=message.confidence_threshold
+            )
+            responses.extend(response for response in results if response is not None)
         
         # Aggregate responses
-        return await self._aggregate_responses(responses)
+        with tracing.span("aggregate", responses=len(responses)):
+            return await self._aggregate_responses(responses)
     
+    async def _run_agents(
+        self,
+        agents: List['BaseAgent'],
+        routing: '_RoutingTurn',
+        min_confidence: Optional[float] = None
+    ) -> List[Optional[dict]]:
+        """
+        Process a message with several agents and record their replies.
+        
+        Agents run one after another, or all at once when concurrent dispatch
+        is enabled. Either way the result list lines up with ``agents`` and
+        replies are written to the session context in that same order.
+        
+        Args:
+            agents: Agents to process the message with
+            routing: State of the message being routed
+            min_confidence: Optional confidence a reply needs to be kept
+            
+        Returns:
+            One entry per agent: the reply, or None if the agent timed out
+            or fell below ``min_confidence``
+        """
+        if self.concurrent_dispatch and len(agents) > 1:
+            tasks = [
+                asyncio.ensure_future(self._process_with_timeout(agent, routing, min_confidence))
+                for agent in agents
+            ]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                # Don't leave sibling agents running once the turn has failed
+                for task in tasks:
+                    task.cancel()
+                raise
+            
+            for agent, response in zip(agents, results):
+                if response is not None:
+                    self._record_response(routing.context, agent, response)
+            return results
+        
+        responses = []
+        for agent in agents:
+            response = await self._process_with_timeout(agent, routing, min_confidence)
+            if response is not None:
+                self._record_response(routing.context, agent, response)
+            responses.append(response)
+        return responses
+    
+    async def _process_with_timeout(
+        self,
+        agent: 'BaseAgent',
+        routing: '_RoutingTurn',
+        min_confidence: Optional[float] = None
+    ) -> Optional[dict]:
+        """
+        Process a message with an agent, giving up after the agent timeout.
+        
+        When the turn is streamed, an accepted reply is forwarded as soon as
+        this agent is done rather than after all agents have finished.
+        """
+        try:
+            response = await asyncio.wait_for(
+                self._process_agent_response(agent, routing),
+                timeout=self.agent_timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Agent {agent.name} timed out after {self.agent_timeout}s")
+            metrics.AGENT_TIMEOUTS.labels(agent.name).inc()
+            return None
+        
+        response = self._accept_response(response, min_confidence)
+        if (
+            response is not None
+            and routing.on_chunk is not None
+            and response["agent"] not in routing.streamed_agents
+        ):
+            await routing.on_chunk(response["agent"], response["content"])
+        return response
+    
+    @staticmethod
+    def _accept_response(response: Optional[dict], min_confidence: Optional[float]) -> Optional[dict]:
+        """Drop replies that are missing or below the required confidence."""
+        if response is None:
+            return None
+        if min_confidence is not None and response["confidence"] < min_confidence:
+            return None
+        return response
+    
+    @staticmethod
+    def _record_response(turn: ContextTurn, agent: 'BaseAgent', response: dict):
+        """Update context with an agent's response."""
+        turn.add_message(
+            content=response["content"],
+            sender_id=agent.name,
+            agent_id=agent.name,
+            confidence=response["confidence"]
+        )
+    
+    @STAGE_LATENCY.labels("relevance").time()
+    @tracing.traced("relevance")
     async def _find_relevant_agents(
         self,
         content: str,
         threshold: float = 0.3
     ) -> List[Tuple['BaseAgent', float]]:
-        """Find agents relevant to the message content."""
-        relevance_scores = []
-        for agent in self._agents.values():
+        """
+        Find agents relevant to the message content.
+        
+        Keyword-based agents are scored together from one matcher scan: its
+        posting lists act as a sparse keyword-by-agent matrix, so only agents
+        with a hit need scoring and the rest keep the baseline score computed
+        at registration. Agents with their own ``calculate_relevance`` are
+        still asked one by one.
+        
+        Keyword scores are deterministic, so they are cached per normalised
+        message, registry version and threshold; custom-scored agents are
+        never cached.
+        """
+        relevance_scores = list(self._score_keyword_agents(content, threshold))
+        
+        for agent in self._custom_scored.values():
             confidence = await agent.calculate_relevance(content)
             if confidence >= threshold:
                 relevance_scores.append((agent, confidence))
         
-        # Sort by confidence
-        return sorted(relevance_scores, key=lambda x: x[1], reverse=True)
+        # Sort by confidence, ties in registration order
+        return sorted(
+            relevance_scores,
+            key=lambda x: (-x[1], self._registration_order[x[0].name])
+        )
+    
+    def _score_keyword_agents(
+        self,
+        content: str,
+        threshold: float
+    ) -> List[Tuple['BaseAgent', float]]:
+        """Score keyword-based agents, using the routing cache when possible."""
+        cache_key = (RoutingCache.normalize(content), self._registry_version, threshold)
+        cached = self._routing_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        hits = self._keyword_matcher.scan(content)
+        relevance_scores = []
+        
+        for name, agent_hits in hits.items():
+            if name in self._baseline_scores:
+                confidence = self._agents[name].score_relevance(agent_hits)
+                if confidence >= threshold:
+                    relevance_scores.append((self._agents[name], confidence))
+        
+        # Baselines are sorted, so stop at the first one below the threshold
+        for baseline, name in self._baseline_ranking:
+            if baseline < threshold:
+                break
+            if name not in hits:
+                relevance_scores.append((self._agents[name], baseline))
+        
+        self._routing_cache.put(cache_key, relevance_scores)
+        return relevance_scores
     
-    async def _process_agent_response(self, agent: 'BaseAgent', message: Message) -> dict:
-        """Process message with an agent and handle potential rerouting."""
+    @tracing.traced("agent")
+    async def _process_agent_response(
+        self,
+        agent: 'BaseAgent',
+        routing: '_RoutingTurn',
+        path: Tuple[str, ...] = ()
+    ) -> dict:
+        """
+        Process message with an agent and handle potential rerouting.
+        
+        An agent that asks for rerouting passes the message on to the best
+        ranked agent not yet on this chain, at most ``max_reroute_hops``
+        times, so agents that all decline can't hand it back and forth.
+        Candidates come from the turn's ranking, which is scored once and
+        shared by every chain of the turn.
+        
+        Args:
+            agent: Agent to process the message with
+            routing: State of the message being routed
+            path: Agents that already passed this message on, in order
+            
+        Returns:
+            The reply; a rerouted reply lists the agents it went through
+            under ``reroute_path``
+        """
+        message = routing.message
+        path = path + (agent.name,)
+        span = tracing.current_span()
+        span.set_attribute("agent", agent.name)
+        
         # Get agent-specific context
-        context = await self._context_manager.get_agent_context(
-            message.context_id,
-            agent.name
-        )
+        context = routing.context.get_agent_context(agent.name)
         
-        response = await agent.process_message(message.content, context)
+        if routing.on_chunk is not None and agent.streams_natively:
+            return await self._stream_agent_response(agent, routing, context)
+        
+        with AGENT_LATENCY.labels(agent.name).time(), tracing.span("agent.respond"):
+            response = await agent.respond(message.content, context)
         
         if response.needs_rerouting:
+            metrics.REROUTES.labels(agent.name).inc()
             # Try to find another agent if current one couldn't handle it
-            other_agents = await self._find_relevant_agents(
-                message.content,
-                threshold=message.confidence_threshold
-            )
-            other_agents = [a for a, _ in other_agents if a.name != agent.name]
+            next_agent = await self._next_reroute(routing, path)
             
-            if other_agents:
-                new_response = await self._process_agent_response(
-                    other_agents[0],
-                    message
-                )
-                return new_response
+            if next_agent is not None:
+                # The other agent's span nests in this one, so a trace shows the chain
+                span.set_attribute("rerouted_to", next_agent.name)
+                return await self._process_agent_response(next_agent, routing, path)
+            # Out of hops or candidates: keep this agent's reply
+            metrics.REROUTE_LIMITS.inc()
         
         # Add agent to active agents list
-        await self._context_manager.add_active_agent(
-            message.context_id,
-            agent.name
-        )
+        routing.context.add_active_agent(agent.name)
         
-        return {
+        reply = {
             "agent": agent.name,
             "content": response.content,
             "confidence": response.confidence
         }
+        if len(path) > 1:
+            reply["reroute_path"] = list(path)
+        return reply
+    
+    async def _next_reroute(
+        self,
+        routing: '_RoutingTurn',
+        path: Tuple[str, ...]
+    ) -> Optional['BaseAgent']:
+        """Pick the best ranked agent not on the reroute path, or None when the chain must stop."""
+        if len(path) > self.max_reroute_hops:
+            return None
+        for candidate, _ in await routing.ranking():
+            if candidate.name not in path:
+                return candidate
+        return None
+    
+    async def _stream_agent_response(
+        self,
+        agent: 'BaseAgent',
+        routing: '_RoutingTurn',
+        context: List[MessageContext]
+    ) -> dict:
+        """Forward a natively streaming agent's chunks and collect its reply."""
+        chunks = []
+        with AGENT_LATENCY.labels(agent.name).time(), tracing.span("agent.stream"):
+            async for chunk in agent.stream_message(routing.message.content, context):
+                chunks.append(chunk)
+                await routing.on_chunk(agent.name, chunk)
+        
+        routing.context.add_active_agent(agent.name)
+        routing.streamed_agents.add(agent.name)
+        
+        # Streams can't ask for rerouting, so use the agent's relevance
+        # as the confidence of what it produced
+        return {
+            "agent": agent.name,
+            "content": "".join(chunks),
+            "confidence": await agent.calculate_relevance(routing.message.content)
+        }
     
     async def _aggregate_responses(self, responses: List[dict]) -> dict:
         """Aggregate multiple agent responses."""
@@ -206,5 +601,33 @@ class Orchestrator:
             if client_id != exclude_client:
                 await connection.send_json(message)
 
+class _RoutingTurn:
+    """State shared by every agent that handles one routed message."""
+    
+    def __init__(
+        self,
+        orchestrator: Orchestrator,
+        message: Message,
+        context: ContextTurn,
+        on_chunk: Optional[Callable[[str, str], Awaitable[None]]] = None
+    ):
+        self.message = message
+        self.context = context
+        self.on_chunk = on_chunk  # Set when output is streamed to the client
+        self._orchestrator = orchestrator
+        self.streamed_agents = set()  # Agents whose chunks were already forwarded
+        self._ranking: Optional[asyncio.Future] = None
+    
+    async def ranking(self) -> List[Tuple['BaseAgent', float]]:
+        """Get the relevant agents, scoring them at most once per turn."""
+        if self._ranking is None:
+            self._ranking = asyncio.ensure_future(self._orchestrator._find_relevant_agents(
+                self.message.content,
+                threshold=self.message.confidence_threshold
+            ))
+        # Concurrent agents may wait on the same scoring; one of them
+        # timing out must not cancel it for the others
+        return await asyncio.shield(self._ranking)
+
 # Global orchestrator instance
 orchestrator = Orchestrator()
@@ -0,0 +1,282 @@
+"""
+End-to-end load test of the chat API over WebSocket and REST.
+
+Starts the API (REST routes and the room-aware WebSocket endpoint) in this
+process on an ephemeral port, against an in-memory fakeredis server or a
+real Redis, and drives concurrent WebSocket clients and REST callers
+through real sockets. Every client sends its messages one after another,
+waiting for each reply, so the clients count is the concurrency.
+
+Messages are drawn from a weighted mix of kinds:
+
+    single   keyword-routed message handled by one agent
+    mention  message addressed to one agent with @name
+    multi    message addressed to three agents at once
+    room     WebSocket message whose reply is broadcast to a room
+
+Results are printed (or written with --output) as JSON: per transport and
+overall p50/p95/p99 latency in milliseconds and messages per second, plus
+the configuration and git commit so runs of different commits compare.
+
+    python -m benchmarks.bench_load [--ws-clients 20] [--rest-clients 5]
+        [--messages 50] [--mix single=4,mention=2,multi=2,room=1]
+        [--redis-url redis://localhost:6379/15] [--output results.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+import websockets
+from fastapi import FastAPI
+
+MESSAGES = {
+    "single": "How should we position our brand voice and logo?",
+    "mention": "@growth how do we reduce churn next quarter?",
+    "multi": "@marketing @brand @growth review the launch plan for our new product",
+    "room": "Can someone give the room an overview of the roadmap?"
+}
+ROOM_SIZE = 5  # WebSocket clients per room
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """Parse ``kind=weight,...`` into weights, rejecting unknown kinds."""
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in MESSAGES:
+            raise argparse.ArgumentTypeError(f"Unknown message kind {kind!r}, expected one of {', '.join(MESSAGES)}")
+        mix[kind] = int(weight or 1)
+    return mix
+
+def use_redis(url: Optional[str]):
+    """
+    Point the application's shared Redis client at the benchmark's Redis.
+
+    Must run before app modules are imported, since the orchestrator and
+    its context manager take the shared client when they are created.
+    """
+    from app.core import redis_pool
+    from app.core.codec import get_codec
+
+    if url:
+        redis_pool._client = redis_pool.redis.Redis(connection_pool=redis_pool.create_pool(url))
+    else:
+        import fakeredis.aioredis
+        redis_pool._client = fakeredis.aioredis.FakeRedis(decode_responses=get_codec().decode_responses)
+
+def build_app() -> FastAPI:
+    """The API as deployed: REST routes plus the room-aware WebSocket endpoint."""
+    from app.api import endpoints, websocket_handler
+
+    app = FastAPI()
+    # Included first so its /ws route, which supports rooms, takes precedence
+    app.include_router(websocket_handler.router)
+    app.include_router(endpoints.router)
+    return app
+
+class Recorder:
+    """Latencies and errors of one transport."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "messages": len(latencies),
+            "errors": self.errors,
+            "messages_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": round(latencies[-1] * 1000, 3) if latencies else None
+        }
+
+def percentile(latencies: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted latencies, in milliseconds."""
+    if not latencies:
+        return None
+    rank = max(0, min(len(latencies) - 1, round(q / 100 * len(latencies) + 0.5) - 1))
+    return round(latencies[rank] * 1000, 3)
+
+def pick_kinds(mix: Dict[str, int], count: int, rng: random.Random, rooms: bool) -> List[str]:
+    kinds = [kind for kind in mix if rooms or kind != "room"]
+    if not kinds:
+        return []
+    return rng.choices(kinds, weights=[mix[kind] for kind in kinds], k=count)
+
+async def run_ws_client(
+    url: str,
+    index: int,
+    kinds: List[str],
+    warmup: int,
+    recorder: Recorder
+):
+    """Send messages over one WebSocket, waiting for each reply."""
+    client_id = f"bench-ws-{index}"
+    session_id = f"bench-session-{index}"
+    room = f"bench-room-{index // ROOM_SIZE}"
+    waiting: Dict[str, asyncio.Future] = {}
+
+    async with websockets.connect(f"{url}/ws/{client_id}", max_queue=None) as websocket:
+        async def read():
+            # Frames for other clients, e.g. room broadcasts, are skipped
+            async for frame in websocket:
+                event = json.loads(frame)
+                request_id = event.get("data", {}).get("request_id")
+                future = waiting.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(event["event"])
+
+        reader = asyncio.ensure_future(read())
+        try:
+            if "room" in kinds:
+                await websocket.send(json.dumps({"event": "join_room", "data": {"room": room}}))
+
+            for number, kind in enumerate(kinds):
+                request_id = uuid.uuid4().hex
+                data = {"content": MESSAGES[kind], "session_id": session_id, "request_id": request_id}
+                if kind == "room":
+                    data["room"] = room
+
+                reply = waiting[request_id] = asyncio.get_running_loop().create_future()
+                start = time.perf_counter()
+                await websocket.send(json.dumps({"event": "chat_message", "data": data}))
+                event = await reply
+                latency = time.perf_counter() - start
+
+                if number < warmup:
+                    continue
+                if event == "chat_response":
+                    recorder.latencies.append(latency)
+                else:
+                    recorder.errors += 1
+        finally:
+            reader.cancel()
+
+async def run_rest_client(
+    url: str,
+    index: int,
+    kinds: List[str],
+    warmup: int,
+    recorder: Recorder
+):
+    """Post messages one after another, waiting for each response."""
+    async with httpx.AsyncClient(base_url=url, timeout=30.0) as client:
+        for number, kind in enumerate(kinds):
+            payload = {
+                "content": MESSAGES[kind],
+                "sender_id": f"bench-rest-{index}",
+                "context_id": f"bench-rest-session-{index}"
+            }
+            start = time.perf_counter()
+            try:
+                response = await client.post("/message", json=payload)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latency = time.perf_counter() - start
+
+            if number < warmup:
+                continue
+            if ok:
+                recorder.latencies.append(latency)
+            else:
+                recorder.errors += 1
+
+async def run(args) -> dict:
+    """Start the app, run every client to completion and summarise."""
+    use_redis(args.redis_url)
+    app = build_app()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on"))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()  # Raises the startup error
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    rng = random.Random(args.seed)
+    total = args.messages + args.warmup
+    ws, rest = Recorder(), Recorder()
+    clients = [
+        run_ws_client(f"ws://127.0.0.1:{port}", i, pick_kinds(args.mix, total, rng, rooms=True), args.warmup, ws)
+        for i in range(args.ws_clients)
+    ] + [
+        run_rest_client(f"http://127.0.0.1:{port}", i, pick_kinds(args.mix, total, rng, rooms=False), args.warmup, rest)
+        for i in range(args.rest_clients)
+    ]
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*clients)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.should_exit = True
+        await serving
+
+    overall = Recorder()
+    overall.latencies = ws.latencies + rest.latencies
+    overall.errors = ws.errors + rest.errors
+    return {
+        "benchmark": "load",
+        "commit": git_commit(),
+        "config": {
+            "ws_clients": args.ws_clients,
+            "rest_clients": args.rest_clients,
+            "messages_per_client": args.messages,
+            "warmup_per_client": args.warmup,
+            "mix": args.mix,
+            "redis": "redis" if args.redis_url else "fakeredis",
+            "seed": args.seed
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "results": {
+            "websocket": ws.summary(elapsed),
+            "rest": rest.summary(elapsed),
+            "total": overall.summary(elapsed)
+        }
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--ws-clients", type=int, default=20)
+    parser.add_argument("--rest-clients", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=50, help="Measured messages per client")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured messages per client first")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("single=4,mention=2,multi=2,room=1"))
+    parser.add_argument("--redis-url", help="Use this Redis instead of an in-memory fakeredis")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    # The app logs with print; keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run(args))
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
+
+if __name__ == "__main__":
+    main()
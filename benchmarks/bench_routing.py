@@ -0,0 +1,300 @@
+"""
+Microbenchmarks of routing and scoring, checked against stored baselines.
+
+Times the hot paths of routing a message:
+
+    parse_mentions            Orchestrator.parse_mentions
+    find_relevant_agents      Orchestrator._find_relevant_agents, uncached,
+                              with registries of 5 to 500 synthetic agents
+    calculate_relevance       every agent's calculate_relevance
+    check_capability_match    every agent's _check_capability_match
+    process_message           every agent's process_message
+    aggregate_responses       Orchestrator._aggregate_responses
+
+over a fixed corpus of short, medium and long messages. Each result is the
+median cost per call in microseconds over --repeats samples.
+
+Results are compared with benchmarks/baselines/routing.json and the run
+fails (exit status 1) when any case got slower than its baseline by more
+than --threshold percent and by at least --min-delta-us microseconds, so
+cases costing a microsecond or two can't fail the run on timer noise.
+Every sample of a case is paired with a sample of a fixed pure-Python
+calibration loop taken right after it, and the median of the pairs'
+ratios is compared. A baseline recorded on one machine thus remains
+meaningful on another, and a machine that is busy for part of the run
+isn't mistaken for a regression. A regressed case is re-run --retries
+times and only fails if it stays slower.
+
+    python -m benchmarks.bench_routing [--threshold 25] [--filter relevant]
+    python -m benchmarks.bench_routing --save-baseline   # after an intended change
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.agents.alex_agent import AlexAgent
+from app.agents.base_agent import AgentResponse, BaseAgent
+from app.agents.brand_agent import BrandAgent
+from app.agents.growth_agent import GrowthAgent
+from app.agents.marketing_agent import MarketingAgent
+from app.agents.sales_agent import SalesAgent
+from app.agents.strategic_agent import StrategicAgent
+from app.orchestrator import Orchestrator
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "routing.json")
+REGISTRY_SIZES = (5, 50, 500)
+MESSAGE_LENGTHS = {"short": 6, "medium": 30, "long": 150}  # Words per message
+CORPUS_SIZE = 200  # Messages per length, more than the matcher's scan cache holds
+MIN_SAMPLE_TIME = 0.01  # Seconds per sample, so cheap calls aren't lost in timer noise
+
+# A case: the call to time and the messages to call it with
+Case = Tuple[Callable[[str], object], List[str]]
+
+FILLER = (
+    "we our the a to for and with about next quarter team customers users "
+    "please could you tell me how what why when should would need want "
+    "current new plan launch project update help idea think question"
+).split()
+DOMAIN = (
+    "price cost discount purchase subscription brand identity logo voice "
+    "growth churn retention revenue acquisition marketing campaign content "
+    "email audience strategy market competition forecast risk vision goal "
+    "overview summary explain"
+).split()
+
+class SyntheticAgent(BaseAgent):
+    """Keyword agent with generated terms, for registries of any size."""
+
+    def __init__(self, index: int, rng: random.Random, vocabulary: List[str]):
+        super().__init__()
+        self.name = f"synthetic_{index}"
+        self.keywords = rng.sample(vocabulary, 12)
+        self.capabilities = [" ".join(rng.sample(vocabulary, 2)) for _ in range(4)]
+
+    def score_relevance(self, hits) -> float:
+        return min(1.0, hits.keywords / 3 + hits.capabilities / 8)
+
+    async def process_message(self, message: str, context: Optional[List[Dict]] = None) -> AgentResponse:
+        return AgentResponse(content="ok", confidence=0.5)
+
+def make_corpus(rng: random.Random) -> Dict[str, List[str]]:
+    """Messages of each length, about one word in five a domain term, some with mentions."""
+    corpus = {}
+    for label, words in MESSAGE_LENGTHS.items():
+        messages = []
+        for i in range(CORPUS_SIZE):
+            text = [rng.choice(DOMAIN) if rng.random() < 0.2 else rng.choice(FILLER) for _ in range(words)]
+            if i % 4 == 0:
+                text.insert(rng.randrange(len(text)), "@" + rng.choice(["growth", "brand", "marketing"]))
+            messages.append(" ".join(text))
+        corpus[label] = messages
+    return corpus
+
+def make_orchestrator(agents: List[BaseAgent]) -> Orchestrator:
+    """An orchestrator with routing caches off, so every call does the full work."""
+    orchestrator = Orchestrator()
+    orchestrator._routing_cache.max_size = 0
+    orchestrator._keyword_matcher.cache_size = 0
+    for agent in agents:
+        # register_agent only awaits nothing, so drive it without a loop
+        run_sync(orchestrator.register_agent(agent))
+    return orchestrator
+
+def run_sync(coroutine: Awaitable):
+    """Run a coroutine that never suspends, without event loop overhead."""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("Coroutine suspended; benchmarked calls must not do I/O")
+
+def rounds_for(call: Callable[[str], object], messages: List[str]) -> int:
+    """Passes over the messages one sample needs to last at least MIN_SAMPLE_TIME."""
+    rounds = 1
+    while sample(call, messages, rounds) * rounds * len(messages) < MIN_SAMPLE_TIME * 1e6:
+        rounds *= 2
+    return rounds
+
+def sample(call: Callable[[str], object], messages: List[str], rounds: int) -> float:
+    """Mean time per call over ``rounds`` passes of the messages, in microseconds."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            call(message)
+    return (time.perf_counter() - start) / (rounds * len(messages)) * 1e6
+
+def calibration_workload(_):
+    """A fixed pure-Python workload, the unit results are compared in."""
+    total = 0
+    for i in range(2000):
+        total += i * i % 7
+    return sorted(str(total) * 20)
+
+CALIBRATION: Case = (calibration_workload, [""] * 50)
+
+def cases(corpus: Dict[str, List[str]]) -> Dict[str, Case]:
+    """Every benchmark case by name."""
+    rng = random.Random(1)
+    vocabulary = DOMAIN + [f"term{i}" for i in range(400)]
+    real_agents = [AlexAgent(), BrandAgent(), GrowthAgent(), MarketingAgent(), SalesAgent(), StrategicAgent()]
+    orchestrator = make_orchestrator([AlexAgent(), BrandAgent(), GrowthAgent(), MarketingAgent(), SalesAgent()])
+    registered = {
+        size: make_orchestrator([SyntheticAgent(i, rng, vocabulary) for i in range(size)])
+        for size in REGISTRY_SIZES
+    }
+    responses = [{"agent": f"agent_{i}", "content": "A reply of a few sentences. " * 4, "confidence": 0.5} for i in range(10)]
+
+    benchmarks: Dict[str, Case] = {}
+    for length, messages in corpus.items():
+        benchmarks[f"parse_mentions[{length}]"] = (lambda m: run_sync(orchestrator.parse_mentions(m)), messages)
+        for size, registry in registered.items():
+            benchmarks[f"find_relevant_agents[{size} agents,{length}]"] = (
+                lambda m, registry=registry: run_sync(registry._find_relevant_agents(m)), messages
+            )
+    medium = corpus["medium"]
+    for agent in real_agents:
+        # Agents on their own build a private matcher, as outside the orchestrator
+        benchmarks[f"calculate_relevance[{agent.name}]"] = (
+            lambda m, agent=agent: run_sync(agent.calculate_relevance(m)), medium
+        )
+        benchmarks[f"check_capability_match[{agent.name}]"] = (
+            lambda m, agent=agent: run_sync(agent._check_capability_match(m)), medium
+        )
+        benchmarks[f"process_message[{agent.name}]"] = (
+            lambda m, agent=agent: run_sync(agent.process_message(m)), medium
+        )
+    for count in (1, 3, 10):
+        benchmarks[f"aggregate_responses[{count}]"] = (
+            lambda _, count=count: run_sync(orchestrator._aggregate_responses(responses[:count])), medium
+        )
+    return benchmarks
+
+def run_case(case: Case, repeats: int = 15) -> Dict[str, float]:
+    """
+    Time a case in samples alternating with samples of the calibration loop.
+
+    Args:
+        case: The call to time and its messages
+        repeats: Number of case and calibration sample pairs
+
+    Returns:
+        Median time per call in microseconds (``us``) and median ratio of
+        each case sample to its calibration sample (``relative``)
+    """
+    call, messages = case
+    rounds = rounds_for(call, messages)
+    calibration_rounds = rounds_for(*CALIBRATION)
+    times, ratios = [], []
+    for _ in range(repeats):
+        value = sample(call, messages, rounds)
+        times.append(value)
+        ratios.append(value / sample(*CALIBRATION, calibration_rounds))
+    return {"us": round(statistics.median(times), 3), "relative": round(statistics.median(ratios), 5)}
+
+def compare(
+    results: Dict[str, dict],
+    baseline: dict,
+    threshold: float,
+    min_delta_us: float = 0.0
+) -> Dict[str, float]:
+    """
+    Find cases that regressed beyond the threshold.
+
+    Args:
+        results: Case results, each with its calibrated ``relative`` cost
+        baseline: Stored results of the baseline run
+        threshold: Allowed slowdown in percent
+        min_delta_us: Smallest slowdown in microseconds that counts, at the
+            baseline's speed scaled to this machine
+
+    Returns:
+        Slowdown in percent of every regressed case
+    """
+    regressions = {}
+    for name, result in results.items():
+        expected = baseline["results"].get(name)
+        if expected is None:
+            continue
+        ratio = result["relative"] / expected["relative"]
+        # The baseline cost scaled to this machine is result["us"] / ratio
+        delta_us = result["us"] * (1 - 1 / ratio)
+        change = (ratio - 1) * 100
+        if change > threshold and delta_us >= min_delta_us:
+            regressions[name] = change
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--threshold", type=float, default=25.0, help="Allowed slowdown in percent")
+    parser.add_argument(
+        "--min-delta-us", type=float, default=2.0, help="Smallest slowdown in microseconds that fails the run"
+    )
+    parser.add_argument("--repeats", type=int, default=15, help="Samples per case, the median is kept")
+    parser.add_argument("--retries", type=int, default=2, help="Re-runs of a regressed case before it fails")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # Registration and agent code log with print; keep stdout for the report
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        selected = {
+            name: run
+            for name, run in cases(make_corpus(random.Random(0))).items()
+            if args.filter in name
+        }
+        results = {name: run_case(case, args.repeats) for name, case in selected.items()}
+
+        # A regression must reproduce: keep the best of a few more runs
+        regressions = compare(results, baseline, args.threshold, args.min_delta_us) if baseline else {}
+        for _ in range(args.retries):
+            for name in regressions:
+                retry = run_case(selected[name], args.repeats)
+                if retry["relative"] < results[name]["relative"]:
+                    results[name] = retry
+            regressions = compare(results, baseline, args.threshold, args.min_delta_us) if baseline else {}
+    finally:
+        sys.stdout = stdout
+
+    report = {"benchmark": "routing", "results": results}
+    for name, result in results.items():
+        change = ""
+        if baseline and name in baseline["results"]:
+            change = f"{(result['relative'] / baseline['results'][name]['relative'] - 1) * 100:+7.1f}%"
+        print(f"{name:50s} {result['us']:10.2f} us {change}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:g}%:")
+        for name, change in regressions.items():
+            print(f"  {name}: {change:+.1f}%")
+        sys.exit(1)
+    print(f"\nNo case regressed by more than {args.threshold:g}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark SharedContextManager.get_session, checked against a stored baseline.
+
+Reads sessions of 10, 100 and 200 messages through the real get_session,
+from an in-memory Redis (fakeredis), and compares each result with
+benchmarks/baselines/session_read.json the same way bench_routing does:
+every sample is paired with a sample of its calibration loop, the median
+ratio is compared, and a regressed case is re-run --retries times before
+the run fails (exit status 1).
+
+Each case is also timed against the read path get_session replaced, which
+validated every message on its own and then the whole session again. The
+speedup is the median ratio of paired samples of the two paths, so a busy
+machine slows both sides of a pair alike. fakeredis runs in-process and
+costs far more CPU than a network round trip to Redis, so the speedup it
+shows is a lower bound.
+
+    python -m benchmarks.bench_session_read [--threshold 25] [--filter 100]
+    python -m benchmarks.bench_session_read --save-baseline   # after an intended change
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+from typing import Dict, List, Optional, Union
+
+import fakeredis.aioredis
+
+from app.core.codec import Codec
+from app.core.shared_context import MessageContext, SessionContext, SharedContextManager
+from benchmarks.bench_routing import Case, compare, rounds_for, run_case, sample
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "session_read.json")
+SESSION_SIZES = (10, 100, 200)  # Messages per session
+READS_PER_PASS = 10  # Reads per pass of a sample, so a sample spans many reads
+
+class ValidatingContextManager(SharedContextManager):
+    """The read path get_session replaced: each message validated, then the session."""
+
+    def _decode_messages(self, encoded: List[Union[str, bytes]]) -> List[MessageContext]:
+        return [MessageContext.model_validate_json(raw) for raw in encoded]
+
+    async def get_session(self, session_id: str) -> Optional[SessionContext]:
+        session = await super().get_session(session_id)
+        return SessionContext(**dict(session)) if session else None
+
+def make_managers(loop: asyncio.AbstractEventLoop) -> Dict[str, SharedContextManager]:
+    """Both read paths over one in-memory Redis holding a session of each size."""
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    options = dict(codec=Codec("json"), redis_client=client, max_messages=0, max_bytes=0, cache_size=0)
+    managers = {"trusted": SharedContextManager(**options), "validated": ValidatingContextManager(**options)}
+
+    async def fill():
+        writer = managers["trusted"]
+        for size in SESSION_SIZES:
+            for i in range(size):
+                await writer.add_message(
+                    f"bench_{size}",
+                    f"Message {i}: " + "how do we grow revenue next quarter? " * 3,
+                    sender_id="user" if i % 2 == 0 else "assistant",
+                    agent_id=None if i % 2 == 0 else "growth",
+                    confidence=None if i % 2 == 0 else 0.8
+                )
+            await writer.update_metadata(f"bench_{size}", {"topic": "revenue"})
+    loop.run_until_complete(fill())
+    return managers
+
+def cases(loop: asyncio.AbstractEventLoop) -> Dict[str, Dict[str, Case]]:
+    """Every case by name, as the trusted and validated read of one session."""
+    managers = make_managers(loop)
+    benchmarks = {}
+    for size in SESSION_SIZES:
+        session_id = f"bench_{size}"
+        reads = {
+            path: (
+                lambda s, manager=manager: loop.run_until_complete(manager.get_session(s)),
+                [session_id] * READS_PER_PASS
+            )
+            for path, manager in managers.items()
+        }
+        trusted, validated = (call(session_id) for call, _ in reads.values())
+        assert trusted == validated and len(trusted.messages) == size
+        benchmarks[f"get_session[{size} messages]"] = reads
+    return benchmarks
+
+def speedup(trusted: Case, validated: Case, repeats: int = 15) -> float:
+    """Median ratio of the validated to the trusted path over paired samples."""
+    rounds = max(rounds_for(*trusted), rounds_for(*validated))
+    ratios = [sample(*validated, rounds) / sample(*trusted, rounds) for _ in range(repeats)]
+    return round(statistics.median(ratios), 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--threshold", type=float, default=25.0, help="Allowed slowdown in percent")
+    parser.add_argument(
+        "--min-delta-us", type=float, default=20.0, help="Smallest slowdown in microseconds that fails the run"
+    )
+    parser.add_argument("--repeats", type=int, default=15, help="Samples per case, the median is kept")
+    parser.add_argument("--retries", type=int, default=2, help="Re-runs of a regressed case before it fails")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    loop = asyncio.new_event_loop()
+    try:
+        selected = {name: reads for name, reads in cases(loop).items() if args.filter in name}
+        results = {name: run_case(reads["trusted"], args.repeats) for name, reads in selected.items()}
+        speedups = {name: speedup(reads["trusted"], reads["validated"], args.repeats) for name, reads in selected.items()}
+
+        # A regression must reproduce: keep the best of a few more runs
+        regressions = compare(results, baseline, args.threshold, args.min_delta_us) if baseline else {}
+        for _ in range(args.retries):
+            for name in regressions:
+                retry = run_case(selected[name]["trusted"], args.repeats)
+                if retry["relative"] < results[name]["relative"]:
+                    results[name] = retry
+            regressions = compare(results, baseline, args.threshold, args.min_delta_us) if baseline else {}
+    finally:
+        loop.close()
+
+    report = {"benchmark": "session_read", "results": results}
+    for name, result in results.items():
+        change = ""
+        if baseline and name in baseline["results"]:
+            change = f"{(result['relative'] / baseline['results'][name]['relative'] - 1) * 100:+7.1f}%"
+        print(f"{name:30s} {result['us']:10.2f} us {change:8s}  {speedups[name]:.2f}x faster than validating")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**report, "speedup": speedups}, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:g}%:")
+        for name, change in regressions.items():
+            print(f"  {name}: {change:+.1f}%")
+        sys.exit(1)
+    print(f"\nNo case regressed by more than {args.threshold:g}%")
+
+if __name__ == "__main__":
+    main()
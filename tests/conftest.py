@@ -1,4 +1,5 @@
 import pytest
+import pytest_asyncio
 import asyncio
 from typing import Dict, List
 import fakeredis.aioredis
@@ -22,18 +23,20 @@ class MockAgent(BaseAgent):
     async def calculate_relevance(self, message: str) -> float:
         return await self.calculate_relevance_mock(message)
 
-@pytest.fixture
+@pytest_asyncio.fixture
 async def redis_mock():
     """Create a mock Redis instance using fakeredis."""
-    redis = await fakeredis.aioredis.create_redis_pool()
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
     yield redis
-    redis.close()
-    await redis.wait_closed()
+    await redis.flushall()
+    await redis.aclose()
 
-@pytest.fixture
+@pytest_asyncio.fixture
 async def shared_context(redis_mock):
     """Create a SharedContextManager instance with mock Redis."""
-    with patch('app.core.shared_context.redis.from_url', return_value=redis_mock):
+    # Managers created while the fixture is active, e.g. by Orchestrator(),
+    # get the mock as their shared Redis client
+    with patch('app.core.shared_context.get_redis', return_value=redis_mock):
         context_manager = SharedContextManager()
         yield context_manager
 
@@ -70,7 +73,7 @@ def mock_low_confidence_agent():
     )
     return agent
 
-@pytest.fixture
+@pytest_asyncio.fixture
 async def orchestrator(shared_context, mock_sales_agent, mock_marketing_agent):
     """Create an Orchestrator instance with mock agents."""
     orchestrator = Orchestrator()
@@ -168,3 +168,34 @@ async def test_agent_rate_limiting(mock_sales_agent):
     # Verify rate limiting
     mock_sales_agent.process_message_mock.assert_called()
     assert mock_sales_agent.process_message_mock.call_count <= 10
+
+@pytest.mark.asyncio
+async def test_agent_response_cache(redis_mock):
+    """Test that cacheable agents reuse responses for the same message and context shape."""
+    from app.agents.alex_agent import AlexAgent
+    from app.core.response_cache import ResponseCache
+    
+    agent = AlexAgent()
+    agent.response_cache = ResponseCache(redis_mock, max_entries=2)
+    
+    with patch.object(agent, "_generate_response", wraps=agent._generate_response) as generate:
+        first = await agent.respond("Hello there")
+        second = await agent.respond("  hello there ")
+        assert first == second
+        assert generate.call_count == 1
+        
+        # A different context shape is a different entry
+        await agent.respond("Hello there", [{"content": "earlier"}])
+        assert generate.call_count == 2
+    
+    assert agent.response_cache.stats() == {"hits": 1, "misses": 2}
+    
+    # The cache is bounded to max_entries, evicting the least recently used
+    await agent.respond("What's the status?")
+    assert await redis_mock.zcard(agent.response_cache.index_key) == 2
+    
+    # Agents that don't opt in always process the message
+    agent.cacheable = False
+    with patch.object(agent, "_generate_response", wraps=agent._generate_response) as generate:
+        await agent.respond("Hello there")
+        assert generate.call_count == 1
@@ -0,0 +1,75 @@
+import pytest
+import json
+import httpx
+from fastapi import FastAPI
+
+from app.api import endpoints
+
+@pytest.fixture
+def client(orchestrator, monkeypatch):
+    """HTTP client for the API router, routing through the test orchestrator."""
+    monkeypatch.setattr(endpoints, "orchestrator", orchestrator)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+def parse_lines(response: httpx.Response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+@pytest.mark.asyncio
+async def test_batch_accepts_json_array(client):
+    """Test that every message of a JSON array gets a result line."""
+    messages = [
+        {"content": f"message {i}", "sender_id": "importer", "context_id": f"ctx_{i % 2}"}
+        for i in range(4)
+    ]
+    async with client:
+        response = await client.post("/messages/batch", json=messages)
+    
+    assert response.status_code == 200
+    results = parse_lines(response)
+    assert sorted(result["index"] for result in results) == [0, 1, 2, 3]
+    assert all("response" in result for result in results)
+    assert {result["context_id"] for result in results} == {"ctx_0", "ctx_1"}
+
+@pytest.mark.asyncio
+async def test_batch_accepts_ndjson_and_reports_bad_lines(client):
+    """Test NDJSON input, with invalid lines reported without failing the batch."""
+    body = "\n".join([
+        json.dumps({"content": "hello", "sender_id": "importer", "context_id": "ctx"}),
+        "{not json",
+        json.dumps({"sender_id": "importer"}),
+        json.dumps({"content": "again", "sender_id": "importer", "context_id": "ctx"})
+    ])
+    async with client:
+        response = await client.post(
+            "/messages/batch",
+            content=body,
+            headers={"content-type": "application/x-ndjson"}
+        )
+    
+    results = {result["index"]: result for result in parse_lines(response)}
+    assert set(results) == {0, 1, 2, 3}
+    assert "response" in results[0] and "response" in results[3]
+    assert "error" in results[1] and "error" in results[2]
+
+@pytest.mark.asyncio
+async def test_batch_keeps_context_order(client, orchestrator):
+    """Test that messages sharing a context are stored in input order."""
+    messages = [
+        {"content": f"step {i}", "sender_id": "importer", "context_id": "replay"}
+        for i in range(5)
+    ]
+    async with client:
+        await client.post("/messages/batch", json=messages)
+    
+    history = await orchestrator._context_manager.get_recent_messages("replay", limit=50)
+    user_messages = [m.content for m in history if m.sender_id == "importer"]
+    assert user_messages == [f"step {i}" for i in range(5)]
+
+@pytest.mark.asyncio
+async def test_batch_rejects_non_array_json(client):
+    """Test that a JSON body that isn't an array is rejected."""
+    async with client:
+        response = await client.post("/messages/batch", json={"content": "hi"})
+    assert response.status_code == 400
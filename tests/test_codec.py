@@ -0,0 +1,70 @@
+import pytest
+import fakeredis.aioredis
+from unittest.mock import patch
+
+from app.core import codec
+from app.core.codec import Codec, MSGPACK_TAG
+from app.core.shared_context import SharedContextManager, MessageContext
+
+def make_manager(redis_client, value_format: str) -> SharedContextManager:
+    return SharedContextManager(codec=Codec(value_format), redis_client=redis_client)
+
+def test_json_round_trip():
+    """Test that values survive the JSON codec unchanged."""
+    value = {"text": "héllo", "items": [1, 2.5, None, True]}
+    json_codec = Codec("json")
+    
+    assert codec.loads(codec.dumps(value)) == value
+    assert json_codec.decode(json_codec.encode(value)) == value
+    
+    message = MessageContext(content="hi", timestamp="t", sender_id="user")
+    assert json_codec.decode_model(json_codec.encode_model(message), MessageContext) == message
+
+def test_msgpack_falls_back_to_json_when_unavailable():
+    """Test that asking for msgpack without the package keeps JSON storage."""
+    with patch.object(codec, "msgpack", None):
+        fallback = Codec("msgpack")
+    assert fallback.format == "json"
+    assert fallback.decode_responses
+
+def test_msgpack_values_are_tagged():
+    """Test that binary values carry the version tag and round-trip."""
+    pytest.importorskip("msgpack")
+    binary = Codec("msgpack")
+    
+    encoded = binary.encode({"a": [1, 2]})
+    assert encoded.startswith(MSGPACK_TAG)
+    assert binary.decode(encoded) == {"a": [1, 2]}
+    assert not binary.decode_responses
+
+@pytest.mark.asyncio
+async def test_json_sessions_read_after_switching_to_msgpack():
+    """Test that sessions written as JSON stay readable with the binary format."""
+    pytest.importorskip("msgpack")
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=False)
+    
+    old = make_manager(redis_client, "json")
+    await old.add_message("s1", "written as json", "user")
+    await old.update_metadata("s1", {"topic": "pricing"})
+    
+    new = make_manager(redis_client, "msgpack")
+    await new.add_message("s1", "written as msgpack", "user", agent_id="sales")
+    
+    session = await new.get_session("s1")
+    assert [m.content for m in session.messages] == ["written as json", "written as msgpack"]
+    assert session.metadata == {"topic": "pricing"}
+    assert session.active_agents == {"sales"}
+    await redis_client.aclose()
+
+@pytest.mark.asyncio
+async def test_json_manager_handles_bytes_replies():
+    """Test that the JSON format also works with a client returning bytes."""
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=False)
+    manager = make_manager(redis_client, "json")
+    await manager.add_message("s1", "hello", "user", agent_id="sales")
+    
+    session = await manager.get_session("s1")
+    assert session.messages[0].content == "hello"
+    assert session.active_agents == {"sales"}
+    assert (await manager.get_session_usage("s1"))["messages"] == 1
+    await redis_client.aclose()
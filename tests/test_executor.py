@@ -0,0 +1,109 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from typing import Dict, List, Optional
+
+from app.agents.base_agent import AgentResponse, BaseAgent
+from app.core.executor import PROCESS, THREAD, AgentExecutor
+
+class BlockingAgent(BaseAgent):
+    """Agent whose work blocks its thread, reporting where it ran."""
+
+    def __init__(self, name: str, mode: str, seconds: float = 0.0):
+        super().__init__()
+        self.name = name
+        self.execution_mode = mode
+        self.seconds = seconds
+
+    async def process_message(self, message: str, context: Optional[List[Dict]] = None) -> AgentResponse:
+        time.sleep(self.seconds)
+        # Process agents get context as dicts, others the context models
+        contents = [msg["content"] if isinstance(msg, dict) else msg.content for msg in context or []]
+        return AgentResponse(
+            content=f"{os.getpid()}:{threading.get_ident()}:{'|'.join(contents)}",
+            confidence=0.9
+        )
+
+@pytest.mark.asyncio
+async def test_thread_agent_keeps_loop_responsive(orchestrator, message_factory):
+    """Test that a blocking thread agent runs off the loop while other tasks progress."""
+    await orchestrator.register_agent(BlockingAgent("blocking", THREAD, seconds=0.2))
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.ensure_future(tick())
+    try:
+        response = await orchestrator.route_message(message_factory("@blocking go"))
+    finally:
+        ticker.cancel()
+        await orchestrator.close()
+
+    pid, thread, _ = response["content"].split(":", 2)
+    assert int(pid) == os.getpid()
+    assert int(thread) != threading.get_ident()
+    assert ticks >= 5
+    assert orchestrator._executor.stats()["completed"] == 1
+
+@pytest.mark.asyncio
+async def test_process_agent_gets_picklable_context():
+    """Test that a process agent runs in another process with its context as dicts."""
+    executor = AgentExecutor(process_workers=1)
+    agent = BlockingAgent("cpu", PROCESS)
+    executor.check(agent)
+    agent.executor = executor
+    try:
+        response = await agent.respond("go", [{"content": "earlier", "sender_id": "user"}])
+    finally:
+        executor.shutdown()
+
+    pid, _, contents = response.content.split(":", 2)
+    assert int(pid) != os.getpid()
+    assert contents == "earlier"
+    assert agent.executor is executor  # Not dropped by pickling the worker's copy
+
+@pytest.mark.asyncio
+async def test_registration_rejects_unusable_execution_modes(orchestrator):
+    """Test that unknown modes and unpicklable process agents are refused up front."""
+    with pytest.raises(ValueError, match="unknown execution mode"):
+        await orchestrator.register_agent(BlockingAgent("odd", "gpu"))
+
+    agent = BlockingAgent("unpicklable", PROCESS)
+    agent.lock = threading.Lock()
+    with pytest.raises(ValueError, match="can't be pickled"):
+        await orchestrator.register_agent(agent)
+    assert "unpicklable" not in orchestrator._agents
+
+@pytest.mark.asyncio
+async def test_thread_agents_share_the_keyword_matcher(shared_context, message_factory):
+    """Test concurrent thread agents scanning the shared matcher while the loop scans too."""
+    from app.agents.brand_agent import BrandAgent
+    from app.agents.growth_agent import GrowthAgent
+    from app.agents.marketing_agent import MarketingAgent
+    from app.orchestrator import Orchestrator
+    
+    orchestrator = Orchestrator()
+    orchestrator._keyword_matcher.cache_size = 4  # Keep the LRU churning from every thread
+    for agent in (BrandAgent(), GrowthAgent(), MarketingAgent()):
+        agent.execution_mode = THREAD
+        await orchestrator.register_agent(agent)
+    
+    contents = [f"@brand @growth @marketing our brand growth campaign number {i}" for i in range(40)]
+    try:
+        responses = await asyncio.gather(*[
+            orchestrator.route_message(message_factory(content, context_id=f"threaded_{i}"))
+            for i, content in enumerate(contents)
+        ] + [orchestrator._find_relevant_agents(content) for content in contents])
+    finally:
+        await orchestrator.close()
+    
+    replies = responses[:len(contents)]
+    assert all(reply["agent"] == "multiple(brand, growth, marketing)" for reply in replies)
+    assert orchestrator._executor.stats()["completed"] == 3 * len(contents)
+    assert orchestrator._executor.stats()["failed"] == 0
@@ -0,0 +1,151 @@
+import pytest
+import asyncio
+
+from app.core.history_writer import HistoryWriter
+
+class FakeCollection:
+    """In-memory stand-in for the contexts collection, applying $push/$slice like MongoDB."""
+    def __init__(self, fail: int = 0):
+        self.fail = fail
+        self.batches = []
+        self.documents = {}
+        self.reads = 0
+    
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("mongo unavailable")
+        self.batches.append(operations)
+        for operation in operations:
+            session_id = operation._filter["session_id"]
+            push = operation._doc["$push"]["context"]
+            history = self.documents.setdefault(session_id, []) + push["$each"]
+            self.documents[session_id] = history[push["$slice"]:]
+    
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        if query["session_id"] not in self.documents:
+            return None
+        context = self.documents[query["session_id"]]
+        if projection and "$slice" in projection.get("context", {}):
+            context = context[projection["context"]["$slice"]:]
+        return {"session_id": query["session_id"], "context": list(context)}
+    
+    async def delete_one(self, query):
+        self.documents.pop(query["session_id"], None)
+
+@pytest.mark.asyncio
+async def test_appends_are_batched_per_session():
+    """Test that queued appends become one update per session in one bulk write."""
+    collection = FakeCollection()
+    writer = HistoryWriter(collection, batch_size=100, flush_interval=60)
+    for i in range(3):
+        writer.append("a", f"a{i}")
+        writer.append("b", f"b{i}")
+    assert writer.stats()["queue_depth"] == 6
+    assert writer.pending("a") == ["a0", "a1", "a2"]
+    
+    await writer.close()
+    
+    assert len(collection.batches) == 1
+    assert len(collection.batches[0]) == 2
+    assert collection.documents == {"a": ["a0", "a1", "a2"], "b": ["b0", "b1", "b2"]}
+    assert writer.stats()["queue_depth"] == 0
+    assert writer.stats()["flushed_messages"] == 6
+
+@pytest.mark.asyncio
+async def test_size_trigger_flushes_in_background():
+    """Test that reaching batch_size flushes without waiting for the interval."""
+    collection = FakeCollection()
+    writer = HistoryWriter(collection, batch_size=3, flush_interval=60)
+    for i in range(3):
+        writer.append("a", i)
+    
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert collection.documents == {"a": [0, 1, 2]}
+    await writer.close()
+
+@pytest.mark.asyncio
+async def test_time_trigger_and_history_limit():
+    """Test the interval flush and that history keeps only the newest messages."""
+    collection = FakeCollection()
+    writer = HistoryWriter(collection, batch_size=100, flush_interval=0.01, max_history=2)
+    for i in range(3):
+        writer.append("a", i)
+    
+    await asyncio.sleep(0.05)
+    assert collection.documents == {"a": [1, 2]}
+    await writer.close()
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_messages_in_order():
+    """Test that a failed batch is retried ahead of later appends."""
+    collection = FakeCollection(fail=1)
+    writer = HistoryWriter(collection, batch_size=100, flush_interval=60)
+    writer.append("a", 1)
+    
+    with pytest.raises(ConnectionError):
+        await writer.flush()
+    writer.append("a", 2)
+    assert writer.stats()["failed_flushes"] == 1
+    assert writer.pending("a") == [1, 2]
+    
+    await writer.close()
+    assert collection.documents == {"a": [1, 2]}
+
+@pytest.mark.asyncio
+async def test_discard_drops_queued_messages():
+    """Test that clearing a session drops its unwritten messages."""
+    collection = FakeCollection()
+    writer = HistoryWriter(collection, batch_size=100, flush_interval=60)
+    writer.append("a", 1)
+    writer.append("b", 2)
+    
+    await writer.discard("a")
+    await writer.close()
+    assert collection.documents == {"b": [2]}
+
+@pytest.mark.asyncio
+async def test_close_waits_for_flush_in_progress():
+    """Test that closing during a background write neither loses nor cancels the batch."""
+    collection = FakeCollection()
+    started, release = asyncio.Event(), asyncio.Event()
+    write = collection.bulk_write
+    
+    async def slow_bulk_write(operations, ordered=True):
+        started.set()
+        await release.wait()
+        await write(operations, ordered)
+    collection.bulk_write = slow_bulk_write
+    
+    writer = HistoryWriter(collection, batch_size=2, flush_interval=60)
+    writer.append("a", 1)
+    writer.append("a", 2)
+    await started.wait()
+    writer.append("a", 3)
+    
+    closing = asyncio.ensure_future(writer.close())
+    await asyncio.sleep(0.01)
+    assert not closing.done()
+    release.set()
+    await closing
+    
+    assert collection.documents == {"a": [1, 2, 3]}
+    assert writer.stats()["flushed_messages"] == 3
+
+@pytest.mark.asyncio
+async def test_queue_is_capped_while_mongo_is_down():
+    """Test that appends beyond max_pending are dropped and counted."""
+    collection = FakeCollection(fail=1)
+    writer = HistoryWriter(collection, batch_size=100, flush_interval=60, max_pending=2)
+    writer.append("a", 1)
+    with pytest.raises(ConnectionError):
+        await writer.flush()
+    writer.append("a", 2)
+    writer.append("a", 3)
+    
+    assert writer.stats()["dropped_messages"] == 1
+    assert writer.stats()["queue_depth"] == 2
+    await writer.close()
+    assert collection.documents == {"a": [1, 2]}
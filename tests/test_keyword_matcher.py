@@ -0,0 +1,79 @@
+import pytest
+
+from app.agents.keyword_matcher import KeywordMatcher, NO_HITS
+from app.agents.alex_agent import AlexAgent
+from app.agents.brand_agent import BrandAgent
+from app.agents.growth_agent import GrowthAgent
+from app.agents.marketing_agent import MarketingAgent
+from app.agents.sales_agent import SalesAgent
+from app.agents.strategic_agent import StrategicAgent
+
+MESSAGES = [
+    "Hi there, can you help?",
+    "What's the price of the growth hack package?",
+    "We need a brand strategy and a new logo design",
+    "Our social media campaign has poor ROI and high churn",
+    "Plan the market expansion: SWOT, risk and opportunity analysis",
+    "Follow up on the status of the email automation",
+    "",
+]
+
+def naive_hits(agent, message):
+    """Per-keyword substring scan the matcher replaces."""
+    message = message.lower()
+    keywords = sum(1 for keyword in agent.keywords if keyword.lower() in message)
+    capabilities = sum(
+        1 for cap in agent.capabilities
+        if any(word in message for word in cap.lower().split())
+    )
+    return keywords, capabilities
+
+@pytest.fixture
+def agents():
+    return [
+        AlexAgent(), BrandAgent(), GrowthAgent(),
+        MarketingAgent(), SalesAgent(), StrategicAgent()
+    ]
+
+@pytest.mark.parametrize("message", MESSAGES)
+def test_matcher_matches_substring_semantics(agents, message):
+    """Test that one scan gives the same counts as per-keyword substring checks."""
+    matcher = KeywordMatcher()
+    for agent in agents:
+        matcher.register(agent)
+    
+    hits = matcher.scan(message)
+    for agent in agents:
+        assert tuple(hits.get(agent.name, NO_HITS)) == naive_hits(agent, message)
+
+def test_matcher_overlapping_terms():
+    """Test that terms sharing a start position are all reported."""
+    growth = GrowthAgent()
+    matcher = KeywordMatcher()
+    matcher.register(growth)
+    
+    # "growth" and "growth hack" overlap; "expansion" is listed twice
+    assert matcher.find_terms("growth hack for expansion") >= {"growth", "growth hack", "expansion"}
+    assert matcher.scan("growth hack for expansion")["growth"].keywords == 4
+
+def test_matcher_unregister(agents):
+    """Test that unregistered agents stop receiving hits."""
+    matcher = KeywordMatcher()
+    for agent in agents:
+        matcher.register(agent)
+    
+    assert "sales_agent" in matcher.scan("best price")
+    matcher.unregister("sales_agent")
+    assert "sales_agent" not in matcher
+    assert "sales_agent" not in matcher.scan("best price")
+
+@pytest.mark.asyncio
+async def test_agents_share_registered_matcher(orchestrator, agents):
+    """Test that registered agents score through the orchestrator's matcher."""
+    for agent in agents:
+        await orchestrator.register_agent(agent)
+        assert agent.keyword_matcher is orchestrator._keyword_matcher
+    
+    message = "What's the price of the growth hack package?"
+    standalone = SalesAgent()
+    assert await agents[4].calculate_relevance(message) == await standalone.calculate_relevance(message)
@@ -0,0 +1,102 @@
+import pytest
+import httpx
+from fastapi import FastAPI
+
+from app.api import endpoints
+from app.core import metrics
+from app.core.metrics import Counter, Histogram, Registry
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the Prometheus text format of a labelled histogram."""
+    registry = Registry()
+    latency = Histogram("op_seconds", "Op latency.", ["op"], buckets=(0.1, 1.0), registry=registry)
+    for value in [0.05, 0.5, 0.5, 2.0]:
+        latency.labels("read").observe(value)
+
+    text = registry.render()
+    assert "# TYPE op_seconds histogram" in text
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="read",le="1"} 3' in text
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 4' in text
+    assert 'op_seconds_count{op="read"} 4' in text
+    assert 'op_seconds_sum{op="read"} 3.05' in text
+
+def test_unlabelled_counter_starts_at_zero_and_stats_are_collected():
+    """Test counters, scrape-time stats and label escaping."""
+    registry = Registry()
+    counter = Counter("events_total", "Events.", registry=registry)
+    assert "events_total 0" in registry.render()
+
+    counter.inc()
+    counter.inc(2)
+    registry.register_stats("cache", "Cache stats.", lambda: {"hits": 3, "name": "ignored"}, cache='a"b')
+
+    text = registry.render()
+    assert "events_total 3" in text
+    assert 'cache{cache="a\\"b",stat="hits"} 3' in text
+    assert "ignored" not in text
+
+def test_disabled_registry_records_nothing():
+    """Test that a disabled registry keeps recording to an attribute check."""
+    registry = Registry(enabled=False)
+    counter = Counter("events_total", "Events.", registry=registry)
+    latency = Histogram("op_seconds", "Op latency.", registry=registry)
+    counter.inc()
+    with latency.time():
+        pass
+
+    assert counter.labels().value == 0
+    assert latency.labels().count == 0
+
+@pytest.mark.asyncio
+async def test_timer_decorates_coroutines():
+    """Test timing every call of an async function."""
+    registry = Registry()
+    latency = Histogram("op_seconds", "Op latency.", ["op"], registry=registry)
+
+    @latency.labels("work").time()
+    async def work():
+        return 42
+
+    assert await work() == 42
+    assert latency.labels("work").count == 1
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routing(orchestrator, message_factory, monkeypatch):
+    """Test that routing a message shows up on /metrics."""
+    monkeypatch.setattr(endpoints, "orchestrator", orchestrator)
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    routed = metrics.MESSAGES_ROUTED.labels().value
+
+    await orchestrator.route_message(message_factory("I need help with sales", mention="sales"))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metrics.MESSAGES_ROUTED.labels().value == routed + 1
+    assert 'chat_agent_latency_seconds_count{agent="sales"}' in response.text
+    assert 'chat_context_operation_seconds_count{operation="turn_commit"}' in response.text
+    assert 'chat_routing_cache{stat="hits"}' in response.text
+
+@pytest.mark.asyncio
+async def test_only_the_registered_orchestrator_is_reported(orchestrator, message_factory):
+    """Test that creating another orchestrator doesn't take over the registered one's metrics."""
+    from app.orchestrator import Orchestrator
+
+    registry = Registry()
+    orchestrator.register_metrics(registry)
+    await orchestrator.route_message(message_factory("I need help with sales"))
+    await orchestrator.route_message(message_factory("I need help with sales"))
+
+    other = Orchestrator()
+    try:
+        text = registry.render()
+    finally:
+        await other.close()
+
+    assert f'chat_routing_cache{{stat="hits"}} {orchestrator.routing_cache_stats()["hits"]}' in text
+    assert orchestrator.routing_cache_stats()["hits"] >= 1
+    assert 'chat_agent_executor{stat="thread_workers"}' in text
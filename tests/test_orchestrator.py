@@ -119,3 +119,236 @@ async def test_orchestrator_context_handling(orchestrator, message_factory, shar
     context = await shared_context.get_session(message1.context_id)
     assert context is not None
     assert len(context.messages) >= 2
+
+@pytest.mark.asyncio
+async def test_orchestrator_concurrent_dispatch(orchestrator, message_factory, shared_context):
+    """Test that mentioned agents run concurrently and replies keep mention order."""
+    import asyncio
+    
+    started = []
+    
+    def slow_agent(agent, delay):
+        reply = agent.process_message_mock.return_value
+        
+        async def process(message, context):
+            started.append(agent.name)
+            await asyncio.sleep(delay)
+            return reply
+        agent.process_message_mock.side_effect = process
+    
+    slow_agent(orchestrator._agents["sales"], 0.2)
+    slow_agent(orchestrator._agents["marketing"], 0.1)
+    orchestrator.concurrent_dispatch = True
+    
+    message = message_factory("@sales pricing? @marketing campaign?")
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    response = await orchestrator.route_message(message)
+    elapsed = loop.time() - start
+    
+    assert elapsed < 0.3
+    assert response["agent"] == "multiple(sales, marketing)"
+    
+    session = await shared_context.get_session(message.context_id)
+    assert [m.sender_id for m in session.messages] == ["test_user", "sales", "marketing"]
+
+@pytest.mark.asyncio
+async def test_orchestrator_agent_timeout(orchestrator, message_factory):
+    """Test that an agent exceeding the timeout is cancelled and reported."""
+    import asyncio
+    
+    cancelled = asyncio.Event()
+    
+    async def hang(message, context):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    orchestrator._agents["sales"].process_message_mock.side_effect = hang
+    orchestrator.agent_timeout = 0.05
+    
+    message = message_factory("@sales pricing? @marketing campaign?")
+    response = await orchestrator.route_message(message)
+    
+    assert cancelled.is_set()
+    assert "did not respond in time" in response["content"]
+    assert "[marketing]" in response["content"]
+
+@pytest.mark.asyncio
+async def test_orchestrator_single_transaction_per_message(orchestrator, message_factory):
+    """Test that routing a multi-agent message costs two context round trips."""
+    turns = []
+    open_turn = orchestrator._context_manager.turn
+    
+    def record_turn(session_id):
+        turn = open_turn(session_id)
+        turns.append(turn)
+        return turn
+    
+    orchestrator._context_manager.turn = record_turn
+    await orchestrator.route_message(message_factory("@sales pricing? @marketing campaign?"))
+    
+    assert len(turns) == 1
+    assert turns[0].round_trips == 2
+
+@pytest.mark.asyncio
+async def test_orchestrator_batch_scoring_matches_agents(shared_context):
+    """Test that batch scoring ranks agents as their own calculate_relevance does."""
+    from app.orchestrator import Orchestrator
+    from app.agents.alex_agent import AlexAgent
+    from app.agents.brand_agent import BrandAgent
+    from app.agents.growth_agent import GrowthAgent
+    from app.agents.marketing_agent import MarketingAgent
+    from app.agents.sales_agent import SalesAgent
+    
+    orchestrator = Orchestrator()
+    agents = [AlexAgent(), BrandAgent(), GrowthAgent(), MarketingAgent(), SalesAgent()]
+    for agent in agents:
+        await orchestrator.register_agent(agent)
+    
+    for content in ["hi", "brand voice and logo", "price of a growth package", "unrelated"]:
+        expected = sorted(
+            [(agent.name, await agent.calculate_relevance(content)) for agent in agents],
+            key=lambda x: -x[1]
+        )
+        expected = [(name, score) for name, score in expected if score >= 0.2]
+        ranking = await orchestrator._find_relevant_agents(content, threshold=0.2)
+        assert [(agent.name, score) for agent, score in ranking] == expected
+
+@pytest.mark.asyncio
+async def test_orchestrator_scores_once_per_turn(
+    orchestrator,
+    message_factory,
+    mock_low_confidence_agent
+):
+    """Test that rerouting reuses the ranking computed for the turn."""
+    await orchestrator.register_agent(mock_low_confidence_agent)
+    
+    message = message_factory("@low_confidence help me")
+    await orchestrator.route_message(message)
+    assert orchestrator._agents["sales"].calculate_relevance_mock.call_count == 1
+
+@pytest.mark.asyncio
+async def test_orchestrator_rerouting_does_not_loop(orchestrator, message_factory):
+    """Test that agents that all decline are each tried once and the path is recorded."""
+    from app.agents.base_agent import AgentResponse
+    
+    for name in ("sales", "marketing"):
+        agent = orchestrator._agents[name]
+        agent.process_message_mock.return_value = AgentResponse(
+            content=f"Not for {name}",
+            confidence=0.2,
+            needs_rerouting=True
+        )
+    
+    response = await orchestrator.route_message(message_factory("@sales help me"))
+    
+    # Sales hands over to marketing, which has nobody left to hand back to
+    assert response["agent"] == "marketing"
+    assert response["reroute_path"] == ["sales", "marketing"]
+    assert orchestrator._agents["sales"].process_message_mock.call_count == 1
+    assert orchestrator._agents["marketing"].process_message_mock.call_count == 1
+
+@pytest.mark.asyncio
+async def test_orchestrator_reroute_hop_limit(shared_context, message_factory):
+    """Test that a reroute chain stops after the configured number of hops."""
+    from conftest import MockAgent
+    from app.orchestrator import Orchestrator
+    from app.agents.base_agent import AgentResponse
+    
+    orchestrator = Orchestrator(max_reroute_hops=2)
+    for index, confidence in enumerate([0.9, 0.8, 0.7, 0.6]):
+        agent = MockAgent(f"agent{index}", confidence=confidence)
+        agent.process_message_mock.return_value = AgentResponse(
+            content="Not for me",
+            confidence=0.1,
+            needs_rerouting=True
+        )
+        await orchestrator.register_agent(agent)
+    
+    response = await orchestrator.route_message(message_factory("@agent3 help me"))
+    
+    assert response["reroute_path"] == ["agent3", "agent0", "agent1"]
+    assert orchestrator._agents["agent2"].process_message_mock.call_count == 0
+
+@pytest.mark.asyncio
+async def test_orchestrator_routing_cache(shared_context):
+    """Test that repeated messages reuse routing decisions until agents change."""
+    from app.orchestrator import Orchestrator
+    from app.agents.alex_agent import AlexAgent
+    from app.agents.sales_agent import SalesAgent
+    
+    orchestrator = Orchestrator()
+    await orchestrator.register_agent(AlexAgent())
+    
+    first = await orchestrator._find_relevant_agents("Hi", threshold=0.2)
+    second = await orchestrator._find_relevant_agents("  hi ", threshold=0.2)
+    assert [a.name for a, _ in first] == [a.name for a, _ in second] == ["alex"]
+    assert orchestrator.routing_cache_stats()["hits"] == 1
+    
+    # A different threshold is a different decision
+    await orchestrator._find_relevant_agents("hi", threshold=0.5)
+    assert orchestrator.routing_cache_stats()["misses"] == 2
+    
+    # Registering an agent invalidates cached decisions
+    await orchestrator.register_agent(SalesAgent())
+    assert orchestrator.routing_cache_stats()["size"] == 0
+    ranking = await orchestrator._find_relevant_agents("hi, what's the price to buy?", threshold=0.2)
+    assert ranking[0][0].name == "sales_agent"
+
+@pytest.mark.asyncio
+async def test_orchestrator_streams_chunks_per_agent(orchestrator, message_factory):
+    """Test that streamed chunks arrive per agent before the aggregated response."""
+    import asyncio
+    from conftest import MockAgent
+    
+    class StreamingAgent(MockAgent):
+        async def stream_message(self, message, context=None):
+            for token in ["Streamed ", "reply"]:
+                await asyncio.sleep(0.01)
+                yield token
+    
+    await orchestrator.register_agent(StreamingAgent("writer"))
+    
+    async def slow_reply(message, context):
+        await asyncio.sleep(0.1)
+        return orchestrator._agents["marketing"].process_message_mock.return_value
+    orchestrator._agents["marketing"].process_message_mock.side_effect = slow_reply
+    
+    message = message_factory("@writer draft this @marketing campaign?")
+    events = [event async for event in orchestrator.stream_message(message)]
+    
+    chunks = [(e["agent"], e["content"]) for e in events if e["type"] == "chunk"]
+    assert chunks == [
+        ("writer", "Streamed "),
+        ("writer", "reply"),
+        ("marketing", "I can help with marketing strategies"),
+    ]
+    assert events[-1]["type"] == "response"
+    assert events[-1]["response"]["agent"] == "multiple(writer, marketing)"
+    assert "[writer]: Streamed reply" in events[-1]["response"]["content"]
+
+@pytest.mark.asyncio
+async def test_orchestrator_stream_closed_early_stops_routing(orchestrator, message_factory, shared_context):
+    """Test that a consumer stopping early waits for routing to stop before the turn commits."""
+    import asyncio
+    
+    async def slow_reply(message, context):
+        await asyncio.sleep(1)
+        return orchestrator._agents["marketing"].process_message_mock.return_value
+    orchestrator._agents["marketing"].process_message_mock.side_effect = slow_reply
+    
+    stream = orchestrator.stream_message(message_factory("@sales @marketing help", context_id="closed_early"))
+    first = await stream.__anext__()
+    await stream.aclose()
+    
+    assert first == {"type": "chunk", "agent": "sales", "content": "I can help with sales inquiries"}
+    routing = [
+        task for task in asyncio.all_tasks()
+        if "stream_message.<locals>.route" in task.get_coro().__qualname__
+    ]
+    assert routing == []
+    session = await shared_context.get_session("closed_early")
+    assert [m.content for m in session.messages] == ["@sales @marketing help"]
@@ -0,0 +1,67 @@
+import pytest
+import asyncio
+import fakeredis
+import fakeredis.aioredis
+import redis.asyncio as redis
+
+from app.core.redis_pool import MeteredConnectionPool
+
+def make_pool(max_connections: int, timeout: float = 1.0) -> MeteredConnectionPool:
+    return MeteredConnectionPool(
+        max_connections=max_connections,
+        timeout=timeout,
+        connection_class=fakeredis.aioredis.FakeAsyncRedisConnection,
+        server=fakeredis.FakeServer(),
+        decode_responses=True
+    )
+
+@pytest.mark.asyncio
+async def test_pool_waits_for_a_free_connection():
+    """Test that a full pool makes callers wait and records it."""
+    pool = make_pool(max_connections=2)
+    held = [await pool.get_connection("GET") for _ in range(2)]
+    
+    waiter = asyncio.ensure_future(pool.get_connection("GET"))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    stats = pool.stats()
+    assert stats["in_use"] == 2
+    assert stats["utilisation"] == 1.0
+    
+    await pool.release(held.pop())
+    held.append(await asyncio.wait_for(waiter, timeout=1))
+    for connection in held:
+        await pool.release(connection)
+    
+    stats = pool.stats()
+    assert stats["acquisitions"] == 3
+    assert stats["waits"] == 1
+    assert stats["peak_in_use"] == 2
+    assert stats["in_use"] == 0
+    assert stats["idle"] == 2
+    await pool.disconnect()
+
+@pytest.mark.asyncio
+async def test_pool_counts_timeouts():
+    """Test that giving up on a busy pool is counted and raised."""
+    pool = make_pool(max_connections=1, timeout=0.05)
+    held = await pool.get_connection("GET")
+    
+    with pytest.raises(redis.ConnectionError):
+        await pool.get_connection("GET")
+    assert pool.stats()["timeouts"] == 1
+    
+    await pool.release(held)
+    await pool.disconnect()
+
+@pytest.mark.asyncio
+async def test_client_commands_use_the_pool():
+    """Test that a client on the pool runs commands and returns connections."""
+    pool = make_pool(max_connections=4)
+    client = redis.Redis(connection_pool=pool)
+    
+    await asyncio.gather(*[client.incr("counter") for _ in range(20)])
+    assert await client.get("counter") == "20"
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["peak_in_use"] <= 4
+    await pool.disconnect()
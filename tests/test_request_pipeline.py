@@ -0,0 +1,90 @@
+import pytest
+import asyncio
+
+from app.core.request_pipeline import RequestPipeline
+
+@pytest.mark.asyncio
+async def test_requests_of_different_sessions_overlap():
+    """Test that a slow request doesn't hold back another session's reply."""
+    pipeline = RequestPipeline(max_in_flight=4)
+    finished = []
+    
+    async def handle(name: str, delay: float):
+        await asyncio.sleep(delay)
+        finished.append(name)
+    
+    await pipeline.submit(lambda: handle("slow", 0.2), session_id="a")
+    await pipeline.submit(lambda: handle("fast", 0.0), session_id="b")
+    await pipeline.drain()
+    
+    assert finished == ["fast", "slow"]
+
+@pytest.mark.asyncio
+async def test_requests_of_one_session_keep_order():
+    """Test that requests sharing a session complete in submission order."""
+    pipeline = RequestPipeline(max_in_flight=4)
+    finished = []
+    
+    async def handle(index: int, delay: float):
+        await asyncio.sleep(delay)
+        finished.append(index)
+    
+    for index, delay in enumerate([0.05, 0.0, 0.02]):
+        await pipeline.submit(lambda index=index, delay=delay: handle(index, delay), session_id="a")
+    await pipeline.drain()
+    
+    assert finished == [0, 1, 2]
+
+@pytest.mark.asyncio
+async def test_submit_waits_when_max_in_flight_reached():
+    """Test that submit applies backpressure at the in-flight limit."""
+    pipeline = RequestPipeline(max_in_flight=2)
+    release = asyncio.Event()
+    
+    for _ in range(2):
+        await pipeline.submit(release.wait)
+    assert pipeline.in_flight == 2
+    
+    third = asyncio.ensure_future(pipeline.submit(release.wait))
+    await asyncio.sleep(0.01)
+    assert not third.done()
+    
+    release.set()
+    await asyncio.wait_for(third, timeout=1.0)
+    await pipeline.drain()
+    assert pipeline.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_failed_request_doesnt_block_its_session():
+    """Test that an error in one request still lets the next one run."""
+    pipeline = RequestPipeline(max_in_flight=2)
+    finished = []
+    
+    async def fail():
+        raise ValueError("boom")
+    
+    async def succeed():
+        finished.append("ok")
+    
+    await pipeline.submit(fail, session_id="a")
+    await pipeline.submit(succeed, session_id="a")
+    await pipeline.drain()
+    
+    assert finished == ["ok"]
+
+@pytest.mark.asyncio
+async def test_request_cancelled_before_it_starts_frees_its_slot():
+    """Test that cancelling a request right after submit gives its slot back."""
+    pipeline = RequestPipeline(max_in_flight=1)
+    finished = []
+    
+    async def succeed():
+        finished.append("ok")
+    
+    task = await pipeline.submit(succeed)
+    task.cancel()
+    await pipeline.drain()
+    
+    await asyncio.wait_for(pipeline.submit(succeed), timeout=1.0)
+    await pipeline.drain()
+    assert finished == ["ok"]
@@ -0,0 +1,135 @@
+import pytest
+import asyncio
+import json
+import os
+import fakeredis.aioredis
+import redis.asyncio as redis
+
+from app.core.room_broker import RedisRoomBroker
+from app.core.websocket_manager import WebSocketManager
+from test_websocket_manager import FakeWebSocket
+
+async def wait_for_events(websocket: FakeWebSocket, event: str, count: int = 1):
+    """Wait until a socket has received ``count`` events of a type."""
+    async def received():
+        while sum(json.loads(payload)["event"] == event for payload in websocket.sent) < count:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(received(), timeout=3.0)
+
+async def run_two_workers(make_client):
+    """Two managers sharing Redis deliver room events to each other's members."""
+    workers = [WebSocketManager(broker=RedisRoomBroker(make_client())) for _ in range(2)]
+    alice, bob = FakeWebSocket(), FakeWebSocket()
+    await workers[0].connect(alice, "alice")
+    await workers[1].connect(bob, "bob")
+    
+    try:
+        await workers[0].join_room("alice", "lobby")
+        await workers[1].join_room("bob", "lobby")
+        assert await workers[0].fetch_room_members("lobby") == {"alice", "bob"}
+        assert workers[0].get_room_members("lobby") == {"alice"}
+        
+        await workers[1].broadcast_to_room("lobby", event="chat_response", data={"text": "hi"})
+        await wait_for_events(alice, "chat_response")
+        await wait_for_events(bob, "chat_response")
+        
+        await workers[1].disconnect("bob")
+        assert await workers[0].fetch_room_members("lobby") == {"alice"}
+    finally:
+        for worker, client_id in zip(workers, ["alice", "bob"]):
+            await worker.disconnect(client_id)
+            await worker.broker.close()
+
+@pytest.mark.asyncio
+async def test_room_events_reach_members_on_other_workers():
+    """Test cross-worker room fan-out against an in-memory Redis."""
+    server = fakeredis.FakeServer()
+    await run_two_workers(lambda: fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.environ.get("REDIS_TEST_URL"), reason="REDIS_TEST_URL not set")
+async def test_room_events_reach_members_on_other_workers_real_redis():
+    """Test cross-worker room fan-out against a real Redis server."""
+    url = os.environ["REDIS_TEST_URL"]
+    await run_two_workers(lambda: redis.from_url(url, decode_responses=True))
+
+@pytest.mark.asyncio
+async def test_excluded_client_is_skipped_across_workers():
+    """Test that the excluded sender doesn't get its own room event back."""
+    server = fakeredis.FakeServer()
+    workers = [
+        WebSocketManager(broker=RedisRoomBroker(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)))
+        for _ in range(2)
+    ]
+    alice, bob = FakeWebSocket(), FakeWebSocket()
+    await workers[0].connect(alice, "alice")
+    await workers[1].connect(bob, "bob")
+    await workers[0].join_room("alice", "lobby")
+    await workers[1].join_room("bob", "lobby")
+    
+    await workers[0].broadcast_to_room(
+        "lobby", event="typing_status", data={"is_typing": True}, exclude="alice"
+    )
+    await wait_for_events(bob, "typing_status")
+    assert not any(json.loads(payload)["event"] == "typing_status" for payload in alice.sent)
+    
+    for worker, client_id in zip(workers, ["alice", "bob"]):
+        await worker.disconnect(client_id)
+        await worker.broker.close()
+
+@pytest.mark.asyncio
+async def test_members_of_crashed_worker_are_swept():
+    """Test that a worker whose heartbeat expired drops out of room member lists."""
+    server = fakeredis.FakeServer()
+    client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    crashed = RedisRoomBroker(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True), worker_ttl=0.2)
+    live = RedisRoomBroker(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True), worker_ttl=0.2)
+    
+    try:
+        await crashed.join("lobby", "alice")
+        await live.join("lobby", "bob")
+        assert await live.get_room_members("lobby") == {"alice", "bob"}
+        
+        # A crash stops the heartbeat without any cleanup
+        crashed._heartbeat.cancel()
+        await asyncio.sleep(0.3)
+        
+        assert await live.get_room_members("lobby") == {"bob"}
+        assert await client.hkeys("room:lobby:members") == ["bob"]
+        assert await live.get_client_rooms("alice") == set()
+        assert live.stats()["swept_members"] == 1
+    finally:
+        await live.close()
+
+@pytest.mark.asyncio
+async def test_closed_broker_removes_its_heartbeat():
+    """Test that a worker shutting down lets others drop its members right away."""
+    server = fakeredis.FakeServer()
+    leaving = RedisRoomBroker(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    staying = RedisRoomBroker(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    await leaving.join("lobby", "alice")
+    await staying.join("lobby", "bob")
+    
+    await leaving.close()
+    
+    assert await staying.get_room_members("lobby") == {"bob"}
+    await staying.close()
+
+@pytest.mark.asyncio
+async def test_concurrent_disconnects_of_one_client():
+    """Test that two overlapping disconnects of a client in several rooms both succeed."""
+    server = fakeredis.FakeServer()
+    manager = WebSocketManager(broker=RedisRoomBroker(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)))
+    await manager.connect(FakeWebSocket(), "alice")
+    for room in ("a", "b", "c"):
+        await manager.join_room("alice", room)
+    
+    try:
+        await asyncio.gather(manager.disconnect("alice"), manager.disconnect("alice"))
+        
+        assert "alice" not in manager.client_rooms
+        assert not manager.room_clients
+        for room in ("a", "b", "c"):
+            assert await manager.fetch_room_members(room) == set()
+    finally:
+        await manager.broker.close()
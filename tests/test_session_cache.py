@@ -0,0 +1,145 @@
+import pytest
+import asyncio
+import fakeredis.aioredis
+
+from app.core.session_cache import SessionCache
+from app.core.shared_context import SharedContextManager
+
+def make_workers(count: int = 2, **options):
+    """Managers on separate clients of one in-memory Redis, like separate workers."""
+    server = fakeredis.FakeServer()
+    return [
+        SharedContextManager(
+            redis_client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+            **options
+        )
+        for _ in range(count)
+    ]
+
+async def load(manager: SharedContextManager, session_id: str):
+    """Load a turn without writing anything back."""
+    turn = manager.turn(session_id)
+    await turn.load()
+    return turn
+
+@pytest.mark.asyncio
+async def test_cached_session_is_checked_by_version(shared_context):
+    """Test that a cached session costs one version read instead of the full lists."""
+    session_id = "cached_session"
+    await shared_context.add_message(session_id, "Hello", sender_id="user")
+
+    first = await load(shared_context, session_id)
+    second = await load(shared_context, session_id)
+
+    assert (first.round_trips, first.operations) == (1, 3)
+    assert (second.round_trips, second.operations) == (1, 1)
+    assert [m.content for m in second.get_recent_messages()] == ["Hello"]
+    assert shared_context.get_cache_stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_own_writes_update_the_cached_copy(shared_context):
+    """Test that a worker's own writes keep its cached copy current."""
+    session_id = "own_writes"
+    await shared_context.add_message(session_id, "One", sender_id="user")
+    await load(shared_context, session_id)
+
+    async with shared_context.turn(session_id) as turn:
+        turn.add_message("Two", sender_id="user")
+    await shared_context.add_message(session_id, "Three", sender_id="user")
+
+    turn = await load(shared_context, session_id)
+    assert [m.content for m in turn.get_recent_messages()] == ["One", "Two", "Three"]
+    assert shared_context.get_cache_stats()["stale"] == 0
+
+@pytest.mark.asyncio
+async def test_cached_copy_follows_retention():
+    """Test that evictions and summary lines are applied to the cached copy."""
+    manager, = make_workers(1, max_messages=2, summarize_evicted=True)
+    session_id = "retention"
+    await manager.add_message(session_id, "One", sender_id="user")
+    await load(manager, session_id)
+
+    for content in ["Two", "Three"]:
+        await manager.add_message(session_id, content, sender_id="user")
+
+    turn = await load(manager, session_id)
+    session = await manager.get_session(session_id)
+    assert turn.operations == 1
+    assert turn.get_recent_messages() == session.messages
+    assert turn._summary == session.summary == ["user: One"]
+
+@pytest.mark.asyncio
+async def test_write_on_another_worker_is_detected():
+    """Test that a version bump from another worker makes the cached copy stale."""
+    reader, writer = make_workers()
+    session_id = "shared"
+    await writer.add_message(session_id, "First", sender_id="user")
+    assert [m.content for m in await reader.get_recent_messages(session_id)] == ["First"]
+
+    await writer.add_message(session_id, "Second", sender_id="user")
+
+    context = await reader.get_agent_context(session_id, "sales")
+    assert [m.content for m in context] == ["First", "Second"]
+    assert reader.get_cache_stats()["stale"] == 1
+
+@pytest.mark.asyncio
+async def test_recreated_session_does_not_reuse_versions():
+    """Test that a session recreated after expiring isn't mistaken for the cached one."""
+    reader, writer = make_workers()
+    session_id = "recreated"
+    await writer.add_message(session_id, "Old", sender_id="user")
+    await load(reader, session_id)
+
+    await writer.redis.delete(*writer._session_keys(session_id))
+    await writer.add_message(session_id, "New", sender_id="user")
+
+    turn = await load(reader, session_id)
+    assert [m.content for m in turn.get_recent_messages()] == ["New"]
+
+@pytest.mark.asyncio
+async def test_invalidations_allow_reads_without_io():
+    """Test that with push invalidation cached reads skip Redis until another worker writes."""
+    reader, writer = make_workers(cache_invalidation=True)
+    session_id = "pushed"
+    try:
+        await writer.add_message(session_id, "First", sender_id="user")
+        await load(reader, session_id)
+
+        turn = await load(reader, session_id)
+        assert (turn.round_trips, turn.operations) == (0, 0)
+
+        await writer.add_message(session_id, "Second", sender_id="user")
+        async def invalidated():
+            while session_id in reader.cache:
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(invalidated(), timeout=3.0)
+
+        turn = await load(reader, session_id)
+        assert turn.round_trips == 1
+        assert [m.content for m in turn.get_recent_messages()] == ["First", "Second"]
+        assert reader.get_cache_stats()["invalidations"] == 1
+        # A worker ignores its own invalidations
+        assert writer.get_cache_stats()["invalidations"] == 0
+    finally:
+        await reader.close()
+        await writer.close()
+
+def test_cache_evicts_least_recently_used():
+    """Test the size bound of the session cache."""
+    cache = SessionCache(max_size=2)
+    cache.put("a", 1, [], [])
+    cache.put("b", 1, [], [])
+    assert cache.validate("a", 1) is not None
+    cache.put("c", 1, [], [])
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+def test_entry_read_before_an_invalidation_is_not_cached():
+    """Test that a read racing with an invalidation doesn't store a stale copy."""
+    cache = SessionCache()
+    read_at = 0.0
+    cache.invalidate("a")
+    cache.put("a", 1, [], [], read_at=read_at)
+    assert "a" not in cache
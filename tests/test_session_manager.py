@@ -0,0 +1,58 @@
+import pytest
+from types import SimpleNamespace
+
+from app.core.session_manager import SessionManager
+from test_history_writer import FakeCollection
+
+@pytest.fixture
+def session_manager(redis_mock):
+    """Create a SessionManager on the mock Redis and an in-memory contexts collection."""
+    return SessionManager(redis_client=redis_mock, db=SimpleNamespace(contexts=FakeCollection()))
+
+@pytest.mark.asyncio
+async def test_recent_messages_served_from_redis(session_manager):
+    """Test that a read Redis can answer doesn't touch MongoDB."""
+    for i in range(5):
+        await session_manager.update_context("s1", f"m{i}")
+    
+    assert await session_manager.get_recent_messages("s1", limit=3) == ["m2", "m3", "m4"]
+    assert session_manager.db.contexts.reads == 0
+    assert session_manager.get_tier_stats()["hot_reads"] == 1
+    await session_manager.close()
+
+@pytest.mark.asyncio
+async def test_deep_history_read_uses_slice(session_manager):
+    """Test that asking for more than Redis keeps reads only that much from MongoDB."""
+    for i in range(30):
+        await session_manager.update_context("s1", f"m{i}")
+    await session_manager.history.flush()
+    
+    messages = await session_manager.get_recent_messages("s1", limit=25)
+    assert messages == [f"m{i}" for i in range(5, 30)]
+    assert session_manager.db.contexts.reads == 1
+    await session_manager.close()
+
+@pytest.mark.asyncio
+async def test_cold_session_is_promoted(session_manager, redis_mock):
+    """Test that a session read back from MongoDB is served hot afterwards."""
+    for i in range(12):
+        await session_manager.update_context("s1", f"m{i}")
+    await session_manager.history.flush()
+    await redis_mock.delete("context:s1")  # Expired from the hot tier
+    
+    assert await session_manager.get_recent_messages("s1", limit=2) == ["m10", "m11"]
+    assert session_manager.get_tier_stats()["promotions"] == 1
+    
+    assert await session_manager.get_recent_messages("s1", limit=10) == [f"m{i}" for i in range(2, 12)]
+    assert session_manager.db.contexts.reads == 1
+    await session_manager.close()
+
+@pytest.mark.asyncio
+async def test_get_context_reads_both_tiers(session_manager):
+    """Test the combined read, including appends not yet flushed to MongoDB."""
+    for i in range(3):
+        await session_manager.update_context("s1", f"m{i}")
+    
+    context = await session_manager.get_context("s1", history_limit=2)
+    assert context == {"recent": ["m0", "m1", "m2"], "historical": ["m1", "m2"]}
+    await session_manager.close()
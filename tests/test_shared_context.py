@@ -84,7 +84,7 @@ async def test_session_expiration(shared_context, redis_mock):
     await shared_context.create_session(session_id)
     
     # Simulate TTL expiration
-    await redis_mock.delete(f"session:{session_id}")
+    await redis_mock.delete(f"session:{session_id}:header")
     
     session = await shared_context.get_session(session_id)
     assert session is None
@@ -178,3 +178,153 @@ async def test_message_validation(shared_context):
                 timestamp=datetime.utcnow() + timedelta(days=1)  # Future timestamp
             )
         )
+
+@pytest.mark.asyncio
+async def test_append_only_storage_layout(shared_context, redis_mock):
+    """Test that messages, agents and metadata live in separate Redis structures."""
+    session_id = "layout_session"
+    await shared_context.add_message(session_id, "Hi", sender_id="user")
+    await shared_context.add_message(
+        session_id, "Hello", sender_id="sales", agent_id="sales", confidence=0.9
+    )
+    await shared_context.update_metadata(session_id, {"priority": "high"})
+    
+    assert await redis_mock.type(f"session:{session_id}:header") == "hash"
+    assert await redis_mock.llen(f"session:{session_id}:messages") == 2
+    assert await redis_mock.smembers(f"session:{session_id}:agents") == {"sales"}
+    
+    recent = await shared_context.get_recent_messages(session_id, limit=1)
+    assert [m.content for m in recent] == ["Hello"]
+    
+    session = await shared_context.get_session(session_id)
+    assert session.metadata == {"priority": "high"}
+    assert session.active_agents == {"sales"}
+
+@pytest.mark.asyncio
+async def test_concurrent_writers_keep_all_messages(shared_context):
+    """Test that interleaved writers appending to one session lose nothing."""
+    import asyncio
+    
+    session_id = "shared_session"
+    await asyncio.gather(*[
+        shared_context.add_message(session_id, f"Message {i}", sender_id=f"worker_{i}")
+        for i in range(20)
+    ])
+    await asyncio.gather(*[
+        shared_context.add_active_agent(session_id, f"agent_{i}")
+        for i in range(5)
+    ])
+    
+    session = await shared_context.get_session(session_id)
+    assert len(session.messages) == 20
+    assert session.active_agents == {f"agent_{i}" for i in range(5)}
+
+@pytest.mark.asyncio
+async def test_retention_evicts_oldest_messages(shared_context):
+    """Test that sessions are trimmed to the message and byte limits."""
+    shared_context.max_messages = 3
+    shared_context.max_bytes = 0
+    session_id = "bounded_session"
+    
+    for i in range(5):
+        await shared_context.add_message(session_id, f"Message {i}", sender_id="user")
+    
+    session = await shared_context.get_session(session_id)
+    assert [m.content for m in session.messages] == ["Message 2", "Message 3", "Message 4"]
+    
+    usage = await shared_context.get_session_usage(session_id)
+    assert usage["messages"] == 3
+    assert usage["evicted_messages"] == 2
+    assert shared_context.get_retention_stats()["evicted_messages"] == 2
+    
+    # A byte limit smaller than two messages keeps only the newest one
+    shared_context.max_bytes = usage["bytes"] // 2
+    await shared_context.add_message(session_id, "Message 5", sender_id="user")
+    session = await shared_context.get_session(session_id)
+    assert [m.content for m in session.messages] == ["Message 5"]
+
+@pytest.mark.asyncio
+async def test_retention_with_concurrent_appends(shared_context, redis_mock):
+    """Test that concurrent appenders trim a session to exactly its limit, once."""
+    import asyncio
+    
+    shared_context.max_messages = 5
+    shared_context.max_bytes = 0
+    session_id = "contended_session"
+    
+    await asyncio.gather(*[
+        shared_context.add_message(session_id, f"Message {i}", sender_id=f"worker_{i}")
+        for i in range(20)
+    ])
+    
+    stored = await redis_mock.lrange(shared_context._messages_key(session_id), 0, -1)
+    assert len(stored) == 5
+    usage = await shared_context.get_session_usage(session_id)
+    assert usage["messages"] == 5
+    assert usage["evicted_messages"] == 15
+    assert usage["bytes"] == sum(len(raw.encode("utf-8")) for raw in stored)
+
+@pytest.mark.asyncio
+async def test_retention_summarises_evicted_messages(shared_context):
+    """Test that evicted messages are folded into the session summary."""
+    shared_context.max_messages = 2
+    shared_context.summarize_evicted = True
+    session_id = "summary_session"
+    
+    for i in range(4):
+        await shared_context.add_message(session_id, f"Message {i}", sender_id="user")
+    
+    session = await shared_context.get_session(session_id)
+    assert session.summary == ["user: Message 0", "user: Message 1"]
+    
+    context = await shared_context.get_agent_context(session_id, "sales")
+    assert context[0].sender_id == "system"
+    assert "user: Message 1" in context[0].content
+    assert [m.content for m in context[1:]] == ["Message 2", "Message 3"]
+
+@pytest.mark.asyncio
+async def test_context_turn_batches_round_trips(shared_context):
+    """Test that a turn reads once and writes once however much it queues."""
+    session_id = "turn_session"
+    await shared_context.add_message(session_id, "Earlier", sender_id="user")
+    
+    async with shared_context.turn(session_id) as turn:
+        turn.add_message("Question", sender_id="user")
+        for agent in ["sales", "marketing", "brand"]:
+            context = turn.get_agent_context(agent)
+            assert [m.content for m in context][:2] == ["Earlier", "Question"]
+            turn.add_active_agent(agent)
+            turn.add_message(f"{agent} reply", sender_id=agent, agent_id=agent, confidence=0.8)
+    
+    # load + commit, however many agents took part
+    assert turn.round_trips == 2
+    # version and 2 reads, then hsetnx, hset, rpush, hincrby, the version
+    # bump (hsetnx, hincrby), sadd and 5 expires
+    assert turn.operations == 15
+    
+    session = await shared_context.get_session(session_id)
+    assert len(session.messages) == 5
+    assert session.active_agents == {"sales", "marketing", "brand"}
+
+@pytest.mark.asyncio
+async def test_legacy_session_blob_does_not_collide(shared_context, redis_mock):
+    """Test that a session stored as one JSON string by older workers doesn't break the hash layout."""
+    session_id = "legacy_session"
+    legacy = SessionContext(
+        session_id=session_id,
+        created_at=datetime.utcnow().isoformat(),
+        last_updated=datetime.utcnow().isoformat(),
+        active_agents={"sales"},
+        messages=[],
+        metadata={}
+    )
+    await redis_mock.set(f"session:{session_id}", legacy.model_dump_json(), ex=3600)
+    
+    assert await shared_context.add_message(session_id, "Hi", sender_id="user")
+    assert await shared_context.update_metadata(session_id, {"priority": "high"})
+    session = await shared_context.get_session(session_id)
+    assert [m.content for m in session.messages] == ["Hi"]
+    assert session.metadata == {"priority": "high"}
+    
+    await shared_context.create_session(session_id)
+    assert not await redis_mock.exists(f"session:{session_id}")
@@ -0,0 +1,108 @@
+import json
+import pytest
+
+from app.core import tracing
+from app.core.tracing import FileExporter, InMemoryExporter, Tracer
+
+@pytest.mark.asyncio
+async def test_debug_message_gets_timing_breakdown(orchestrator, message_factory):
+    """Test that a debug message reports every stage, nested, without tracing enabled."""
+    message = message_factory("@sales I need help")
+    message.debug = True
+
+    response = await orchestrator.route_message(message)
+
+    timing = response["timing"]
+    spans = [(stage["span"], stage["depth"]) for stage in timing["spans"]]
+    assert spans == [
+        ("context.load", 1),
+        ("dispatch", 1),
+        ("agent", 2),
+        ("agent.respond", 3),
+        ("aggregate", 2),
+        ("context.commit", 1)
+    ]
+    agent = next(stage for stage in timing["spans"] if stage["span"] == "agent")
+    assert agent["agent"] == "sales"
+    assert timing["total_ms"] >= max(stage["ms"] for stage in timing["spans"])
+
+    # Without the flag nothing is traced or attached
+    assert "timing" not in await orchestrator.route_message(message_factory("@sales more help"))
+
+@pytest.mark.asyncio
+async def test_streamed_debug_message_gets_timing_breakdown(orchestrator, message_factory):
+    """Test that the final event of a streamed debug message carries the dispatch stages."""
+    message = message_factory("@sales I need help")
+    message.debug = True
+
+    events = [event async for event in orchestrator.stream_message(message)]
+
+    assert events[-1]["type"] == "response"
+    timing = events[-1]["response"]["timing"]
+    spans = [(stage["span"], stage["depth"]) for stage in timing["spans"]]
+    assert spans == [
+        ("dispatch", 1),
+        ("agent", 2),
+        ("agent.respond", 3),
+        ("aggregate", 2)
+    ]
+    assert all("timing" not in event for event in events[:-1])
+
+    events = [event async for event in orchestrator.stream_message(message_factory("@sales more help"))]
+    assert "timing" not in events[-1]["response"]
+
+@pytest.mark.asyncio
+async def test_reroute_chain_is_nested(orchestrator, message_factory, mock_low_confidence_agent):
+    """Test that a rerouted agent's span nests in the span of the agent that gave up."""
+    await orchestrator.register_agent(mock_low_confidence_agent)
+    message = message_factory("@low_confidence help")
+    message.debug = True
+
+    response = await orchestrator.route_message(message)
+
+    agents = [stage for stage in response["timing"]["spans"] if stage["span"] == "agent"]
+    assert agents[0]["agent"] == "low_confidence"
+    assert agents[0]["rerouted_to"] == agents[1]["agent"]
+    assert agents[1]["depth"] == agents[0]["depth"] + 1
+
+@pytest.mark.asyncio
+async def test_enabled_tracer_exports_otlp(orchestrator, message_factory, monkeypatch):
+    """Test that every routed message is exported as one OTLP trace when tracing is on."""
+    exporter = InMemoryExporter()
+    monkeypatch.setattr(tracing, "TRACER", Tracer(enabled=True, exporter=exporter))
+
+    response = await orchestrator.route_message(message_factory("@sales I need help"))
+
+    assert "timing" not in response
+    [spans] = exporter.traces
+    body = tracing.to_otlp(spans, "chat")
+    encoded = body["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root = encoded[0]
+    assert root["name"] == "route_message"
+    assert "parentSpanId" not in root
+    assert {span["traceId"] for span in encoded} == {root["traceId"]}
+    assert all(span["parentSpanId"] for span in encoded[1:])
+    assert int(root["endTimeUnixNano"]) > int(root["startTimeUnixNano"])
+
+@pytest.mark.asyncio
+async def test_failed_span_and_file_export(tmp_path):
+    """Test error status on a failing span and JSON lines in the file exporter."""
+    path = tmp_path / "traces.jsonl"
+    exporter = FileExporter(str(path), "chat")
+    tracer = Tracer(enabled=True, exporter=exporter)
+
+    with pytest.raises(RuntimeError):
+        with tracer.trace("root"):
+            with tracing.span("child", attempt=1):
+                raise RuntimeError("boom")
+    with tracer.trace("root"):
+        pass
+    exporter.close()
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    child = next(span for span in spans if span["name"] == "child")
+    assert child["status"] == {"code": tracing.STATUS_ERROR, "message": "RuntimeError"}
+    assert child["attributes"] == [{"key": "attempt", "value": {"intValue": "1"}}]
+    assert tracing.current_span() is tracing.NOOP_SPAN
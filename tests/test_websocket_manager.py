@@ -0,0 +1,91 @@
+import pytest
+import asyncio
+import json
+
+from app.core.websocket_manager import WebSocketManager
+
+class FakeWebSocket:
+    """Minimal WebSocket double recording what was sent."""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_with = None
+    
+    async def accept(self):
+        pass
+    
+    async def send_text(self, payload: str):
+        await asyncio.sleep(self.delay)
+        self.sent.append(payload)
+    
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+async def drain():
+    """Let writer tasks flush their queues."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_block_broadcast():
+    """Test that a stalled client doesn't delay delivery to other clients."""
+    manager = WebSocketManager(send_queue_size=10)
+    slow, fast = FakeWebSocket(delay=10), FakeWebSocket()
+    await manager.connect(slow, "slow")
+    await manager.connect(fast, "fast")
+    
+    await asyncio.wait_for(manager.broadcast(event="news", data={"n": 1}), timeout=0.1)
+    await drain()
+    
+    events = [json.loads(payload)["event"] for payload in fast.sent]
+    assert events == ["system", "news"]
+    await manager.disconnect("slow")
+    await manager.disconnect("fast")
+
+@pytest.mark.asyncio
+async def test_broadcast_serialises_once():
+    """Test that every room member gets the same pre-serialised payload."""
+    manager = WebSocketManager()
+    sockets = [FakeWebSocket() for _ in range(3)]
+    for i, websocket in enumerate(sockets):
+        await manager.connect(websocket, f"client_{i}")
+        manager.room_clients.setdefault("lobby", set()).add(f"client_{i}")
+    
+    await manager.broadcast_to_room("lobby", event="chat_response", data={"text": "hi"})
+    await drain()
+    
+    payloads = [websocket.sent[-1] for websocket in sockets]
+    assert all(payload is payloads[0] for payload in payloads)
+    assert json.loads(payloads[0])["room"] == "lobby"
+    for i in range(3):
+        await manager.disconnect(f"client_{i}")
+
+@pytest.mark.asyncio
+async def test_overflowing_client_is_disconnected():
+    """Test that a client whose queue overflows is closed and removed."""
+    manager = WebSocketManager(send_queue_size=2, overflow_policy="disconnect")
+    stalled = FakeWebSocket(delay=10)
+    await manager.connect(stalled, "stalled")
+    await manager.join_room("stalled", "lobby")
+    
+    for i in range(5):
+        await manager.broadcast(event="news", data={"n": i})
+    
+    assert "stalled" not in manager.active_connections
+    assert manager.get_client_rooms("stalled") == set()
+    assert stalled.closed_with == 1013
+    assert manager.overflow_disconnects == 1
+
+@pytest.mark.asyncio
+async def test_overflow_drop_policy_keeps_client():
+    """Test that the drop policy discards messages but keeps the client."""
+    manager = WebSocketManager(send_queue_size=1, overflow_policy="drop")
+    stalled = FakeWebSocket(delay=10)
+    await manager.connect(stalled, "stalled")
+    
+    for i in range(5):
+        await manager.broadcast(event="news", data={"n": i})
+    
+    assert "stalled" in manager.active_connections
+    assert manager.dropped_messages >= 3
+    await manager.disconnect("stalled")